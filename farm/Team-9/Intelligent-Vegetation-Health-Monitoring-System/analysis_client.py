@@ -0,0 +1,88 @@
+import io
+import json
+import time
+
+import requests
+
+from analysis_result import AnalysisResult
+
+# Responses worth retrying: rate limited, or the service restarting behind a proxy
+TRANSIENT_STATUS = (429, 502, 503, 504)
+
+
+class AnalysisClient:
+    """Client for analysis_service.py with the same submit/result calls as AnalysisJobs"""
+
+    def __init__(self, base_url, poll_seconds=10.0, timeout=30.0, retries=3):
+        self.base_url = base_url.rstrip('/')
+        self.poll_seconds = poll_seconds
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+
+    def _get(self, path, **params):
+        response = self.session.get(f"{self.base_url}{path}", params=params,
+                                    timeout=self.timeout + params.get('wait', 0))
+        response.raise_for_status()
+        return response
+
+    def submit(self, lat, lon, region_name="Unknown"):
+        response = self.session.post(f"{self.base_url}/analyses", timeout=self.timeout,
+                                     json={'lat': lat, 'lon': lon, 'region_name': region_name})
+        response.raise_for_status()
+        return response.json()['job_id']
+
+    def _poll(self, job_id, wait):
+        """Status document of a job, retrying up to `retries` times on connection errors and TRANSIENT_STATUS"""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._get(f"/analyses/{job_id}", wait=wait).json()
+            except requests.HTTPError as e:
+                if e.response.status_code == 404:
+                    return {'status': 'not_found', 'error': e.response.json().get('detail', f"Unknown analysis {job_id}")}
+                if e.response.status_code not in TRANSIENT_STATUS or attempt == self.retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            time.sleep(min(0.5 * 2 ** attempt, self.poll_seconds))
+
+    def result(self, job_id, timeout=None):
+        """AnalysisResult, or a dict with an 'error' key; rasters are downloaded on first access.
+
+        Unknown and evicted jobs give an error dict with 'status': 'not_found',
+        as in AnalysisJobs.result. Connection errors and TRANSIENT_STATUS
+        responses are retried, other HTTP errors raised.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.poll_seconds if deadline is None else max(0.0, min(self.poll_seconds, deadline - time.monotonic()))
+            document = self._poll(job_id, wait)
+            if document['status'] == 'not_found':
+                return {'error': document['error'], 'status': 'not_found'}
+            if document['status'] == 'done':
+                break
+            if document['status'] == 'failed':
+                return {'error': document['error']}
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Analysis {job_id} still {document['status']}")
+
+        metadata = document['result']
+        names = metadata.pop('rasters')
+        archive = {}
+
+        def load(name):
+            # One download serves every raster of the result
+            if 'npz' not in archive:
+                archive['npz'] = AnalysisResult.from_npz(io.BytesIO(self._get(f"/analyses/{job_id}/rasters.npz").content))
+            return archive['npz'].raster(name)
+
+        return AnalysisResult(metadata, {name: (lambda name=name: load(name)) for name in names})
+
+    def estimate(self, job_id):
+        """Latest estimate metadata of a running job, or None"""
+        document = self._poll(job_id, 0.0)
+        return document.get('estimate')
+
+    def health(self):
+        return self._get("/health").json()
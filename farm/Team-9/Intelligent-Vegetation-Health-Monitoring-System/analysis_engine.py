@@ -1,76 +1,353 @@
-import pandas as pd
+import math
+import os
+import warnings
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 from satellite_data import SatelliteDataProcessor
 from ndvi_processor import NDVIProcessor
+from analysis_result import AnalysisResult
+from baseline_store import BaselineStore, same_day_in_year
+from cloud_mask import PackedMask
+from instrumentation import Trace, profiled
+from timeseries_store import TimeSeriesStore
+from config import config
+
+# Channel of each band in fetched scenes
+BAND = {band: i for i, band in enumerate(config.DEFAULT_BANDS)}
+# Two-sided 95% normal quantile for the error bounds of progressive estimates
+Z_95 = 1.96
 
 class VegetationAnalyzer:
-    def __init__(self):
-        self.satellite_processor = SatelliteDataProcessor()
+    def __init__(self, satellite_processor=None, baseline_store=None, timeseries_store=None):
+        self.satellite_processor = satellite_processor or SatelliteDataProcessor()
         self.ndvi_processor = NDVIProcessor()
+        self.baseline_store = baseline_store or BaselineStore()
+        self.timeseries_store = timeseries_store or TimeSeriesStore()
         
     def analyze_region(self, lat, lon, region_name="Unknown"):
         """Complete analysis pipeline for a region"""
         print(f"Analyzing region: {region_name} at {lat}, {lon}")
         
-        # Create bounding box
-        bbox = self.satellite_processor.create_bbox(lat, lon, buffer_km=10)
+        trace = Trace(region=region_name)
+        fetched = self.fetch_region(lat, lon, trace)
+        
+        if fetched['current_data'] is None:
+            return {"error": "Could not fetch satellite data"}
         
-        # Define time periods
-        current_end = datetime.now()
-        current_start = current_end - timedelta(days=30)
-        baseline_end = datetime(current_end.year - 1, current_end.month, current_end.day)
-        baseline_start = baseline_end - timedelta(days=30)
+        return self.analyze_fetched(region_name, fetched, trace)
+    
+    def analyze_region_progressive(self, lat, lon, region_name="Unknown", strides=None):
+        """Yield quick estimates from strided overviews of the scene, coarsest first, then the full analysis.
         
-        # Fetch satellite data
-        print("Fetching current satellite data...")
-        current_data = self.satellite_processor.fetch_sentinel2_data(
-            bbox, current_start, current_end
-        )
+        Estimates are AnalysisResults without rasters: NDVI statistics, stress
+        percentage and health status of every `stride`-th pixel, each with 95%
+        bounds. Their 'progress' is {'stride': s, 'final': False}; the last
+        result is analyze_region's, with {'stride': 1, 'final': True}.
+        """
+        print(f"Analyzing region: {region_name} at {lat}, {lon}")
+        strides = config.PROGRESSIVE_STRIDES if strides is None else strides
         
-        print("Fetching baseline satellite data...")
-        baseline_data = self.satellite_processor.fetch_sentinel2_data(
-            bbox, baseline_start, baseline_end
-        )
+        trace = Trace(region=region_name)
+        fetched = self.fetch_region(lat, lon, trace)
+        if fetched['current_data'] is None:
+            yield {"error": "Could not fetch satellite data"}
+            return
         
-        if current_data is None or baseline_data is None:
-            return {"error": "Could not fetch satellite data"}
+        for stride in sorted(strides, reverse=True):
+            with trace.span(f"estimate_{stride}"):
+                estimate = self._estimate(region_name, fetched, stride)
+            if estimate is not None:
+                estimate.metadata['timings'] = trace.timings()
+                yield estimate
         
-        # Calculate NDVI
+        result = self.analyze_fetched(region_name, fetched, trace)
+        if 'error' not in result:
+            result.metadata['progress'] = {'stride': 1, 'final': True}
+        yield result
+    
+    def analyze_regions(self, regions, max_workers=4, compute_workers=None):
+        """Analyse many regions concurrently, yielding results as they complete.
+        
+        `regions` is a list of dicts with 'lat', 'lon' and optional 'name'
+        keys, or a mapping of name -> {'lat', 'lon'} like config.TEST_REGIONS.
+        Satellite fetches (I/O bound) run on a pool of `max_workers` threads;
+        the NumPy stages run on a second thread pool, which works because
+        the heavy ufuncs release the GIL. Every result carries a 'timings'
+        dict with per-stage seconds and 'stage_metrics' with CPU time and
+        (when traced) peak memory as well.
+        """
+        if isinstance(regions, dict):
+            regions = [dict(coords, name=name) for name, coords in regions.items()]
+        compute_workers = compute_workers or min(max_workers, os.cpu_count() or 1)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch') as fetch_pool, \
+                ThreadPoolExecutor(max_workers=compute_workers, thread_name_prefix='compute') as compute_pool:
+            
+            pending = {
+                fetch_pool.submit(self.fetch_region, region['lat'], region['lon'],
+                                  Trace(region=region.get('name', 'Unknown'))): ('fetch', region)
+                for region in regions
+            }
+            
+            # Fetched regions go straight to the compute pool; finished analyses are yielded
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, region = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        failure = "Could not fetch satellite data" if stage == 'fetch' else "Analysis failed"
+                        yield self._region_error(region, f"{failure}: {e}")
+                        continue
+                    
+                    if stage == 'analyze':
+                        yield outcome
+                    elif outcome['current_data'] is None:
+                        yield self._region_error(region, "Could not fetch satellite data")
+                    else:
+                        analysis = compute_pool.submit(
+                            self.analyze_fetched, region.get('name', 'Unknown'), outcome, outcome['trace']
+                        )
+                        pending[analysis] = ('analyze', region)
+    
+    def _region_error(self, region, message):
+        return {
+            'region_name': region.get('name', 'Unknown'),
+            'coordinates': {'lat': region['lat'], 'lon': region['lon']},
+            'error': message
+        }
+    
+    @profiled
+    def fetch_region(self, lat, lon, trace):
+        """Fetch the current scene, plus raw scenes for baseline years not yet stored.
+        
+        Returns a dict with 'lat', 'lon', 'bbox', 'analysis_date',
+        'current_data' (None when nothing could be fetched), 'baseline_scenes'
+        ({year: (date, scene or None)}) and 'trace'. Pass it to
+        analyze_fetched; callers such as the scheduler can inspect the
+        scenes in between.
+        """
+        with trace.span('fetch'):
+            # Create bounding box
+            bbox = self.satellite_processor.create_bbox(lat, lon, buffer_km=10)
+            
+            # Define time periods
+            current_end = datetime.now()
+            current_start = current_end - timedelta(days=30)
+            
+            # Fetch satellite data; clouded pixels are masked later, so partly clouded scenes are still useful
+            print("Fetching current satellite data...")
+            current_data = self.satellite_processor.fetch_sentinel2_data(
+                bbox, current_start, current_end, max_cloud_coverage=config.MASKED_CLOUD_COVERAGE
+            )
+            
+            # Baseline years already in the store (for scenes of this size) are served from precomputed composites
+            baseline_scenes = {}
+            missing_years = [] if current_data is None else \
+                self.baseline_store.missing_years(lat, lon, current_end, current_data.shape)
+            for year in missing_years:
+                print(f"Fetching baseline satellite data for {year}...")
+                baseline_end = same_day_in_year(current_end, year)
+                baseline_scenes[year] = (baseline_end, self.satellite_processor.fetch_sentinel2_data(
+                    bbox, baseline_end - timedelta(days=30), baseline_end,
+                    max_cloud_coverage=config.MASKED_CLOUD_COVERAGE
+                ))
+        
+        return {
+            'lat': lat,
+            'lon': lon,
+            'bbox': bbox,
+            'analysis_date': current_end,
+            'current_data': current_data,
+            'baseline_scenes': baseline_scenes,
+            'trace': trace
+        }
+    
+    @profiled
+    def analyze_fetched(self, region_name, fetched, trace):
+        """NDVI, stress, statistics and report for scenes returned by fetch_region"""
+        lat, lon = fetched['lat'], fetched['lon']
+        analysis_date = fetched['analysis_date']
+        current_data = fetched['current_data']
+        
+        # NDVI and the other spectral indices in one pass, masking clouds and shadows flagged in the SCL band
         print("Calculating NDVI...")
-        current_ndvi = self.ndvi_processor.calculate_ndvi(
-            current_data[:,:,0], current_data[:,:,1]
-        )
-        baseline_ndvi = self.ndvi_processor.calculate_ndvi(
-            baseline_data[:,:,0], baseline_data[:,:,1]
-        )
+        with trace.span('ndvi'):
+            valid_mask = PackedMask.from_scl(current_data[:,:,BAND['SCL']])
+            indices = self.ndvi_processor.calculate_indices(
+                current_data, config.DEFAULT_BANDS, tuple(dict.fromkeys(('NDVI',) + config.SPECTRAL_INDICES)),
+                valid_mask=valid_mask
+            )
+            current_ndvi = indices.pop('NDVI')
+        
+        # Bring the baseline store up to date, then read the multi-year composite
+        with trace.span('baseline'):
+            history = []
+            for when, baseline_data in fetched['baseline_scenes'].values():
+                if baseline_data is None:
+                    continue
+                if baseline_data.shape[:2] != current_data.shape[:2]:
+                    # Composites are per scene shape; this year's scene would never line up with today's
+                    print(f"Skipping {when.year} baseline scene: shape {baseline_data.shape[:2]} "
+                          f"differs from current {current_data.shape[:2]}")
+                    continue
+                baseline_scene_ndvi = self._scene_ndvi(baseline_data)
+                self.baseline_store.add_acquisition(lat, lon, when, baseline_scene_ndvi)
+                history.append((when, baseline_scene_ndvi))
+            
+            composite = self.baseline_store.composite(lat, lon, analysis_date, current_ndvi.shape)
+            if composite is None:
+                return {"error": "Could not fetch baseline satellite data"}
+            baseline_ndvi = composite[config.BASELINE_STATISTIC]
+            
+            # Today's acquisition becomes part of next year's baseline
+            self.baseline_store.add_acquisition(lat, lon, analysis_date, current_ndvi)
+        
+        with trace.span('timeseries'):
+            self._record_timeseries(lat, lon, history, analysis_date, current_ndvi)
         
         # Analyze for stress
         print("Detecting stress areas...")
-        stress_analysis = self.ndvi_processor.detect_stress_areas(
-            current_ndvi, baseline_ndvi
-        )
+        with trace.span('stress'):
+            stress_analysis = self.ndvi_processor.analyze_vegetation(
+                current_ndvi, baseline_ndvi, valid_mask=valid_mask
+            )
+        
+        # Summarise stressed pixels as ranked patches for maps and the API
+        with trace.span('hotspots'):
+            hotspots = self.ndvi_processor.extract_hotspots(
+                stress_analysis['stress_mask'], stress_analysis['stress_severity'], fetched['bbox']
+            )
         
         # Calculate statistics
-        current_stats = self.ndvi_processor.calculate_statistics(current_ndvi)
-        baseline_stats = self.ndvi_processor.calculate_statistics(baseline_ndvi)
+        with trace.span('stats'):
+            current_stats = self.ndvi_processor.calculate_statistics(current_ndvi, valid_mask=valid_mask)
+            baseline_stats = self.ndvi_processor.calculate_statistics(baseline_ndvi)
+            index_stats = {
+                name: self.ndvi_processor.calculate_statistics(raster, valid_mask=valid_mask,
+                                                               value_range=config.INDEX_VALUE_RANGES.get(name))
+                for name, raster in indices.items()
+            }
         
         # Generate report
-        report = self._generate_analysis_report(
-            region_name, current_stats, baseline_stats, stress_analysis
-        )
+        with trace.span('report'):
+            report = self._generate_analysis_report(
+                region_name, current_stats, baseline_stats, stress_analysis
+            )
         
-        return {
+        # Rasters stay as arrays; only scalar results go in the metadata
+        rasters = {
+            'current_ndvi': current_ndvi,
+            'baseline_ndvi': baseline_ndvi,
+            'stress_mask': stress_analysis['stress_mask'],
+            'stress_severity': stress_analysis['stress_severity'],
+            'classification': stress_analysis['classification'],
+            **{f"current_{name.lower()}": raster for name, raster in indices.items()}
+        }
+        
+        return AnalysisResult({
             'region_name': region_name,
-            'coordinates': {'lat': lat, 'lon': lon},
-            'analysis_date': current_end.isoformat(),
-            'current_ndvi': current_ndvi.tolist(),
-            'baseline_ndvi': baseline_ndvi.tolist(),
+            'coordinates': {'lat': fetched['lat'], 'lon': fetched['lon']},
+            'bbox': fetched['bbox'],
+            'analysis_date': analysis_date.isoformat(),
+            'masked_percentage': float((1 - valid_mask.valid_fraction()) * 100),
+            'baseline_years': composite['years'],
             'current_stats': current_stats,
             'baseline_stats': baseline_stats,
-            'stress_analysis': stress_analysis,
-            'report': report
-        }
+            'index_stats': index_stats,
+            'stress_analysis': {'stress_percentage': stress_analysis['stress_percentage']},
+            'class_counts': stress_analysis['class_counts'],
+            'health_status': health_status(stress_analysis['stress_percentage']),
+            'hotspots': hotspots,
+            'report': report,
+            'timings': trace.timings(),
+            'stage_metrics': trace.stages
+        }, rasters)
+    
+    def _estimate(self, region_name, fetched, stride):
+        """Approximate results from every `stride`-th pixel; None without any baseline or clear sampled pixel"""
+        current = fetched['current_data'][::stride, ::stride]
+        baseline_ndvi = self._baseline_overview(fetched, stride)
+        if baseline_ndvi is None:
+            return None
+        
+        valid_mask = PackedMask.from_scl(current[:,:,BAND['SCL']])
+        current_ndvi = self._scene_ndvi(current, valid_mask)
+        current_stats = self.ndvi_processor.calculate_statistics(current_ndvi, valid_mask=valid_mask)
+        if current_stats is None:
+            # Overview fully clouded; a finer stride or the full analysis may still see clear pixels
+            return None
+        baseline_stats = self.ndvi_processor.calculate_statistics(baseline_ndvi)
+        stress_analysis = self.ndvi_processor.analyze_vegetation(current_ndvi, baseline_ndvi, valid_mask=valid_mask)
+        
+        # Bounds as for a simple random sample of the clear pixels; the strided
+        # sample is systematic, so with clustered stress patches they are approximate
+        samples = valid_mask.count()
+        stress_bounds = [100 * bound for bound in
+                         wilson_interval(stress_analysis['stress_percentage'] / 100, samples)]
+        mean_margin = Z_95 * current_stats['std'] / math.sqrt(samples)
+        
+        return AnalysisResult({
+            'region_name': region_name,
+            'coordinates': {'lat': fetched['lat'], 'lon': fetched['lon']},
+            'bbox': fetched['bbox'],
+            'analysis_date': fetched['analysis_date'].isoformat(),
+            'progress': {'stride': stride, 'final': False, 'samples': int(samples)},
+            'masked_percentage': float((1 - valid_mask.valid_fraction()) * 100),
+            'current_stats': current_stats,
+            'current_mean_bounds': [current_stats['mean'] - mean_margin, current_stats['mean'] + mean_margin],
+            'baseline_stats': baseline_stats,
+            'stress_analysis': {
+                'stress_percentage': stress_analysis['stress_percentage'],
+                'stress_percentage_bounds': stress_bounds
+            },
+            'health_status': health_status(stress_analysis['stress_percentage']),
+            'health_status_bounds': [health_status(bound) for bound in stress_bounds]
+        })
+    
+    def _baseline_overview(self, fetched, stride):
+        """Strided baseline NDVI from the stored years plus raw scenes of the years not stored yet"""
+        layers = self.baseline_store.layers(fetched['lat'], fetched['lon'], fetched['analysis_date'],
+                                            fetched['current_data'].shape, stride)
+        for year, (when, baseline_data) in fetched['baseline_scenes'].items():
+            if baseline_data is None or year in layers or baseline_data.shape[:2] != fetched['current_data'].shape[:2]:
+                continue
+            layers[year] = self._scene_ndvi(baseline_data[::stride, ::stride])
+        if not layers:
+            return None
+        
+        reduce = np.nanmedian if config.BASELINE_STATISTIC == 'median' else np.nanmean
+        with warnings.catch_warnings():
+            # Pixels clouded in every year stay NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return reduce(np.stack(list(layers.values())), axis=0).astype(np.float32)
+    
+    def _scene_ndvi(self, scene, valid_mask=None):
+        """NDVI of a fetched scene with its clouds masked, computed like the current scene's.
+        
+        Every NDVI that is compared or composited goes through the same
+        band-math engine, so that baseline and current rasters follow one
+        convention (0/0 and masked pixels are NaN, no clipping).
+        """
+        if valid_mask is None:
+            valid_mask = PackedMask.from_scl(scene[:,:,BAND['SCL']])
+        return self.ndvi_processor.calculate_indices(scene, config.DEFAULT_BANDS, ('NDVI',),
+                                                     valid_mask=valid_mask)['NDVI']
+    
+    def _record_timeseries(self, lat, lon, history, analysis_date, current_ndvi):
+        """Append today's NDVI to the region's history, seeding a new series with the baseline scenes"""
+        if not self.timeseries_store.dates(lat, lon):
+            history = sorted(history, key=lambda item: item[0])
+        else:
+            history = []
+        try:
+            for when, ndvi in history + [(analysis_date, current_ndvi)]:
+                self.timeseries_store.append(lat, lon, when, ndvi)
+        except ValueError as e:
+            # The series is append-only; an older or differently sized scene is left out
+            print(f"Skipping time series update: {e}")
     
     def _generate_analysis_report(self, region_name, current_stats, baseline_stats, stress_analysis):
         """Generate plain language analysis report"""
@@ -105,3 +382,20 @@ class VegetationAnalyzer:
             report += "\n✓ RECOMMENDATION: Continue routine monitoring."
         
         return report
+
+
+def health_status(stress_percentage):
+    """Dashboard label for a stress coverage percentage"""
+    if stress_percentage < 15:
+        return "🟢 Healthy"
+    return "🟡 Moderate" if stress_percentage < 30 else "🔴 High Stress"
+
+
+def wilson_interval(fraction, samples, z=Z_95):
+    """(low, high) bounds of a proportion observed in `samples` draws; stays within [0, 1]"""
+    if not samples:
+        return (0.0, 1.0)
+    denominator = 1 + z * z / samples
+    centre = (fraction + z * z / (2 * samples)) / denominator
+    margin = z / denominator * math.sqrt(fraction * (1 - fraction) / samples + z * z / (4 * samples * samples))
+    return (max(0.0, centre - margin), min(1.0, centre + margin))
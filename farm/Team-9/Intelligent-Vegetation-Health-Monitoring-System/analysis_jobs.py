@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import date
+
+from analysis_engine import VegetationAnalyzer
+from config import config
+
+
+class AnalysisJobs:
+    """Memoised region analyses run on a background thread pool.
+
+    A job is identified by its region and day, so asking for the same
+    analysis again (a Streamlit rerun, a second client, a download)
+    returns the existing job instead of fetching and computing it again.
+    Finished results are kept for the `max_results` most recently used
+    jobs; failed jobs are retried on the next submit. Jobs run the
+    progressive analysis, so `estimate` has approximate results while a
+    job is still running.
+    """
+
+    def __init__(self, analyzer=None, max_workers=None, max_results=None):
+        self.analyzer = analyzer or VegetationAnalyzer()
+        self.max_results = max_results or config.SERVICE_MAX_RESULTS
+        self._executor = ThreadPoolExecutor(max_workers or config.SERVICE_WORKERS, thread_name_prefix='analysis')
+        self._jobs = OrderedDict()
+        self._npz = {}
+        self._estimates = {}
+        self._lock = threading.Lock()
+        self.counters = {'submitted': 0, 'memoised': 0, 'evicted': 0}
+
+    @staticmethod
+    def job_id(lat, lon, region_name, day=None):
+        """Stable id for one region's analysis on one day"""
+        day = day or date.today()
+        key = f"{lat:.4f}|{lon:.4f}|{region_name}|{day.isoformat()}"
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+    def submit(self, lat, lon, region_name="Unknown"):
+        """Start (or reuse) the analysis of a region; returns its job id"""
+        job_id = self.job_id(lat, lon, region_name)
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if future is not None and not _failed(future):
+                self._jobs.move_to_end(job_id)
+                self.counters['memoised'] += 1
+                return job_id
+
+            self._jobs[job_id] = self._executor.submit(self._run, job_id, lat, lon, region_name)
+            self.counters['submitted'] += 1
+            self._evict()
+        return job_id
+
+    def _run(self, job_id, lat, lon, region_name):
+        result = None
+        for result in self.analyzer.analyze_region_progressive(lat, lon, region_name):
+            if result.get('progress', {}).get('final') is False:
+                self._estimates[job_id] = result
+        self._estimates.pop(job_id, None)
+        return result
+
+    def _evict(self):
+        # Drop the least recently used finished jobs; running ones are always kept
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_results:
+                break
+            if self._jobs[job_id].done():
+                del self._jobs[job_id]
+                self._npz.pop(job_id, None)
+                self.counters['evicted'] += 1
+
+    def future(self, job_id):
+        """concurrent.futures.Future of a job; KeyError if unknown or evicted"""
+        with self._lock:
+            return self._jobs[job_id]
+
+    def status(self, job_id):
+        """'queued', 'running', 'done', 'failed', or 'not_found' for unknown and evicted jobs"""
+        try:
+            future = self.future(job_id)
+        except KeyError:
+            return 'not_found'
+        if not future.done():
+            return 'running' if future.running() else 'queued'
+        return 'failed' if _failed(future) else 'done'
+
+    def result(self, job_id, timeout=None):
+        """AnalysisResult, or a dict with an 'error' key, waiting up to `timeout` seconds.
+        
+        Unknown and evicted jobs give an error dict with 'status': 'not_found'.
+        """
+        try:
+            future = self.future(job_id)
+        except KeyError:
+            return {'error': f"Unknown analysis {job_id} (never submitted or evicted)", 'status': 'not_found'}
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise
+        except Exception as e:
+            return {'error': f"Analysis failed: {e}"}
+
+    def estimate(self, job_id):
+        """Latest approximate result of a running job (see analyze_region_progressive), or None"""
+        return self._estimates.get(job_id)
+
+    def npz_bytes(self, job_id):
+        """Raster archive of a finished job, encoded once"""
+        if job_id not in self._npz:
+            self._npz[job_id] = self.result(job_id).to_npz_bytes()
+        return self._npz[job_id]
+
+    def stats(self):
+        with self._lock:
+            states = [('running' if not f.done() else 'finished') for f in self._jobs.values()]
+        return dict(self.counters, jobs=len(states), running=states.count('running'))
+
+
+def _failed(future):
+    return future.done() and (future.exception() is not None or 'error' in future.result())
@@ -0,0 +1,106 @@
+import io
+import json
+import math
+import os
+
+import numpy as np
+
+
+class AnalysisResult:
+    """Output of VegetationAnalyzer with rasters kept out of Python lists.
+
+    Scalar results (stats, report, timings...) live in `metadata`. Rasters
+    are stored as ndarrays, or as loaders that are only called the first
+    time a raster is read, e.g. entries of an .npz archive or memory-mapped
+    .npy files. Indexing works like the old result dict, so
+    `result['report']` and `result['current_ndvi']` both still work.
+    """
+
+    RASTERS = ('current_ndvi', 'baseline_ndvi', 'stress_mask', 'stress_severity', 'classification')
+
+    def __init__(self, metadata, rasters=None):
+        self.metadata = metadata
+        self._rasters = dict(rasters or {})
+
+    def __getitem__(self, key):
+        if key in self._rasters:
+            return self.raster(key)
+        return self.metadata[key]
+
+    def __contains__(self, key):
+        return key in self._rasters or key in self.metadata
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(self.metadata) + list(self._rasters)
+
+    @property
+    def raster_names(self):
+        return list(self._rasters)
+
+    def raster(self, name):
+        """Return a raster, loading it on first access"""
+        value = self._rasters[name]
+        if callable(value):
+            value = value()
+            self._rasters[name] = value
+        return value
+
+    def is_loaded(self, name):
+        return not callable(self._rasters[name])
+
+    def to_document(self):
+        """Metadata plus raster names as plain JSON types; NaN and infinities become None"""
+        document = dict(self.metadata)
+        document['rasters'] = list(self._rasters)
+        return _json_safe(document)
+
+    def to_json(self, **kwargs):
+        """Metadata as strict JSON (no bare NaN, which JSON.parse rejects); rasters are only listed by name"""
+        return json.dumps(self.to_document(), default=str, allow_nan=False, **kwargs)
+
+    def to_npz(self, file, compressed=True):
+        """Write rasters plus JSON metadata to an .npz archive (path or file object)"""
+        save = np.savez_compressed if compressed else np.savez
+        metadata = np.frombuffer(json.dumps(self.metadata, default=str).encode(), dtype=np.uint8)
+        save(file, metadata=metadata, **{name: self.raster(name) for name in self._rasters})
+
+    def to_npz_bytes(self, compressed=True):
+        buffer = io.BytesIO()
+        self.to_npz(buffer, compressed=compressed)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_npz(cls, file):
+        """Open an archive written by to_npz; rasters are decoded lazily"""
+        archive = np.load(file)
+        metadata = json.loads(archive['metadata'].tobytes().decode())
+        rasters = {
+            name: (lambda name=name: archive[name])
+            for name in archive.files if name != 'metadata'
+        }
+        return cls(metadata, rasters)
+
+    def spill(self, directory):
+        """Move rasters to .npy files and keep memory-mapped handles instead"""
+        os.makedirs(directory, exist_ok=True)
+        for name in list(self._rasters):
+            path = os.path.join(directory, f"{name}.npy")
+            np.save(path, self.raster(name))
+            self._rasters[name] = lambda path=path: np.load(path, mmap_mode='r')
+        return self
+
+
+def _json_safe(value):
+    """Copy of nested dicts/lists with numpy scalars as Python numbers and non-finite floats as None"""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
@@ -0,0 +1,142 @@
+"""Headless HTTP API around VegetationAnalyzer.
+
+    uvicorn analysis_service:app --port 8000
+
+POST /analyses starts (or reuses) the analysis of a region and returns a
+job id; GET /analyses/{job_id} returns its status, the latest estimate
+while it runs and, once done, the result metadata (404 once the job is
+evicted). Reports and raster archives are served from the stored
+result, so clients (app.py, the React frontend) never trigger a
+recomputation by re-reading them. GET /metrics exposes per-stage timings
+for Prometheus.
+"""
+import asyncio
+import json
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel
+
+from analysis_jobs import AnalysisJobs
+from config import config
+from instrumentation import metrics
+from tile_pyramid import TilePyramid, pyramid_dir
+
+app = FastAPI(title="Vegetation Health Analysis Service")
+app.add_middleware(CORSMiddleware, allow_origins=config.SERVICE_CORS_ORIGINS.split(','),
+                   allow_methods=['*'], allow_headers=['*'])
+
+jobs = AnalysisJobs()
+
+# NDVI layers that can be served as map tiles, and their pyramids by (job, layer)
+TILE_LAYERS = ('current_ndvi', 'baseline_ndvi')
+pyramids = {}
+
+
+class AnalysisRequest(BaseModel):
+    lat: float
+    lon: float
+    region_name: str = "Unknown"
+
+
+def _not_found(job_id):
+    return HTTPException(status_code=404, detail=f"Unknown analysis {job_id} (never submitted or evicted)")
+
+
+def _future(job_id):
+    try:
+        return jobs.future(job_id)
+    except KeyError:
+        raise _not_found(job_id)
+
+
+def _finished(job_id):
+    """Result of a finished, successful job or an HTTP error"""
+    future = _future(job_id)
+    if not future.done():
+        raise HTTPException(status_code=409, detail="Analysis still running")
+    result = jobs.result(job_id)
+    if result.get('status') == 'not_found':
+        raise _not_found(job_id)
+    if 'error' in result:
+        raise HTTPException(status_code=422, detail=result['error'])
+    return result
+
+
+@app.post("/analyses", status_code=202)
+async def submit_analysis(request: AnalysisRequest):
+    job_id = jobs.submit(request.lat, request.lon, request.region_name)
+    return {"job_id": job_id, "status": jobs.status(job_id)}
+
+
+@app.get("/analyses/{job_id}")
+async def get_analysis(job_id: str, wait: float = 0.0):
+    """Status and, when done, metadata; `wait` long-polls up to that many seconds"""
+    future = _future(job_id)
+    if wait > 0 and not future.done():
+        # shield: a client giving up must not cancel the shared job
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), wait)
+        except (asyncio.TimeoutError, Exception):
+            pass
+
+    # The job may have been evicted while we waited
+    status = jobs.status(job_id)
+    if status == 'not_found':
+        raise _not_found(job_id)
+    if status in ('done', 'failed'):
+        result = jobs.result(job_id)
+        if result.get('status') == 'not_found':
+            raise _not_found(job_id)
+        if 'error' in result:
+            return {"job_id": job_id, "status": 'failed', "error": result['error']}
+        return _json_response({"job_id": job_id, "status": 'done', "result": result.to_document()})
+    estimate = jobs.estimate(job_id)
+    if estimate is not None:
+        return _json_response({"job_id": job_id, "status": status, "estimate": estimate.to_document()})
+    return {"job_id": job_id, "status": status}
+
+
+def _json_response(document):
+    # Strict JSON (no bare NaN) in one dumps call; FastAPI's encoder would walk the whole result again
+    return Response(json.dumps(document, default=str, allow_nan=False), media_type="application/json")
+
+
+@app.get("/analyses/{job_id}/report", response_class=PlainTextResponse)
+async def get_report(job_id: str):
+    return _finished(job_id)['report']
+
+
+@app.get("/analyses/{job_id}/rasters.npz")
+async def get_rasters(job_id: str):
+    _finished(job_id)
+    return Response(jobs.npz_bytes(job_id), media_type="application/octet-stream")
+
+
+@app.get("/analyses/{job_id}/tiles/{layer}/{z}/{x}/{y}.png")
+def get_tile(job_id: str, layer: str, z: int, x: int, y: int):
+    """XYZ map tile of an NDVI layer; tiles are rendered once and cached on disk"""
+    if layer not in TILE_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown layer {layer}, use {TILE_LAYERS}")
+    pyramid = pyramids.get((job_id, layer))
+    if pyramid is None:
+        result = _finished(job_id)
+        pyramid = TilePyramid(result[layer], result['bbox'], pyramid_dir(result[layer], result['bbox']))
+        pyramids[(job_id, layer)] = pyramid
+        # Overviews stay in memory for recent results only; tiles remain on disk
+        while len(pyramids) > config.SERVICE_MAX_RESULTS:
+            pyramids.pop(next(iter(pyramids)))
+    return Response(pyramid.tile(z, x, y), media_type="image/png",
+                    headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", **jobs.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage analysis timings in Prometheus text format"""
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,10 @@
+import base64
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
-import plotly.graph_objects as go
-import numpy as np
-import pandas as pd
-from analysis_engine import VegetationAnalyzer
 from config import config
 
+# Map, chart and analysis libraries are imported where they are first
+# used, so the welcome screen renders without loading any of them
+
 # Page configuration
 st.set_page_config(
     page_title="Vegetation Health Monitor",
@@ -15,12 +13,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize analyzer
+# Analyses run in analysis_service.py when ANALYSIS_SERVICE_URL is set,
+# otherwise on an in-process job pool shared by every session
 @st.cache_resource
-def load_analyzer():
-    return VegetationAnalyzer()
-
-analyzer = load_analyzer()
+def load_jobs():
+    if config.ANALYSIS_SERVICE_URL:
+        from analysis_client import AnalysisClient
+        return AnalysisClient(config.ANALYSIS_SERVICE_URL)
+    from analysis_jobs import AnalysisJobs
+    return AnalysisJobs()
 
 # Main application
 def main():
@@ -52,15 +53,20 @@ def main():
         
         # Analysis button
         if st.button("🔍 Analyze Region", type="primary"):
-            st.session_state.analysis_requested = True
-            st.session_state.analysis_coords = (lat, lon, region_name)
+            st.session_state.analysis_job = load_jobs().submit(lat, lon, region_name)
+            st.session_state.analysis_region = region_name
+            st.session_state.analysis_results = {}
     
     # Main content
-    if hasattr(st.session_state, 'analysis_requested') and st.session_state.analysis_requested:
-        lat, lon, region_name = st.session_state.analysis_coords
+    if 'analysis_job' in st.session_state:
+        job_id = st.session_state.analysis_job
         
-        with st.spinner(f"Analyzing {region_name}..."):
-            results = analyzer.analyze_region(lat, lon, region_name)
+        # Reruns (tab switches, downloads) reuse the result fetched for this job
+        results = st.session_state.get('analysis_results', {}).get(job_id)
+        if results is None:
+            with st.spinner(f"Analyzing {st.session_state.analysis_region}..."):
+                results = wait_for_result(job_id)
+            st.session_state.analysis_results = {job_id: results}
         
         if 'error' in results:
             st.error(f"Analysis failed: {results['error']}")
@@ -69,6 +75,49 @@ def main():
     else:
         display_welcome_screen()
 
+def wait_for_result(job_id):
+    """Final result of a job, showing its coarse-to-fine estimates in place until then"""
+    from concurrent.futures import TimeoutError as FutureTimeout
+    
+    jobs = load_jobs()
+    placeholder = st.empty()
+    shown = None
+    while True:
+        try:
+            results = jobs.result(job_id, timeout=0.2)
+            break
+        except (TimeoutError, FutureTimeout):
+            estimate = jobs.estimate(job_id)
+            if estimate is not None and estimate['progress'] != shown:
+                with placeholder.container():
+                    display_estimate(estimate)
+                shown = estimate['progress']
+    placeholder.empty()
+    return results
+
+def display_estimate(estimate):
+    """Approximate overview metrics of a running analysis, with 95% bounds"""
+    progress = estimate['progress']
+    st.info(f"⏳ Preliminary estimate from every {progress['stride']}th pixel "
+            f"({progress['samples']:,} samples), refining to full resolution...")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        low, high = estimate['current_mean_bounds']
+        st.metric("Current NDVI (estimate)", f"{estimate['current_stats']['mean']:.3f}")
+        st.caption(f"95% range {low:.3f} – {high:.3f}")
+    
+    with col2:
+        low, high = estimate['stress_analysis']['stress_percentage_bounds']
+        st.metric("Stress Coverage (estimate)", f"{estimate['stress_analysis']['stress_percentage']:.1f}%")
+        st.caption(f"95% range {low:.1f}% – {high:.1f}%")
+    
+    with col3:
+        st.metric("Health Status (estimate)", estimate['health_status'])
+        statuses = sorted(set(estimate['health_status_bounds']) - {estimate['health_status']})
+        if statuses:
+            st.caption(f"Could still be {' or '.join(statuses)}")
+
 def display_welcome_screen():
     """Display welcome screen with instructions"""
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -140,13 +189,37 @@ def display_overview(results):
         )
     
     with col4:
-        health_status = "🟢 Healthy" if stress_analysis['stress_percentage'] < 15 else "🟡 Moderate" if stress_analysis['stress_percentage'] < 30 else "🔴 High Stress"
-        st.metric("Health Status", health_status)
+        st.metric("Health Status", results['health_status'])
+
+    display_timings(results)
+
+def display_timings(results):
+    """Per-stage processing time of the analysis"""
+    stage_metrics = results.get('stage_metrics') or {
+        stage: {'wall_s': seconds} for stage, seconds in results.get('timings', {}).items()
+    }
+    if not stage_metrics:
+        return
+    
+    import pandas as pd
+
+    total = sum(values['wall_s'] for values in stage_metrics.values())
+    with st.expander(f"⏱️ Processing time: {total * 1000:.0f} ms"):
+        timings_df = pd.DataFrame({
+            'Stage': list(stage_metrics),
+            'Wall (ms)': [values['wall_s'] * 1000 for values in stage_metrics.values()],
+            'CPU (ms)': [values.get('cpu_s', float('nan')) * 1000 for values in stage_metrics.values()],
+            'Peak memory (MB)': [(values.get('peak_bytes') or float('nan')) / 1024**2 for values in stage_metrics.values()]
+        })
+        st.dataframe(timings_df.dropna(axis=1, how='all'), use_container_width=True, hide_index=True)
 
 def display_ndvi_map(results):
     """Display NDVI visualization map"""
     st.subheader("🗺️ NDVI Visualization")
     
+    import folium
+    from streamlit_folium import st_folium
+    
     lat, lon = results['coordinates']['lat'], results['coordinates']['lon']
     
     # Create map
@@ -159,27 +232,64 @@ def display_ndvi_map(results):
         icon=folium.Icon(color='red', icon='info-sign')
     ).add_to(m)
     
-    # Add NDVI overlay (simplified visualization)
-    current_ndvi = np.array(results['current_ndvi'])
+    # NDVI overlay: map tiles from the service, or one downsampled PNG in-process
+    bbox = results['bbox']
+    bounds = [[bbox['min_lat'], bbox['min_lon']], [bbox['max_lat'], bbox['max_lon']]]
+    job_id = st.session_state.analysis_job
     
-    # Create color overlay based on NDVI values
-    bounds = [[lat-0.05, lon-0.05], [lat+0.05, lon+0.05]]
+    if config.ANALYSIS_SERVICE_URL:
+        # The browser only fetches the tiles of the current viewport
+        folium.TileLayer(
+            tiles=f"{config.ANALYSIS_SERVICE_URL.rstrip('/')}/analyses/{job_id}/tiles/current_ndvi/{{z}}/{{x}}/{{y}}.png",
+            attr="NDVI analysis",
+            name="Current NDVI",
+            overlay=True,
+            opacity=0.7,
+            bounds=bounds
+        ).add_to(m)
+    else:
+        folium.raster_layers.ImageOverlay(
+            image=f"data:image/png;base64,{ndvi_overlay(job_id, results['current_ndvi'], bbox)}",
+            bounds=bounds,
+            name="Current NDVI",
+            opacity=0.7
+        ).add_to(m)
     
     folium.Rectangle(
         bounds=bounds,
         color='green',
-        fill=True,
-        fillOpacity=0.3,
+        fill=False,
         popup="NDVI Analysis Area"
     ).add_to(m)
     
+    # Outline the worst stress hotspots
+    for hotspot in results.get('hotspots', [])[:10]:
+        folium.Rectangle(
+            bounds=hotspot['bounds'],
+            color='red',
+            weight=2,
+            fill=True,
+            fillOpacity=0.2,
+            popup=(f"Hotspot #{hotspot['rank']}: {hotspot['area_km2']:.2f} km², "
+                   f"mean severity {hotspot['mean_severity']:.2f}")
+        ).add_to(m)
+    
     # Display map
     st_folium(m, width=700, height=500)
 
+@st.cache_data
+def ndvi_overlay(job_id, _ndvi, _bbox):
+    """Base64 PNG of the NDVI raster, at most 512 px across; one per job"""
+    from tile_pyramid import TilePyramid
+    return base64.b64encode(TilePyramid(_ndvi, _bbox).overview_png()).decode()
+
 def display_statistics(results):
     """Display detailed statistics"""
     st.subheader("📈 NDVI Statistics Comparison")
     
+    import pandas as pd
+    import plotly.graph_objects as go
+    
     current_stats = results['current_stats']
     baseline_stats = results['baseline_stats']
     
@@ -226,7 +336,7 @@ def display_report(results):
     )
     
     # Download options
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         if st.button("📄 Download Report as Text"):
@@ -239,14 +349,22 @@ def display_report(results):
     
     with col2:
         if st.button("📊 Download Data as JSON"):
-            import json
-            json_data = json.dumps(results, indent=2, default=str)
+            json_data = results.to_json(indent=2)
             st.download_button(
                 label="Download",
                 data=json_data,
                 file_name=f"vegetation_data_{results['region_name'].replace(' ', '_')}.json",
                 mime="application/json"
             )
+    
+    with col3:
+        if st.button("🗂️ Download NDVI Rasters (.npz)"):
+            st.download_button(
+                label="Download",
+                data=results.to_npz_bytes(),
+                file_name=f"vegetation_rasters_{results['region_name'].replace(' ', '_')}.npz",
+                mime="application/octet-stream"
+            )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,183 @@
+"""Fused evaluation of spectral index expressions over a stacked scene.
+
+    engine = BandMath(('NDVI', 'EVI', 'SAVI', 'NDWI'))
+    indices = engine.evaluate(scene, bands=('B02', 'B03', 'B04', 'B08', 'SCL'))
+
+Expressions are plain arithmetic over band names (B04, or the aliases
+RED, NIR...). They are parsed with `ast`, and sub-expressions shared by
+several indices (NIR - RED appears in three of the four defaults) are
+computed once. The result is a flat program of NumPy ufunc calls with
+preallocated outputs. Evaluation walks the scene tile by tile. Each
+needed band is converted to float32 reflectance once per tile, into a
+contiguous band-major buffer. The whole program then runs on that buffer
+and writes every index in the same sweep.
+
+Results follow plain float arithmetic: 0/0 and masked pixels are NaN and
+nothing is clipped. The analyzer computes every NDVI it compares (current,
+baseline and overview scenes) here, so they share that convention.
+
+Fusing wins clearly from about 512x512 up: 1.3-1.5x at 512 px and 2x or
+more from 2048 px (benchmarks/bench_band_math.py). At 256x256 and below
+the scene is a single tile, both approaches take about a millisecond and
+the difference (0.7-1.5x between runs) is noise rather than a trend.
+"""
+import ast
+
+import numpy as np
+
+from config import config
+
+INDEX_EXPRESSIONS = {
+    'NDVI': '(NIR - RED) / (NIR + RED)',
+    'EVI': '2.5 * (NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1)',
+    'SAVI': '1.5 * (NIR - RED) / (NIR + RED + 0.5)',
+    'NDWI': '(GREEN - NIR) / (GREEN + NIR)',
+}
+BAND_ALIASES = {'BLUE': 'B02', 'GREEN': 'B03', 'RED': 'B04', 'NIR': 'B08', 'SWIR': 'B11'}
+# Digital numbers -> surface reflectance, which EVI and SAVI constants assume
+REFLECTANCE_SCALE = 10000
+
+_OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+class BandMath:
+    """Index expressions compiled into one fused, tiled evaluation"""
+
+    def __init__(self, indices, tile_size=None):
+        """`indices` is a list of names from INDEX_EXPRESSIONS, or a mapping of name -> expression"""
+        if not isinstance(indices, dict):
+            indices = {name: INDEX_EXPRESSIONS[name] for name in indices}
+        self.expressions = dict(indices)
+        self.tile_size = tile_size or config.KERNEL_TILE_SIZE
+        self.bands = []
+        self.program = []
+        self.registers = 0
+        self.outputs = {}
+        self._nodes = {}
+        for name, expression in self.expressions.items():
+            self.outputs[name] = self._compile(ast.parse(expression, mode='eval').body, expression)
+        self._allocate()
+
+    def _compile(self, node, expression):
+        """Operand for an AST node: ('band', i), ('const', value) or ('reg', i); shared nodes compile once"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return ('const', float(node.value))
+        if isinstance(node, ast.Name):
+            band = BAND_ALIASES.get(node.id, node.id)
+            if band not in self.bands:
+                self.bands.append(band)
+            return ('band', self.bands.index(band))
+
+        key = ast.dump(node)
+        if key in self._nodes:
+            return self._nodes[key]
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            operands = (self._compile(node.left, expression), self._compile(node.right, expression))
+            ufunc = _OPERATORS[type(node.op)]
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operands = (self._compile(node.operand, expression),)
+            ufunc = np.negative
+        else:
+            raise ValueError(f"Unsupported syntax in index expression {expression!r}: {ast.unparse(node)}")
+
+        if all(kind == 'const' for kind, _ in operands):
+            result = ('const', float(ufunc(*(value for _, value in operands))))
+        else:
+            result = ('reg', self.registers)
+            self.registers += 1
+            self.program.append((ufunc, operands, result[1]))
+        self._nodes[key] = result
+        return result
+
+    def _allocate(self):
+        """Map intermediates onto as few scratch buffers as possible (linear scan over the program)"""
+        end = len(self.program)
+        last_use = {index: end for kind, index in self.outputs.values() if kind == 'reg'}
+        for step, (_, operands, _) in enumerate(self.program):
+            for kind, index in operands:
+                if kind == 'reg':
+                    last_use[index] = max(last_use.get(index, step), step)
+
+        slots, free, program, count = {}, [], [], 0
+        for step, (ufunc, operands, register) in enumerate(self.program):
+            # Inputs dead after this step free their buffer first: elementwise ufuncs may write in place
+            for kind, index in set(operands):
+                if kind == 'reg' and last_use[index] == step:
+                    free.append(slots[index])
+            if free:
+                slots[register] = free.pop()
+            else:
+                slots[register] = count
+                count += 1
+            operands = tuple((kind, slots[index] if kind == 'reg' else index) for kind, index in operands)
+            program.append((ufunc, operands, slots[register]))
+        self.program = program
+        self.outputs = {name: (kind, slots[index] if kind == 'reg' else index) for name, (kind, index) in self.outputs.items()}
+        self.registers = count
+
+    def evaluate(self, scene, bands=None, valid_mask=None, scale=REFLECTANCE_SCALE):
+        """Dict of float32 index rasters for a (height, width, channels) scene.
+
+        `bands` names the scene's channels (config.DEFAULT_BANDS by default).
+        Pixels that are masked in the PackedMask `valid_mask`, or where an
+        index is not finite (for example 0/0), come out as NaN. Tiles with
+        no clear pixel are skipped.
+        """
+        bands = tuple(bands or config.DEFAULT_BANDS)
+        missing = [band for band in self.bands if band not in bands]
+        if missing:
+            raise ValueError(f"Scene has no {', '.join(missing)} band for {', '.join(self.expressions)}")
+        channels = [bands.index(band) for band in self.bands]
+        height, width = scene.shape[:2]
+        outputs = {name: np.empty((height, width), dtype=np.float32) for name in self.outputs}
+
+        # Scratch buffers shared by all tiles: band-major inputs, one register per intermediate
+        tile_shape = (min(self.tile_size, height), min(self.tile_size, width))
+        band_buf = np.empty((len(self.bands), *tile_shape), dtype=np.float32)
+        reg_buf = np.empty((self.registers, *tile_shape), dtype=np.float32)
+        flag_buf = np.empty(tile_shape, dtype=bool)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for row in range(0, height, self.tile_size):
+                for col in range(0, width, self.tile_size):
+                    rows = slice(row, min(row + self.tile_size, height))
+                    cols = slice(col, min(col + self.tile_size, width))
+                    if valid_mask is not None and not valid_mask.any(rows, cols):
+                        for out in outputs.values():
+                            out[rows, cols] = np.nan
+                        continue
+                    self._evaluate_tile(scene, channels, rows, cols, scale, band_buf, reg_buf,
+                                        flag_buf, valid_mask, outputs)
+        return outputs
+
+    def _evaluate_tile(self, scene, channels, rows, cols, scale, band_buf, reg_buf, flag_buf, valid_mask, outputs):
+        h, w = rows.stop - rows.start, cols.stop - cols.start
+        band_tile, reg_tile, flags = band_buf[:, :h, :w], reg_buf[:, :h, :w], flag_buf[:h, :w]
+
+        for i, channel in enumerate(channels):
+            np.multiply(scene[rows, cols, channel], np.float32(1 / scale), out=band_tile[i], casting='unsafe')
+
+        def value(operand):
+            kind, index = operand
+            if kind == 'const':
+                return np.float32(index)
+            return band_tile[index] if kind == 'band' else reg_tile[index]
+
+        for ufunc, operands, register in self.program:
+            ufunc(*(value(operand) for operand in operands), out=reg_tile[register])
+
+        valid = valid_mask.unpack(rows, cols) if valid_mask is not None else None
+        for name, operand in self.outputs.items():
+            out = outputs[name][rows, cols]
+            np.copyto(out, value(operand))
+            # NaN wherever the pixel is masked or the index is not finite
+            np.isfinite(out, out=flags)
+            if valid is not None:
+                np.logical_and(flags, valid, out=flags)
+            np.logical_not(flags, out=flags)
+            np.copyto(out, np.nan, where=flags)
+
+
+def compute_indices(scene, bands=None, indices=None, valid_mask=None):
+    """One-off fused evaluation of named indices (all of INDEX_EXPRESSIONS by default)"""
+    return BandMath(indices or tuple(INDEX_EXPRESSIONS)).evaluate(scene, bands, valid_mask)
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import warnings
+from datetime import date
+
+import numpy as np
+from config import config
+
+
+class BaselineStore:
+    """Multi-year NDVI baseline composites, persisted per region and season.
+
+    The year is split into windows of `window_days` days of year. For every
+    region, scene shape and window the store keeps one NDVI layer per year, the running
+    mean of all acquisitions seen for that year, updated incrementally.
+    Each pixel is averaged over the acquisitions where it was clear (finite
+    NDVI), with its count kept next to the layer; pixels never seen clear
+    stay NaN.
+    The baseline for a date is the per-pixel mean/median/std over the
+    previous `years` layers. It is cached next to the layers until one of
+    them changes. Scenes of another size (a different scene_size or local
+    raster resolution) get a baseline of their own.
+
+    Layout:
+        <root>/<region>/<height>x<width>/doy<window>/<year>.npy
+        <root>/<region>/<height>x<width>/doy<window>/<year>_count.npy
+        <root>/<region>/<height>x<width>/doy<window>/index.json
+        <root>/<region>/<height>x<width>/doy<window>/composite_<first>-<last>.npz
+    """
+
+    STATISTICS = ('mean', 'median', 'std')
+
+    def __init__(self, root=None, years=None, window_days=None, grid_deg=None):
+        self.root = os.path.expanduser(root or config.BASELINE_STORE_DIR)
+        self.years = years or config.BASELINE_YEARS
+        self.window_days = window_days or config.BASELINE_WINDOW_DAYS
+        self.grid_deg = grid_deg or config.TILE_CACHE_GRID_DEG
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def region_key(self, lat, lon):
+        """Directory name for a location snapped to the grid"""
+        return region_key(lat, lon, self.grid_deg)
+
+    def window(self, when):
+        """Day-of-year window index for a date"""
+        # Count days on a non-leap calendar so a date maps to the same window every year
+        day = min(when.day, 28) if when.month == 2 else when.day
+        day_of_year = date(2001, when.month, day).timetuple().tm_yday
+        return (day_of_year - 1) // self.window_days
+
+    def baseline_years(self, when):
+        """Years that make up the baseline for a date"""
+        return list(range(when.year - self.years, when.year))
+
+    def _window_dir(self, lat, lon, when, shape):
+        height, width = shape[:2]
+        return os.path.join(self.root, self.region_key(lat, lon), f"{height}x{width}", f"doy{self.window(when):03d}")
+
+    def _read_index(self, directory):
+        try:
+            with open(os.path.join(directory, 'index.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def missing_years(self, lat, lon, when, shape):
+        """Baseline years with no acquisition of this scene shape stored yet"""
+        index = self._read_index(self._window_dir(lat, lon, when, shape))
+        return [year for year in self.baseline_years(when) if str(year) not in index]
+
+    def add_acquisition(self, lat, lon, when, ndvi, acquisition_id=None):
+        """Fold one NDVI acquisition into its year layer.
+
+        Returns False if this acquisition was already stored; re-running an
+        analysis on the same data does not bias the composite.
+        """
+        ndvi = np.asarray(ndvi, dtype=np.float32)
+        directory = self._window_dir(lat, lon, when, ndvi.shape)
+        acquisition_id = acquisition_id or when.strftime('%Y-%m-%d')
+        year = str(when.year)
+
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            index = self._read_index(directory)
+            entry = index.setdefault(year, {'count': 0, 'acquisitions': []})
+            if acquisition_id in entry['acquisitions']:
+                return False
+
+            layer_path = os.path.join(directory, f"{year}.npy")
+            count_path = os.path.join(directory, f"{year}_count.npy")
+            if entry['count'] == 0:
+                layer = np.full(ndvi.shape, np.nan, dtype=np.float32)
+                count = np.zeros(ndvi.shape, dtype=np.uint16)
+            else:
+                layer = np.load(layer_path)
+                if os.path.exists(count_path):
+                    count = np.load(count_path)
+                else:
+                    # Layers written before per-pixel counts existed
+                    count = np.where(np.isfinite(layer), entry['count'], 0).astype(np.uint16)
+
+            # Per-pixel running mean over clear acquisitions: layer += (ndvi - layer) / n
+            ok = np.isfinite(ndvi)
+            count[ok] += 1
+            layer[ok] = np.where(count[ok] == 1, ndvi[ok], layer[ok] + (ndvi[ok] - layer[ok]) / count[ok])
+
+            np.save(layer_path, layer)
+            np.save(count_path, count)
+            entry['count'] += 1
+            entry['acquisitions'].append(acquisition_id)
+            self._write_index(directory, index)
+
+            # Any cached composite that includes this year is now stale
+            for name in os.listdir(directory):
+                if name.startswith('composite_'):
+                    first, last = name[len('composite_'):-len('.npz')].split('-')
+                    if int(first) <= when.year <= int(last):
+                        os.remove(os.path.join(directory, name))
+
+        return True
+
+    def _write_index(self, directory, index):
+        tmp_path = os.path.join(directory, 'index.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(directory, 'index.json'))
+
+    def layers(self, lat, lon, when, shape, stride=1):
+        """{year: NDVI layer} of the stored baseline years for a date, as strided memory-mapped views"""
+        directory = self._window_dir(lat, lon, when, shape)
+        layers = {}
+        for year in self.baseline_years(when):
+            path = os.path.join(directory, f"{year}.npy")
+            if os.path.exists(path):
+                layers[year] = np.load(path, mmap_mode='r')[::stride, ::stride]
+        return layers
+
+    def composite(self, lat, lon, when, shape):
+        """Per-pixel mean/median/std over the baseline years of scenes of this shape, or None if no year is stored"""
+        directory = self._window_dir(lat, lon, when, shape)
+        years = [year for year in self.baseline_years(when)
+                 if os.path.exists(os.path.join(directory, f"{year}.npy"))]
+        if not years:
+            return None
+
+        composite_path = os.path.join(directory, f"composite_{years[0]}-{years[-1]}.npz")
+        with self._lock:
+            if os.path.exists(composite_path):
+                with np.load(composite_path) as cached:
+                    if list(cached['years']) == years:
+                        return self._as_dict(cached, years)
+
+            stack = np.stack([np.load(os.path.join(directory, f"{year}.npy"), mmap_mode='r') for year in years])
+            with warnings.catch_warnings():
+                # Pixels clouded in every year stay NaN
+                warnings.simplefilter('ignore', RuntimeWarning)
+                composite = {
+                    'mean': np.nanmean(stack, axis=0).astype(np.float32),
+                    'median': np.nanmedian(stack, axis=0).astype(np.float32),
+                    'std': np.nanstd(stack, axis=0).astype(np.float32)
+                }
+            np.savez(composite_path, years=np.array(years), **composite)
+
+        composite['years'] = years
+        return composite
+
+    def _as_dict(self, archive, years):
+        composite = {name: archive[name] for name in self.STATISTICS}
+        composite['years'] = years
+        return composite
+
+
+def region_key(lat, lon, grid_deg=None):
+    """Directory name for a location snapped to the grid, shared by the baseline and time-series stores"""
+    grid_deg = grid_deg or config.TILE_CACHE_GRID_DEG
+    return f"{round(lat / grid_deg) * grid_deg:.4f}_{round(lon / grid_deg) * grid_deg:.4f}"
+
+
+def same_day_in_year(when, year):
+    """Same calendar day in another year (Feb 29 falls back to Feb 28)"""
+    try:
+        return when.replace(year=year)
+    except ValueError:
+        return when.replace(year=year, day=28)
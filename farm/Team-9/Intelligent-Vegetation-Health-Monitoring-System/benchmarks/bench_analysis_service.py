@@ -0,0 +1,110 @@
+"""Load test of analysis_service.py: requests/s and latency percentiles.
+
+Usage: python benchmarks/bench_analysis_service.py [--regions 4] [--clients 8] [--requests 200] [--latency 0.2]
+
+Starts the service in-process on a free port (demo data, fresh baseline
+store), runs each region once cold, then has --clients threads each send
+--requests requests of one kind (re-submit, status + metadata, report,
+raster archive). For comparison, "rerun" is what every Streamlit rerun
+used to cost: a full analyze_region call. Demo fetches sleep for
+--latency seconds to stand in for the imagery provider.
+"""
+import argparse
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import uvicorn
+
+from common import print_table
+import analysis_service
+from analysis_engine import VegetationAnalyzer
+from analysis_jobs import AnalysisJobs
+from baseline_store import BaselineStore
+from satellite_data import SatelliteDataProcessor
+from timeseries_store import TimeSeriesStore
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def load(url, clients, count, method='get', body=None):
+    """Per-request latencies (s) and overall requests/s"""
+    def client(_):
+        session = requests.Session()
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            session.request(method, url, json=body).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = np.concatenate(list(pool.map(client, range(clients))))
+    return latencies, len(latencies) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        analyzer = VegetationAnalyzer(SatelliteDataProcessor(fetch_latency=args.latency, cache=False),
+                                      BaselineStore(tmp), TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+        analysis_service.jobs = AnalysisJobs(analyzer)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(analysis_service.app, port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        base = f"http://127.0.0.1:{port}"
+
+        regions = [{'lat': 26.0 + i * 0.1, 'lon': 92.0, 'region_name': f"Region {i}"} for i in range(args.regions)]
+        start = time.perf_counter()
+        job_ids = [requests.post(f"{base}/analyses", json=r).json()['job_id'] for r in regions]
+        for job_id in job_ids:
+            assert requests.get(f"{base}/analyses/{job_id}", params={'wait': 60}).json()['status'] == 'done'
+        cold = (time.perf_counter() - start) / len(regions)
+
+        start = time.perf_counter()
+        analyzer.analyze_region(regions[0]['lat'], regions[0]['lon'], regions[0]['region_name'])
+        rerun = time.perf_counter() - start
+
+        job_id = job_ids[0]
+        cases = [
+            ('POST /analyses (memoised)', f"{base}/analyses", 'post', regions[0]),
+            ('GET /analyses/{id}', f"{base}/analyses/{job_id}", 'get', None),
+            ('GET /analyses/{id}/report', f"{base}/analyses/{job_id}/report", 'get', None),
+            ('GET /analyses/{id}/rasters.npz', f"{base}/analyses/{job_id}/rasters.npz", 'get', None),
+        ]
+        rows = [('cold analysis (per region)', '-', f"{cold * 1000:.0f}", '-'),
+                ('rerun analyze_region', '-', f"{rerun * 1000:.0f}", '-')]
+        for name, url, method, body in cases:
+            latencies, rate = load(url, args.clients, args.requests, method, body)
+            rows.append((name, f"{rate:,.0f}", f"{np.percentile(latencies, 50) * 1000:.1f}",
+                         f"{np.percentile(latencies, 99) * 1000:.1f}"))
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    print(f"{args.clients} clients x {args.requests} requests, stats: {analysis_service.jobs.stats()}")
+    print_table(('request', 'req/s', 'p50 ms', 'p99 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
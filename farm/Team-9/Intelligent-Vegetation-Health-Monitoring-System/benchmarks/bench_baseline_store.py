@@ -0,0 +1,57 @@
+"""Per-request cost with the multi-year baseline store, cold versus warm.
+
+Usage: python benchmarks/bench_baseline_store.py [--requests 5] [--latency 0.1]
+
+The cold request has to fetch and composite BASELINE_YEARS of history;
+warm requests fetch only the current window. The tile cache is disabled
+so every fetch pays --latency seconds.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from common import print_table
+from analysis_engine import VegetationAnalyzer
+from baseline_store import BaselineStore
+from config import config
+from satellite_data import SatelliteDataProcessor
+from timeseries_store import TimeSeriesStore
+
+
+class CountingProcessor(SatelliteDataProcessor):
+    fetches = 0
+    
+    def _fetch_uncached(self, *args):
+        self.fetches += 1
+        return super()._fetch_uncached(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1)
+    args = parser.parse_args()
+    
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        processor = CountingProcessor(fetch_latency=args.latency, cache=False)
+        analyzer = VegetationAnalyzer(processor, BaselineStore(tmp), TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+        
+        for i in range(args.requests):
+            before = processor.fetches
+            start = time.perf_counter()
+            result = analyzer.analyze_region(26.1445, 91.7362, "Kamrup")
+            elapsed = time.perf_counter() - start
+            rows.append(('cold' if i == 0 else 'warm', processor.fetches - before,
+                         f"{elapsed * 1000:.0f}", f"{result['timings']['baseline'] * 1000:.1f}"))
+    
+    print(f"BASELINE_YEARS = {config.BASELINE_YEARS}, fetch latency {args.latency * 1000:.0f} ms")
+    print("Previous pipeline: 2 fetches + 2 NDVI computations on every request\n")
+    print_table(('request', 'fetches', 'total ms', 'baseline stage ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
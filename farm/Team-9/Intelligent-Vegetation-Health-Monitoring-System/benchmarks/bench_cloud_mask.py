@@ -0,0 +1,75 @@
+"""Compute saved by SCL cloud masking on partly clouded scenes.
+
+Usage: python benchmarks/bench_cloud_mask.py [--size 4096] [--cover 0 0.3 0.5 0.8] [--cloud-scale 4096]
+
+Runs NDVI, the numpy stress kernel and statistics on a synthetic scene
+with --cover of it under cloud. "unmasked" is the previous pipeline
+(cloud pixels computed like any other, and counted in the results);
+"masked" skips tiles without a clear pixel using the packed SCL mask.
+
+Only kernel tiles (config.KERNEL_TILE_SIZE) that are entirely under cloud
+can be skipped, so the cloud pattern repeats every --cloud-scale pixels
+(16 kernel tiles by default) whatever the scene size. Clouds drawn at the
+scale of the scene would be a handful of blobs smaller than one tile on
+small scenes, and nothing would be skipped.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import format_bytes, print_table
+from cloud_mask import PackedMask
+from config import config
+from ndvi_processor import NDVIProcessor, iter_tiles
+from synthetic_scene import generate_scene
+
+
+def synthetic_scene(size, cover, cloud_scale, seed=0):
+    scene = generate_scene(size, ('B04', 'B08', 'SCL'), cloud_cover=cover, cloud_scale=cloud_scale, seed=seed)
+    return scene[:, :, 0], scene[:, :, 1], scene[:, :, 2]
+
+
+def pipeline(processor, red, nir, baseline, scl=None):
+    start = time.perf_counter()
+    valid_mask = PackedMask.from_scl(scl) if scl is not None else None
+    ndvi = processor.calculate_ndvi(red, nir, valid_mask=valid_mask)
+    analysis = processor.analyze_vegetation(ndvi, baseline, engine='numpy', valid_mask=valid_mask)
+    stats = processor.calculate_statistics(ndvi, valid_mask=valid_mask)
+    return time.perf_counter() - start, analysis, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=4096)
+    parser.add_argument('--cover', type=float, nargs='+', default=[0.0, 0.3, 0.5, 0.8])
+    parser.add_argument('--cloud-scale', type=int, default=16 * config.KERNEL_TILE_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    processor = NDVIProcessor()
+    baseline = np.full((args.size, args.size), 0.55, dtype=np.float32)
+    tile = config.KERNEL_TILE_SIZE
+
+    rows = []
+    for cover in args.cover:
+        red, nir, scl = synthetic_scene(args.size, cover, args.cloud_scale)
+        valid_mask = PackedMask.from_scl(scl)
+        tiles = list(iter_tiles(scl.shape, tile))
+        skipped = sum(not valid_mask.any(r, c) for r, c in tiles)
+
+        unmasked = min(pipeline(processor, red, nir, baseline)[0] for _ in range(args.repeat))
+        masked, analysis, stats = min((pipeline(processor, red, nir, baseline, scl) for _ in range(args.repeat)),
+                                      key=lambda run: run[0])
+        rows.append((f"{cover:.0%}", f"{skipped}/{len(tiles)} ({skipped / len(tiles):.0%})", f"{unmasked * 1000:.0f}", f"{masked * 1000:.0f}",
+                     f"{1 - masked / unmasked:.0%}", f"{analysis['stress_percentage']:.1f}",
+                     f"{stats['mean']:.3f}" if stats else '-'))
+
+    print(f"{args.size}x{args.size} scene, {tile}px tiles, clouds repeating every {args.cloud_scale}px; "
+          f"valid-pixel mask {format_bytes(valid_mask.nbytes)} packed vs {format_bytes(args.size * args.size)} as bool\n")
+    print_table(['cloud', 'tiles skipped', 'unmasked ms', 'masked ms', 'saved', 'stress % (clear)', 'mean NDVI'],
+                rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Hotspot extraction time and output size on large synthetic stress masks.
+
+Usage: python benchmarks/bench_hotspots.py [--sizes 1024 4096] [--patches 500]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from common import measure, format_bytes, print_table
+from ndvi_processor import NDVIProcessor
+
+
+def synthetic_stress(size, patches, seed=0):
+    """Random elliptical stress patches plus salt noise"""
+    rng = np.random.default_rng(seed)
+    severity = np.zeros((size, size), dtype=np.float32)
+    y, x = np.ogrid[:size, :size]
+    for _ in range(patches):
+        cy, cx = rng.integers(0, size, 2)
+        ry, rx = rng.integers(2, max(3, size // 60), 2)
+        window = (slice(max(cy - ry, 0), cy + ry), slice(max(cx - rx, 0), cx + rx))
+        inside = ((y[window[0]] - cy) / ry) ** 2 + ((x[:, window[1]] - cx) / rx) ** 2 <= 1
+        severity[window][inside] = rng.uniform(0.2, 0.9)
+    noise = rng.random((size, size)) < 0.002
+    severity[noise] = 0.3
+    return severity > 0, severity
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096])
+    parser.add_argument('--patches', type=int, default=500)
+    args = parser.parse_args()
+    
+    processor = NDVIProcessor()
+    bbox = {'min_lon': 91.64, 'min_lat': 26.05, 'max_lon': 91.83, 'max_lat': 26.24}
+    rows = []
+    
+    for size in args.sizes:
+        mask, severity = synthetic_stress(size, args.patches)
+        seconds, peak, hotspots = measure(processor.extract_hotspots, mask, severity, bbox, repeat=3)
+        payload = len(json.dumps(hotspots))
+        rasters = mask.nbytes + severity.nbytes
+        rows.append((f"{size}^2", f"{mask.mean() * 100:.1f}%", len(hotspots), f"{seconds * 1000:.1f}",
+                     format_bytes(peak), format_bytes(payload), format_bytes(rasters)))
+    
+    print_table(('size', 'stressed', 'hotspots', 'time (ms)', 'peak alloc', 'JSON size', 'mask+severity'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Overhead of the per-stage instrumentation on analyze_region.
+
+Usage: python benchmarks/bench_instrumentation.py [--requests 20] [--size 1024]
+
+Each mode runs in a fresh interpreter, because instrumentation reads its
+settings from the environment at import: default (spans only), a JSONL
+log, tracemalloc peaks and cProfile dumps. Requests are warm (baseline
+years already stored) so the NumPy stages dominate.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import PROJECT_DIR, print_table
+
+WORKER = r'''
+import contextlib, io, json, os, sys, tempfile, time
+from analysis_engine import VegetationAnalyzer
+from baseline_store import BaselineStore
+from satellite_data import SatelliteDataProcessor
+from timeseries_store import TimeSeriesStore
+
+requests, size = int(sys.argv[1]), int(sys.argv[2])
+with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+    analyzer = VegetationAnalyzer(SatelliteDataProcessor(cache=False, scene_size=size, seed=0),
+                                  BaselineStore(tmp), TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+    analyzer.analyze_region(26.1445, 91.7362, 'Kamrup')
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        result = analyzer.analyze_region(26.1445, 91.7362, 'Kamrup')
+        samples.append(time.perf_counter() - start)
+print(json.dumps({'samples': samples, 'stages': result['stage_metrics']}))
+'''
+
+
+def run_mode(env, requests, size):
+    output = subprocess.run([sys.executable, '-c', WORKER, str(requests), str(size)], cwd=PROJECT_DIR,
+                            env=dict(os.environ, **env), capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--size', type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = [
+            ('spans only (default)', {}),
+            ('JSONL log', {'METRICS_LOG_PATH': os.path.join(tmp, 'metrics.jsonl')}),
+            ('tracemalloc peaks', {'METRICS_TRACE_MEMORY': '1'}),
+            ('cProfile dumps', {'PROFILE_DIR': os.path.join(tmp, 'profiles')}),
+        ]
+        rows = []
+        baseline = None
+        for name, env in modes:
+            run = run_mode(env, args.requests, args.size)
+            best = min(run['samples'])
+            baseline = baseline or best
+            peak = max((stage['peak_bytes'] or 0) for stage in run['stages'].values())
+            rows.append((name, f"{best * 1000:.1f}", f"{best / baseline - 1:+.1%}",
+                         f"{peak / 1024**2:.1f}" if peak else '-'))
+
+    print(f"{args.size}x{args.size} scenes, best of {args.requests} warm requests per mode\n")
+    print_table(['mode', 'request ms', 'overhead', 'largest stage peak MB'], rows)
+    print(f"\nLast spans-only breakdown (ms): " + ", ".join(
+        f"{stage} {values['wall_s'] * 1000:.1f}" for stage, values in run_mode({}, 1, args.size)['stages'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Throughput and peak RSS of small bbox reads cut from a large local scene.
+
+Usage: python benchmarks/bench_local_raster.py [--size 8192] [--reads 50] [--buffers-km 1 2.5 5]
+
+One (bands, size, size) uint16 NPY stack with a sidecar is written to a
+temporary directory. Every mode then runs in a fresh interpreter that
+reads --reads random bboxes (seeded) and reports reads per second, peak
+RSS (VmHWM), how much of the final RSS is file-backed (memory-mapped
+page cache, which the kernel can reclaim) and bytes read from storage.
+Before each run the file is dropped from the page cache with
+posix_fadvise, so reads are cold. Bytes read depend on the device's
+readahead (/sys/block/*/queue/read_ahead_kb). The modes are: np.load of the whole scene followed by slicing (the
+naive way), LocalRasterCatalog windowed memory-mapped reads at native
+resolution, and the same reads decimated to 60 m.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from common import PROJECT_DIR, print_table
+from config import config
+from local_raster import METRES_PER_DEGREE, write_scene
+from synthetic_scene import generate_scene
+
+WORKER = r'''
+import json, os, sys, time
+import numpy as np
+from local_raster import LocalRasterCatalog, METRES_PER_DEGREE
+
+root, mode, buffer_km, reads = sys.argv[1], sys.argv[2], float(sys.argv[3]), int(sys.argv[4])
+catalog = LocalRasterCatalog(root)
+scene = catalog.scenes[0]
+bounds = scene.bounds
+buffer_deg = buffer_km * 1000 / METRES_PER_DEGREE
+rng = np.random.default_rng(0)
+
+def proc_field(name, field):
+    with open(f'/proc/self/{name}') as f:
+        return int(dict(line.split(':', 1) for line in f.read().splitlines())[field].split()[0])
+
+def io_bytes():
+    return proc_field('io', 'read_bytes')
+
+start_io = int(io_bytes())
+start = time.perf_counter()
+pixels = 0
+for _ in range(reads):
+    lon = rng.uniform(bounds['min_lon'] + buffer_deg, bounds['max_lon'] - buffer_deg)
+    lat = rng.uniform(bounds['min_lat'] + buffer_deg, bounds['max_lat'] - buffer_deg)
+    bbox = {'min_lon': lon - buffer_deg, 'min_lat': lat - buffer_deg,
+            'max_lon': lon + buffer_deg, 'max_lat': lat + buffer_deg}
+    if mode == 'whole':
+        rows, cols = scene.window(bbox)
+        window = np.moveaxis(np.load(scene.path)[:, rows, cols], 0, -1).copy()
+    else:
+        window = catalog.read(bbox, resolution_m=60 if mode == 'decimated' else None)
+    pixels += window.shape[0] * window.shape[1]
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'pixels': pixels, 'shape': list(window.shape),
+                  'peak_rss_kb': proc_field('status', 'VmHWM'), 'file_rss_kb': proc_field('status', 'RssFile'),
+                  'read_bytes': int(io_bytes()) - start_io}))
+'''
+
+MODES = [('whole', 'np.load whole scene'), ('window', 'memmap window'), ('decimated', 'memmap window, 60 m')]
+
+
+def write_large_scene(root, size):
+    """Synthetic 1024 px scene tiled up to size x size, band-major"""
+    tile = np.moveaxis(generate_scene(1024, seed=0), -1, 0)
+    repeats = -(-size // 1024)
+    data = np.tile(tile, (1, repeats, repeats))[:, :size, :size]
+    # 10 m pixels
+    extent = size * 10 / METRES_PER_DEGREE
+    bounds = {'min_lon': 91.5, 'min_lat': 26.0, 'max_lon': 91.5 + extent, 'max_lat': 26.0 + extent}
+    write_scene(root, 'large', data, config.DEFAULT_BANDS, bounds, '2025-06-01')
+    return os.path.join(root, 'large.npy'), data.nbytes
+
+
+def drop_page_cache(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=8192)
+    parser.add_argument('--reads', type=int, default=50)
+    parser.add_argument('--buffers-km', type=float, nargs='+', default=[1, 2.5, 5])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        path, scene_bytes = write_large_scene(root, args.size)
+        print(f"Scene: {len(config.DEFAULT_BANDS)} x {args.size} x {args.size} uint16, "
+              f"{scene_bytes / 1024**2:.0f} MB at 10 m; {args.reads} cold random reads per row\n")
+        for buffer_km in args.buffers_km:
+            for mode, label in MODES:
+                # Reading whole scenes is slow; a few reads are enough to show it
+                reads = min(args.reads, 5) if mode == 'whole' else args.reads
+                drop_page_cache(path)
+                proc = subprocess.run([sys.executable, '-c', WORKER, root, mode, str(buffer_km), str(reads)],
+                                      cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+                run = json.loads(proc.stdout.strip().splitlines()[-1])
+                rows.append((f"{buffer_km:g} km", label, 'x'.join(map(str, run['shape'][:2])),
+                             f"{reads / run['seconds']:.1f}", f"{run['peak_rss_kb'] / 1024:.0f}", f"{run['file_rss_kb'] / 1024:.0f}",
+                             f"{run['read_bytes'] / reads / 1024**2:.1f}"))
+
+    print_table(['buffer', 'mode', 'window px', 'reads/s', 'peak RSS MB', 'file-backed MB', 'MB read per bbox'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Compare the full-array and tiled NDVI paths on synthetic scenes.
+
+Usage: python benchmarks/bench_ndvi_tiled.py [--sizes 256 2048 10980] [--tile-size 1024]
+
+The 10980 case is a full Sentinel-2 tile; the full-array path needs several
+GB of RAM there, pass --skip-full to only run the tiled path at that size.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import measure, format_bytes, print_table
+from ndvi_processor import NDVIProcessor
+
+
+def make_bands(size, seed=0):
+    rng = np.random.default_rng(seed)
+    red = rng.integers(0, 4000, (size, size), dtype=np.uint16)
+    nir = rng.integers(0, 8000, (size, size), dtype=np.uint16)
+    return red, nir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 2048, 10980])
+    parser.add_argument('--tile-size', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-full', action='store_true', help="skip the full-array path above 4096 px")
+    args = parser.parse_args()
+    
+    processor = NDVIProcessor()
+    rows = []
+    
+    for size in args.sizes:
+        red, nir = make_bands(size)
+        repeat = args.repeat if size <= 2048 else 1
+        
+        if not (args.skip_full and size > 4096):
+            seconds, peak, full = measure(processor.calculate_ndvi, red, nir, repeat=repeat)
+            rows.append((f"{size}^2", 'full', f"{seconds * 1000:.1f}", format_bytes(peak)))
+        else:
+            full = None
+        
+        seconds, peak, tiled = measure(processor.calculate_ndvi_tiled, red, nir,
+                                       tile_size=args.tile_size, repeat=repeat)
+        rows.append((f"{size}^2", 'tiled', f"{seconds * 1000:.1f}", format_bytes(peak)))
+        
+        # Tiled output preallocated by the caller (only scratch buffers are traced)
+        out = np.empty((size, size), dtype=np.float32)
+        seconds, peak, _ = measure(processor.calculate_ndvi_tiled, red, nir,
+                                   tile_size=args.tile_size, out=out, repeat=repeat)
+        rows.append((f"{size}^2", 'tiled (out=)', f"{seconds * 1000:.1f}", format_bytes(peak)))
+        
+        # Tiled output streamed to a memory-mapped .npy file
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ndvi.npy')
+            seconds, peak, mapped = measure(processor.calculate_ndvi_tiled, red, nir,
+                                            tile_size=args.tile_size, output_path=path)
+            rows.append((f"{size}^2", 'tiled (memmap)', f"{seconds * 1000:.1f}", format_bytes(peak)))
+            del mapped
+        
+        if full is not None:
+            assert np.allclose(full, tiled, atol=1e-6), "tiled NDVI differs from full path"
+        del full, tiled, out, red, nir
+    
+    print_table(('size', 'path', 'time (ms)', 'peak alloc'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Per-stage timings of the analysis pipeline on seeded synthetic scenes, recorded across commits.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 256 1024 4096] [--cloud 0.3] [--record]
+
+Every stage (fetch, ndvi, classification, stats, stress, hotspots,
+report) runs --repeat times on the same seeded scenes, after one untimed
+warm-up pass (numba compiles or loads its cache on the first call); min
+and median seconds are reported. With --record the run is appended as
+one JSON line to --results, tagged with the git commit, and compared
+against the most recent run of another commit on the same sizes: stages
+slower by more than --tolerance are flagged, stages the previous run did
+not have are shown as new, and --fail-on-regression exits with 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from common import PROJECT_DIR, print_table
+from analysis_engine import BAND, VegetationAnalyzer
+from baseline_store import BaselineStore
+from cloud_mask import PackedMask
+from config import config
+from ndvi_processor import NDVIProcessor
+from satellite_data import SatelliteDataProcessor
+from synthetic_scene import generate_scene
+from timeseries_store import TimeSeriesStore
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'pipeline.jsonl')
+BBOX = {'min_lon': 91.64, 'min_lat': 26.05, 'max_lon': 91.83, 'max_lat': 26.24}
+
+
+def stages(size, cloud_cover, seed, tmp):
+    """(name, zero-argument callable) per pipeline stage, each fed the previous stages' outputs"""
+    processor = NDVIProcessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fetcher = SatelliteDataProcessor(cache=False, cloud_cover=cloud_cover, scene_size=size, seed=seed)
+        analyzer = VegetationAnalyzer(fetcher, BaselineStore(tmp), TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+    current = generate_scene(size, cloud_cover=cloud_cover, stress_patches=8, seed=seed)
+    baseline = generate_scene(size, seed=seed + 1)
+    valid_mask = PackedMask.from_scl(current[:, :, BAND['SCL']])
+    state = {'baseline_ndvi': processor.calculate_ndvi(baseline[:, :, BAND['B04']], baseline[:, :, BAND['B08']])}
+
+    def fetch():
+        return fetcher._fetch_uncached(BBOX, None, None, config.DEFAULT_BANDS, 100)
+
+    def ndvi():
+        state['ndvi'] = processor.calculate_indices(current, indices=config.SPECTRAL_INDICES, valid_mask=valid_mask)['NDVI']
+
+    def classification():
+        processor.classify_vegetation(state['ndvi'])
+
+    def stats():
+        state['stats'] = processor.calculate_statistics(state['ndvi'], valid_mask=valid_mask)
+        state['baseline_stats'] = processor.calculate_statistics(state['baseline_ndvi'])
+
+    def stress():
+        state['stress'] = processor.analyze_vegetation(state['ndvi'], state['baseline_ndvi'], valid_mask=valid_mask)
+
+    def hotspots():
+        processor.extract_hotspots(state['stress']['stress_mask'], state['stress']['stress_severity'], BBOX)
+
+    def report():
+        analyzer._generate_analysis_report('Benchmark', state['stats'], state['baseline_stats'], state['stress'])
+
+    return [('fetch', fetch), ('ndvi', ndvi), ('classification', classification), ('stats', stats),
+            ('stress', stress), ('hotspots', hotspots), ('report', report)]
+
+
+def run(sizes, cloud_cover, repeat, seed):
+    results = {}
+    for size in sizes:
+        timings = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = stages(size, cloud_cover, seed, tmp)
+            for _, func in pipeline:
+                func()
+            for name, func in pipeline:
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    func()
+                    samples.append(time.perf_counter() - start)
+                timings[name] = {'min': min(samples), 'median': statistics.median(samples)}
+        results[str(size)] = timings
+    return results
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=PROJECT_DIR, capture_output=True, text=True).stdout.strip()
+    return git('rev-parse', '--short', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--', '.'))
+
+
+def previous_run(path, record):
+    """Most recent recorded run of a different commit with the same parameters"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    for other in reversed(runs):
+        if other['commit'] != record['commit'] and other['params'] == record['params']:
+            return other
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 1024, 4096])
+    parser.add_argument('--cloud', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', action='store_true', help='append this run to --results')
+    parser.add_argument('--results', default=RESULTS_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative slowdown flagged as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    record = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'params': {'sizes': args.sizes, 'cloud': args.cloud, 'repeat': args.repeat, 'seed': args.seed},
+        'stages': run(args.sizes, args.cloud, args.repeat, args.seed)
+    }
+
+    previous = previous_run(args.results, record)
+    regressions = []
+    rows = []
+    for size, timings in record['stages'].items():
+        for name, timing in timings.items():
+            row = [size, name, f"{timing['min'] * 1000:.2f}", f"{timing['median'] * 1000:.2f}"]
+            if previous:
+                # None for a stage or size added (or renamed) since the previous run
+                before = previous['stages'].get(size, {}).get(name, {}).get('min')
+                if before is None:
+                    row.append('new')
+                else:
+                    change = timing['min'] / before - 1 if before else 0.0
+                    flag = ' REGRESSION' if change > args.tolerance else ''
+                    row.append(f"{change:+.0%}{flag}")
+                    if flag:
+                        regressions.append(f"{size}/{name}")
+            rows.append(row)
+
+    print(f"commit {commit}{' (uncommitted changes)' if dirty else ''}, {args.cloud:.0%} cloud, "
+          f"best of {args.repeat}" + (f"; compared with {previous['commit']}" if previous else ""))
+    headers = ['size', 'stage', 'min ms', 'median ms'] + ([f"vs {previous['commit']}"] if previous else [])
+    print_table(headers, rows)
+
+    if args.record:
+        os.makedirs(os.path.dirname(args.results), exist_ok=True)
+        with open(args.results, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"\nRecorded to {args.results}")
+    if regressions:
+        print(f"\nSlower than {previous['commit']} by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Time to first result and estimate error of the progressive (coarse-to-fine) analysis.
+
+Usage: python benchmarks/bench_progressive.py [--sizes 1024 2048] [--seeds 5] [--cloud 0.1]
+
+For every size and seed a fresh analyzer runs analyze_region_progressive
+twice: cold (baseline years fetched and stored) and warm (baselines read
+from the store, as for a region seen before). Reported per stride: time
+from the call to that result and from the end of the fetch (synthetic
+scenes take a while to generate at large sizes), the gap between its
+NDVI mean / stress percentage and the final ones, how often the final value fell inside
+the estimate's 95% bounds, and whether the health status matched. The
+last column is plain analyze_region for the same warm request.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+from common import print_table
+from analysis_engine import VegetationAnalyzer
+from baseline_store import BaselineStore
+from satellite_data import SatelliteDataProcessor
+from timeseries_store import TimeSeriesStore
+
+LAT, LON = 26.1445, 91.7362
+
+
+def progressive_run(analyzer):
+    """[(seconds since the call, result)] for every yielded result"""
+    start = time.perf_counter()
+    return [(time.perf_counter() - start, result)
+            for result in analyzer.analyze_region_progressive(LAT, LON, 'Kamrup')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 2048])
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--cloud', type=float, default=0.1)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        samples = {}
+        for seed in range(args.seeds):
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                def analyzer():
+                    # Same seed, so the cold and warm runs (and the plain one) see the same scenes
+                    return VegetationAnalyzer(
+                        SatelliteDataProcessor(cache=False, cloud_cover=args.cloud, scene_size=size, seed=seed),
+                        BaselineStore(tmp), TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+                runs = {'cold': progressive_run(analyzer())}
+                runs['warm'] = progressive_run(analyzer())
+                start = time.perf_counter()
+                analyzer().analyze_region(LAT, LON, 'Kamrup')
+                plain = time.perf_counter() - start
+
+            for mode, run in runs.items():
+                final = run[-1][1]
+                for seconds, result in run:
+                    stride = result['progress']['stride']
+                    stress = result['stress_analysis']
+                    low, high = result.get('current_mean_bounds', (final['current_stats']['mean'],) * 2)
+                    stress_low, stress_high = stress.get('stress_percentage_bounds', (stress['stress_percentage'],) * 2)
+                    samples.setdefault((mode, stride), []).append({
+                        'seconds': seconds,
+                        'after_fetch': seconds - result['timings']['fetch'],
+                        'mean_error': abs(result['current_stats']['mean'] - final['current_stats']['mean']),
+                        'stress_error': abs(stress['stress_percentage'] - final['stress_analysis']['stress_percentage']),
+                        'covered': (low <= final['current_stats']['mean'] <= high and
+                                    stress_low <= final['stress_analysis']['stress_percentage'] <= stress_high),
+                        'status': result['health_status'] == final['health_status'],
+                        'plain': plain if mode == 'warm' else None
+                    })
+
+        for (mode, stride), values in samples.items():
+            plain = [v['plain'] for v in values if v['plain'] is not None]
+            rows.append((f"{size}x{size}", mode, 'final' if stride == 1 else f"1/{stride}",
+                         f"{statistics.median(v['seconds'] for v in values) * 1000:.1f}",
+                         f"{statistics.median(v['after_fetch'] for v in values) * 1000:.1f}",
+                         f"{max(v['mean_error'] for v in values):.4f}",
+                         f"{max(v['stress_error'] for v in values):.2f}",
+                         f"{sum(v['covered'] for v in values)}/{len(values)}",
+                         f"{sum(v['status'] for v in values)}/{len(values)}",
+                         f"{statistics.median(plain) * 1000:.1f}" if plain and stride == 1 else ''))
+
+    print(f"{args.seeds} seeds per size, {args.cloud:.0%} cloud; times are medians, errors maxima\n")
+    print_table(['scene', 'run', 'result', 'ms after call', 'ms after fetch', 'NDVI mean err', 'stress % err',
+                 'final in bounds', 'status match', 'plain ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Memory and latency of AnalysisResult versus the old dict-of-lists results.
+
+Usage: python benchmarks/bench_result_format.py [--sizes 256 1024 2048]
+"""
+import argparse
+import io
+import json
+
+import numpy as np
+
+from common import measure, format_bytes, print_table
+from analysis_result import AnalysisResult
+
+
+def make_rasters(size, seed=0):
+    rng = np.random.default_rng(seed)
+    current = rng.uniform(-0.2, 0.9, (size, size)).astype(np.float32)
+    baseline = rng.uniform(-0.2, 0.9, (size, size)).astype(np.float32)
+    return current, baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 1024, 2048])
+    args = parser.parse_args()
+    
+    rows = []
+    for size in args.sizes:
+        current, baseline = make_rasters(size)
+        metadata = {'region_name': 'Benchmark', 'report': 'x' * 500}
+        
+        # Old path: tolist() in the engine, np.array() in the dashboard, json.dumps for download
+        build_s, build_peak, legacy = measure(
+            lambda: dict(metadata, current_ndvi=current.tolist(), baseline_ndvi=baseline.tolist())
+        )
+        read_s, _, _ = measure(lambda: np.array(legacy['current_ndvi']))
+        export_s, _, exported = measure(lambda: json.dumps(legacy, default=str))
+        rows.append((f"{size}^2", 'dict of lists', f"{build_s * 1000:.1f}", format_bytes(build_peak),
+                     f"{read_s * 1000:.1f}", f"{export_s * 1000:.1f}", format_bytes(len(exported))))
+        del legacy, exported
+        
+        # New path: arrays kept as-is, exported as npz
+        build_s, build_peak, result = measure(
+            lambda: AnalysisResult(metadata, {'current_ndvi': current, 'baseline_ndvi': baseline})
+        )
+        read_s, _, _ = measure(lambda: result['current_ndvi'])
+        export_s, _, exported = measure(result.to_npz_bytes)
+        rows.append((f"{size}^2", 'AnalysisResult', f"{build_s * 1000:.3f}", format_bytes(build_peak),
+                     f"{read_s * 1000:.3f}", f"{export_s * 1000:.1f}", format_bytes(len(exported))))
+        
+        # Lazy reopen: only the raster that is touched gets decoded
+        open_s, open_peak, reopened = measure(lambda: AnalysisResult.from_npz(io.BytesIO(exported)))
+        read_s, read_peak, _ = measure(lambda: reopened['current_ndvi'])
+        rows.append((f"{size}^2", 'npz reopen (lazy)', f"{open_s * 1000:.3f}", format_bytes(open_peak),
+                     f"{read_s * 1000:.1f}", '-', '-'))
+    
+    print_table(('size', 'format', 'build ms', 'build alloc', 'read ms', 'export ms', 'export size'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Incremental re-analysis with RegionScheduler against full nightly recomputation.
+
+Usage: python benchmarks/bench_scheduler.py [--regions 200] [--days 7] [--update-rate 0.05]
+
+Hundreds of regions on a grid are served from local scenes
+(local_raster.py): one large scene per year covers them all, and every
+simulated day a random --update-rate of the regions gets a new small
+scene of its own. Night 0 analyses everything in both modes. On later
+nights "full" re-analyses every region, while the scheduler checks every
+region (fetch + hash) and analyses only the dirty ones, most stressed
+first. Wall time includes the checks.
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common import print_table
+from analysis_engine import VegetationAnalyzer
+from baseline_store import BaselineStore
+from config import config
+from local_raster import write_scene
+from satellite_data import SatelliteDataProcessor
+from scheduler import RegionScheduler
+from synthetic_scene import generate_scene
+from timeseries_store import TimeSeriesStore
+
+SPACING_DEG = 0.2
+# create_bbox(buffer_km=10) as used by the analyzer
+BUFFER_DEG = 10 / 111.0
+
+
+def make_regions(count):
+    columns = math.ceil(math.sqrt(count * 4 / 3))
+    return [{'name': f"R{i:03d}", 'lat': 24.0 + (i // columns) * SPACING_DEG,
+             'lon': 90.0 + (i % columns) * SPACING_DEG} for i in range(count)]
+
+
+def write_base_scenes(root, regions, pixel_deg, today):
+    """One scene over every region for the current window and each baseline year"""
+    bounds = {'min_lat': min(r['lat'] for r in regions) - 2 * BUFFER_DEG,
+              'max_lat': max(r['lat'] for r in regions) + 2 * BUFFER_DEG,
+              'min_lon': min(r['lon'] for r in regions) - 2 * BUFFER_DEG,
+              'max_lon': max(r['lon'] for r in regions) + 2 * BUFFER_DEG}
+    height = round((bounds['max_lat'] - bounds['min_lat']) / pixel_deg)
+    width = round((bounds['max_lon'] - bounds['min_lon']) / pixel_deg)
+    bounds['max_lat'] = bounds['min_lat'] + height * pixel_deg
+    bounds['max_lon'] = bounds['min_lon'] + width * pixel_deg
+
+    dates = [today - timedelta(days=29)] + [(today - timedelta(days=10)).replace(year=today.year - back)
+                                           for back in range(1, config.BASELINE_YEARS + 1)]
+    for i, acquired in enumerate(dates):
+        scene = generate_scene(max(height, width), stress_patches=40 if i == 0 else 0, seed=i)[:height, :width]
+        write_scene(root, f"base_{acquired.isoformat()}", np.moveaxis(scene, -1, 0), config.DEFAULT_BANDS,
+                    bounds, acquired)
+
+
+def write_update(root, region, pixel_deg, acquired, seed):
+    """New scene covering one region only"""
+    margin = 2 * BUFFER_DEG
+    size = round(2 * margin / pixel_deg)
+    bounds = {'min_lat': region['lat'] - margin, 'min_lon': region['lon'] - margin}
+    bounds.update(max_lat=bounds['min_lat'] + size * pixel_deg, max_lon=bounds['min_lon'] + size * pixel_deg)
+    scene = generate_scene(size, stress_patches=int(seed % 5), seed=seed)
+    write_scene(root, f"{region['name']}_{acquired.isoformat()}", np.moveaxis(scene, -1, 0),
+                config.DEFAULT_BANDS, bounds, acquired)
+
+
+def make_analyzer(scenes, tmp, mode):
+    return VegetationAnalyzer(SatelliteDataProcessor(cache=False, local_dir=scenes),
+                              BaselineStore(os.path.join(tmp, mode, 'baselines')),
+                              TimeSeriesStore(os.path.join(tmp, mode, 'timeseries')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=200)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--update-rate', type=float, default=0.05)
+    parser.add_argument('--size', type=int, default=96, help='pixels across one region bbox')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    regions = make_regions(args.regions)
+    pixel_deg = 2 * BUFFER_DEG / args.size
+    today = datetime.now().date()
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    nights = []  # (full analyses, full s, scheduler analyses, scheduler s)
+    priority_ok = True
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        scenes = os.path.join(tmp, 'scenes')
+        write_base_scenes(scenes, regions, pixel_deg, today)
+        full = make_analyzer(scenes, tmp, 'full')
+        scheduler = RegionScheduler(make_analyzer(scenes, tmp, 'scheduler'), os.path.join(tmp, 'state'))
+
+        for day in range(args.days + 1):
+            updated = []
+            if day:
+                updated = rng.choice(len(regions), size=max(1, round(args.update_rate * len(regions))), replace=False)
+                for i in updated:
+                    write_update(scenes, regions[i], pixel_deg, today - timedelta(days=29 - day),
+                                 seed=1000 * day + int(i))
+                full.satellite_processor.local.refresh()
+                scheduler.analyzer.satellite_processor.local.refresh()
+
+            start = time.perf_counter()
+            for region in regions:
+                full.analyze_region(region['lat'], region['lon'], region['name'])
+            full_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            dirty = scheduler.check(regions)
+            priorities = [scheduler.state.get(name, {}).get('stress_percentage', float('inf')) for name in dirty]
+            analysed = sum(1 for _ in scheduler.run())
+            scheduler_s = time.perf_counter() - start
+            priority_ok &= priorities == sorted(priorities, reverse=True)
+
+            nights.append((len(regions), full_s, analysed, scheduler_s))
+            rows.append((day, len(updated), len(regions), f"{full_s:.2f}", analysed, f"{scheduler_s:.2f}"))
+
+    print(f"{args.regions} regions, {args.size}x{args.size} px each, {args.update_rate:.0%} updated per day\n")
+    print_table(['night', 'updated', 'full analyses', 'full s', 'scheduler analyses', 'scheduler s'], rows)
+    total = [sum(column) for column in zip(*nights)]
+    later_full = sum(night[1] for night in nights[1:])
+    later_scheduler = sum(night[3] for night in nights[1:])
+    print(f"\nTotal: full {total[0]} analyses in {total[1]:.1f} s, scheduler {total[2]} in {total[3]:.1f} s")
+    if later_scheduler:
+        print(f"Nights 1-{args.days}: {later_full:.1f} s -> {later_scheduler:.1f} s "
+              f"({1 - later_scheduler / later_full:.0%} less compute, {later_full / later_scheduler:.1f}x)")
+    print(f"Dirty regions queued by descending prior stress: {'yes' if priority_ok else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
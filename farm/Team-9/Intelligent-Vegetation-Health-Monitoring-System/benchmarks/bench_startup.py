@@ -0,0 +1,123 @@
+"""Cold-start and first-render latency of the dashboard and the analyzer, against a budget.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--fail-over-budget]
+
+Every sample is a fresh interpreter run with `python -X importtime`, so
+nothing is already imported (bytecode caches are warm). The analyzer
+target times importing analysis_engine, constructing VegetationAnalyzer
+and its first analysis, which now pays for the deferred numba and scipy
+imports. The app target renders app.py's welcome screen once with
+Streamlit's AppTest and is skipped when streamlit is not installed.
+Phases slower than BUDGET_MS are flagged; the table also lists which
+heavy libraries were loaded and the slowest top-level imports.
+"""
+import argparse
+import importlib.util
+import json
+import subprocess
+import sys
+
+from common import PROJECT_DIR, print_table
+
+# Milliseconds, best of --repeat cold runs
+BUDGET_MS = {
+    'import analysis_engine': 300,
+    'VegetationAnalyzer()': 50,
+    'import streamlit': 2000,
+    'app first render': 500,
+}
+HEAVY_MODULES = ('pandas', 'scipy', 'numba', 'requests', 'plotly', 'folium', 'streamlit_folium')
+
+WORKER = r'''
+import contextlib, io, json, os, sys, tempfile, time
+phases = {}
+start = time.perf_counter()
+
+def phase(name):
+    global start
+    now = time.perf_counter()
+    phases[name] = now - start
+    start = now
+
+if sys.argv[1] == 'analyzer':
+    import analysis_engine
+    phase('import analysis_engine')
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        from baseline_store import BaselineStore
+        from satellite_data import SatelliteDataProcessor
+        from timeseries_store import TimeSeriesStore
+        start = time.perf_counter()
+        analyzer = analysis_engine.VegetationAnalyzer(SatelliteDataProcessor(cache=False, seed=0), BaselineStore(tmp),
+                                                      TimeSeriesStore(os.path.join(tmp, 'timeseries')))
+        phase('VegetationAnalyzer()')
+        analyzer.analyze_region(26.1445, 91.7362, 'Kamrup')
+        phase('first analysis')
+else:
+    from streamlit.testing.v1 import AppTest
+    phase('import streamlit')
+    app = AppTest.from_file('app.py', default_timeout=60).run()
+    phase('app first render')
+    if app.exception:
+        raise SystemExit(str(app.exception[0].value))
+print(json.dumps({'phases': phases, 'loaded': [name for name in sys.argv[2:] if name in sys.modules]}))
+'''
+
+
+def parse_importtime(stderr):
+    """{top-level module: cumulative ms} from -X importtime output"""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # nested imports are indented under their parent
+            imports[name.strip()] = int(cumulative) / 1000
+    return imports
+
+
+def cold_run(target):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', WORKER, target, *HEAVY_MODULES],
+                          cwd=PROJECT_DIR, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"{target} worker failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fail-over-budget', action='store_true')
+    args = parser.parse_args()
+
+    targets = ['analyzer']
+    if importlib.util.find_spec('streamlit'):
+        targets.append('app')
+    else:
+        print("streamlit is not installed; skipping the app target\n")
+
+    rows = []
+    over = []
+    for target in targets:
+        runs = [cold_run(target) for _ in range(args.repeat)]
+        result, imports = runs[-1]
+        for name in result['phases']:
+            best = min(run['phases'][name] for run, _ in runs) * 1000
+            budget = BUDGET_MS.get(name)
+            flag = 'OVER' if budget and best > budget else 'ok' if budget else '-'
+            if flag == 'OVER':
+                over.append(name)
+            rows.append((target, name, f"{best:.1f}", budget or '-', flag))
+        slowest = sorted(imports.items(), key=lambda item: -item[1])[:5]
+        print(f"{target}: heavy modules loaded: {', '.join(result['loaded']) or 'none'}")
+        print(f"{target}: slowest top-level imports (ms): "
+              + ", ".join(f"{name} {ms:.0f}" for name, ms in slowest) + "\n")
+
+    print_table(['target', 'phase', 'best ms', 'budget ms', 'status'], rows)
+    if over:
+        print(f"\nOver budget: {', '.join(over)}")
+        if args.fail_over_budget:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
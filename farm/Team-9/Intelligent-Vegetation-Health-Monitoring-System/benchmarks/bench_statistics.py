@@ -0,0 +1,49 @@
+"""Compare exact and streaming NDVI statistics for speed, memory and accuracy.
+
+Usage: python benchmarks/bench_statistics.py [--sizes 256 2048 4096] [--error 0.001]
+"""
+import argparse
+
+import numpy as np
+
+from common import measure, format_bytes, print_table
+from ndvi_processor import NDVIProcessor
+from streaming_stats import StreamingStatistics
+
+
+def make_ndvi(size, nan_fraction=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    ndvi = np.clip(rng.normal(0.45, 0.2, (size, size)), -1, 1).astype(np.float32)
+    ndvi[rng.random((size, size)) < nan_fraction] = np.nan
+    return ndvi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 2048, 4096])
+    parser.add_argument('--error', type=float, default=0.001, help="quantile error bound")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    processor = NDVIProcessor()
+    rows = []
+    
+    for size in args.sizes:
+        ndvi = make_ndvi(size)
+        
+        seconds, peak, exact = measure(processor.calculate_statistics, ndvi, exact=True, repeat=args.repeat)
+        rows.append((f"{size}^2", 'exact', f"{seconds * 1000:.1f}", format_bytes(peak), '-'))
+        
+        def streaming():
+            acc = StreamingStatistics(quantile_error=args.error)
+            return processor.accumulate_statistics(ndvi, accumulator=acc).to_dict()
+        
+        seconds, peak, approx = measure(streaming, repeat=args.repeat)
+        worst = max(abs(approx[k] - exact[k]) for k in exact)
+        rows.append((f"{size}^2", 'streaming', f"{seconds * 1000:.1f}", format_bytes(peak), f"{worst:.2e}"))
+    
+    print_table(('size', 'path', 'time (ms)', 'peak alloc', 'max abs error'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Micro-benchmarks for vegetation classification and stress detection variants.
+
+Usage: python benchmarks/bench_stress_kernels.py [--sizes 256 2048 4096]
+
+'legacy' rows re-implement the original per-class mask loop and unguarded
+division for reference. The numba row is skipped when numba is missing.
+"""
+import argparse
+import warnings
+
+import numpy as np
+
+from common import measure, format_bytes, print_table
+from ndvi_processor import NDVIProcessor
+import stress_kernels
+
+
+def legacy_classify(processor, ndvi):
+    classification = np.zeros_like(ndvi, dtype=int)
+    for i, (_, (low, high)) in enumerate(processor.ndvi_classes.items()):
+        classification[(ndvi >= low) & (ndvi < high)] = i + 1
+    return classification
+
+
+def legacy_stress(current, baseline, threshold=0.2):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        change = (current - baseline) / np.abs(baseline)
+        change = np.where(np.abs(baseline) < 0.1, 0, change)
+        mask = change < -threshold
+        return mask, np.abs(change) * mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 2048, 4096])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    processor = NDVIProcessor()
+    rng = np.random.default_rng(0)
+    rows = []
+    
+    for size in args.sizes:
+        current = rng.uniform(-0.2, 0.9, (size, size)).astype(np.float32)
+        baseline = rng.uniform(-0.2, 0.9, (size, size)).astype(np.float32)
+        
+        variants = [
+            ('legacy classify', lambda: legacy_classify(processor, current)),
+            ('edge-count classify', lambda: processor.classify_vegetation(current)),
+            ('legacy stress', lambda: legacy_stress(current, baseline)),
+            ('guarded stress', lambda: processor.detect_stress_areas(current, baseline)),
+            ('legacy classify + stress', lambda: (legacy_classify(processor, current),
+                                                  legacy_stress(current, baseline))),
+            ('fused numpy', lambda: processor.analyze_vegetation(current, baseline, engine='numpy')),
+        ]
+        if stress_kernels.HAVE_NUMBA:
+            processor.analyze_vegetation(current[:8, :8], baseline[:8, :8], engine='numba')  # JIT warm-up
+            variants.append(('fused numba', lambda: processor.analyze_vegetation(current, baseline, engine='numba')))
+        
+        for name, func in variants:
+            seconds, peak, _ = measure(func, repeat=args.repeat)
+            rows.append((f"{size}^2", name, f"{seconds * 1000:.2f}", format_bytes(peak)))
+    
+    print_table(('size', 'variant', 'time (ms)', 'peak alloc'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Cold versus warm fetch latency through the on-disk tile cache.
+
+Usage: python benchmarks/bench_tile_cache.py [--regions 20] [--latency 0.2] [--budget-mb 64]
+
+Uses the demo fetcher with --latency seconds of injected delay per scene
+and a throwaway cache directory.
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import format_bytes, print_table
+from satellite_data import SatelliteDataProcessor
+from tile_cache import TileCache
+
+
+def fetch_all(processor, bboxes, start, end):
+    began = time.perf_counter()
+    for bbox in bboxes:
+        data = processor.fetch_sentinel2_data(bbox, start, end)
+        float(data[:, :, 1].mean())  # touch the pixels so memmaps are actually read
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--budget-mb', type=float, default=64)
+    args = parser.parse_args()
+    
+    end = datetime.now()
+    start = end - timedelta(days=30)
+    
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()) as log:
+        cache = TileCache(cache_dir=tmp, max_bytes=int(args.budget_mb * 1024**2))
+        processor = SatelliteDataProcessor(fetch_latency=args.latency, cache=cache)
+        bboxes = [processor.create_bbox(26.0 + 0.1 * i, 91.7, buffer_km=10) for i in range(args.regions)]
+        # Same districts nudged by a few metres snap to the same cache grid cell
+        nudged = [{k: v + 0.0004 for k, v in bbox.items()} for bbox in bboxes]
+        
+        cold = fetch_all(processor, bboxes, start, end)
+        warm = fetch_all(processor, bboxes, start, end)
+        overlap = fetch_all(processor, nudged, start, end)
+        stats = cache.stats
+    
+    per = 1000 / args.regions
+    print_table(('pass', 'total (s)', 'ms / scene'), [
+        ('cold', f"{cold:.2f}", f"{cold * per:.1f}"),
+        ('warm', f"{warm:.3f}", f"{warm * per:.2f}"),
+        ('nudged bbox', f"{overlap:.3f}", f"{overlap * per:.2f}"),
+    ])
+    print(f"\nspeedup warm vs cold: {cold / warm:.0f}x")
+    print(f"hits {stats['hits']}, misses {stats['misses']}, evictions {stats['evictions']}, "
+          f"disk {format_bytes(stats['bytes'])} of {format_bytes(stats['max_bytes'])}")
+
+
+if __name__ == '__main__':
+    main()
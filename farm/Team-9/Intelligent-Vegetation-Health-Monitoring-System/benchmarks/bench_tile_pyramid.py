@@ -0,0 +1,84 @@
+"""Tile generation time and bytes per map viewport versus embedding the raster.
+
+Usage: python benchmarks/bench_tile_pyramid.py [--sizes 1024 4096] [--viewport 1024 768]
+
+For each raster size the NDVI pyramid is built over a 20 km box, then
+the tiles of one viewport centred on the raster are rendered twice, cold
+and from the disk cache, at the zoom where the whole box fits and at the
+raster's native zoom. "embed" rows are what a single full-resolution
+overlay would send instead: the float32 array as base64, and one
+full-size PNG as base64.
+"""
+import argparse
+import base64
+import math
+import tempfile
+import time
+
+import numpy as np
+
+from common import format_bytes, print_table
+from tile_pyramid import TILE_SIZE, TilePyramid, encode_png, ndvi_to_index, tile_range
+
+
+def synthetic_ndvi(size, seed=0):
+    """Smooth fields plus noise, like the demo scenes"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    field = 0.45 + 0.3 * np.sin(6 * x) * np.cos(4 * y)
+    return (field + rng.normal(0, 0.05, (size, size))).astype(np.float32)
+
+
+def viewport_tiles(bbox, z, width, height):
+    """Tiles of a width x height pixel viewport centred on the bbox"""
+    lon = (bbox['min_lon'] + bbox['max_lon']) / 2
+    lat = math.radians((bbox['min_lat'] + bbox['max_lat']) / 2)
+    cx = (lon + 180) / 360 * TILE_SIZE * 2 ** z
+    cy = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * TILE_SIZE * 2 ** z
+    x0, x1, y0, y1 = tile_range(bbox, z)
+    return [(x, y)
+            for x in range(int((cx - width / 2) // TILE_SIZE), int((cx + width / 2) // TILE_SIZE) + 1)
+            for y in range(int((cy - height / 2) // TILE_SIZE), int((cy + height / 2) // TILE_SIZE) + 1)
+            if x0 <= x <= x1 and y0 <= y <= y1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096])
+    parser.add_argument('--viewport', type=int, nargs=2, default=[1024, 768])
+    args = parser.parse_args()
+
+    bbox = {'min_lon': 91.64, 'min_lat': 26.05, 'max_lon': 91.83, 'max_lat': 26.24}
+    rows = []
+    for size in args.sizes:
+        ndvi = synthetic_ndvi(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            pyramid = TilePyramid(ndvi, bbox, tmp)
+            build = time.perf_counter() - start
+
+            fit_zoom = max(z for z in range(pyramid.min_zoom, pyramid.max_zoom + 1)
+                           if len(viewport_tiles(bbox, z, *args.viewport)) == len(pyramid.tiles(z)))
+            for label, z in (('fit', fit_zoom), ('native', pyramid.native_zoom)):
+                tiles = viewport_tiles(bbox, z, *args.viewport)
+                start = time.perf_counter()
+                sent = sum(len(pyramid.tile(z, x, y)) for x, y in tiles)
+                cold = time.perf_counter() - start
+                start = time.perf_counter()
+                for x, y in tiles:
+                    pyramid.tile(z, x, y)
+                warm = time.perf_counter() - start
+                rows.append((size, f"tiles z{z} ({label})", len(tiles), f"{build * 1000:.0f}",
+                             f"{cold * 1000:.0f}", f"{warm * 1000:.1f}", format_bytes(sent)))
+
+        start = time.perf_counter()
+        png = base64.b64encode(encode_png(ndvi_to_index(ndvi)))
+        encode = time.perf_counter() - start
+        rows.append((size, 'embed PNG (base64)', 1, '-', f"{encode * 1000:.0f}", '-', format_bytes(len(png))))
+        rows.append((size, 'embed float32 (base64)', 1, '-', '-', '-', format_bytes(len(base64.b64encode(ndvi.tobytes())))))
+
+    print_table(('size', 'served as', 'files', 'build ms', 'cold ms', 'warm ms', 'bytes sent'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Per-pixel time-series queries on the chunked NDVI history versus loading it all.
+
+Usage: python benchmarks/bench_timeseries_store.py [--size 512] [--years 5] [--revisit 5]
+
+Ingests --years of synthetic acquisitions every --revisit days, then runs
+the anomaly, rolling-mean and trend queries. The baseline is the previous
+layout of one float32 .npy per acquisition, loaded in full for each query.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from common import format_bytes, print_table
+from config import config
+from timeseries_store import TimeSeriesStore, rolling_mean, slope, zscore
+
+LAT, LON = 26.1445, 91.7362
+
+
+def synthetic_scene(rng, day, size):
+    season = 0.25 * np.sin(2 * np.pi * day.timetuple().tm_yday / 365.25)
+    ndvi = (0.45 + season + rng.normal(0, 0.05, (size, size))).astype(np.float32)
+    ndvi[rng.random((size, size)) < 0.05] = np.nan
+    return ndvi
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def load_all(flat_dir, days):
+    return np.stack([np.load(os.path.join(flat_dir, f"{day.isoformat()}.npy")) for day in days])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--revisit', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    end = date(2024, 6, 30)
+    days = [end - timedelta(days=i * args.revisit) for i in range(args.years * 365 // args.revisit)][::-1]
+    window = slice(0, 64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TimeSeriesStore(os.path.join(tmp, 'series'))
+        flat_dir = os.path.join(tmp, 'flat')
+        os.makedirs(flat_dir)
+
+        start = time.perf_counter()
+        for day in days:
+            ndvi = synthetic_scene(rng, day, args.size)
+            store.append(LAT, LON, day, ndvi)
+            np.save(os.path.join(flat_dir, f"{day.isoformat()}.npy"), ndvi)
+        ingest = time.perf_counter() - start
+
+        def full_anomaly():
+            cube = load_all(flat_dir, days)
+            half = timedelta(days=config.BASELINE_WINDOW_DAYS // 2)
+            baseline = [i for i, day in enumerate(days)
+                        if any(abs(day - end.replace(year=end.year - k)) <= half for k in range(1, config.BASELINE_YEARS + 1))]
+            return zscore(cube[-1], cube[baseline])
+
+        def full_rolling():
+            recent = [day for day in days if day > end - timedelta(days=365)]
+            return rolling_mean(load_all(flat_dir, days)[-len(recent):], 6)
+
+        def full_trend():
+            return slope(load_all(flat_dir, days)[:, window, window], days)
+
+        queries = [
+            ('anomaly z-score (latest)', full_anomaly, lambda: store.anomaly(LAT, LON, end)),
+            ('rolling mean (last year)', full_rolling,
+             lambda: store.rolling_mean(LAT, LON, 6, start=end - timedelta(days=364))[1]),
+            (f'trend ({window.stop}x{window.stop} px window)', full_trend,
+             lambda: store.trend(LAT, LON, rows=window, cols=window)),
+        ]
+
+        rows = []
+        for name, full, chunked in queries:
+            timings = []
+            for func in (full, chunked):
+                start = time.perf_counter()
+                result = func()
+                timings.append(time.perf_counter() - start)
+            expected = full()
+            error = np.nanmax(np.abs(result - expected))
+            rows.append((name, f"{timings[0] * 1000:.0f}", f"{timings[1] * 1000:.0f}",
+                         f"{timings[0] / timings[1]:.1f}x", f"{error:.4f}"))
+
+        print(f"{len(days)} acquisitions of {args.size}x{args.size}, chunks of {config.TIMESERIES_CHUNK_TIME}; "
+              f"ingest {ingest / len(days) * 1000:.1f} ms/scene (both layouts)")
+        print(f"On disk: float32 per scene {format_bytes(directory_bytes(flat_dir))}, "
+              f"int16 chunks {format_bytes(directory_bytes(os.path.join(tmp, 'series')))}\n")
+        print_table(['query', 'load all ms', 'chunked ms', 'speedup', 'max abs diff'], rows)
+
+
+if __name__ == '__main__':
+    main()
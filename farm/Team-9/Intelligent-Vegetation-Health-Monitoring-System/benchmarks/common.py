@@ -0,0 +1,43 @@
+"""Shared helpers for the benchmark scripts in this folder"""
+import os
+import sys
+import time
+import tracemalloc
+
+# Benchmarks import the project modules the same way app.py does
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+
+def measure(func, *args, repeat=1, **kwargs):
+    """Run func and return (best wall seconds, peak traced bytes, last result)"""
+    best = float('inf')
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        result = None
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def format_bytes(num_bytes):
+    """Human readable byte count"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(num_bytes) < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width text table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
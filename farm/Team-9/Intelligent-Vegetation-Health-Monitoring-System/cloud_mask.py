@@ -0,0 +1,80 @@
+"""Valid-pixel masks from the Sentinel-2 scene classification (SCL) band.
+
+Masks are stored bit-packed along rows (np.packbits, 1 = clear pixel),
+an eighth of the memory of a bool raster. Tiles without a single clear
+pixel are found from the packed bytes alone, so the NDVI and stress
+kernels can skip them before any band is converted to float.
+"""
+import numpy as np
+
+# SCL classes that are not a usable surface reading: no data, saturated or
+# defective, cloud shadow, cloud (medium and high probability), thin cirrus
+INVALID_SCL_CLASSES = (0, 1, 3, 8, 9, 10)
+CLOUD_SCL_CLASSES = (3, 8, 9, 10)
+
+# Set bits per byte value, for counting clear pixels without unpacking
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def scl_lookup(classes):
+    """Bool table indexed by SCL value, True for the given classes"""
+    table = np.zeros(np.iinfo(np.uint16).max + 1, dtype=bool)
+    table[list(classes)] = True
+    return table
+
+
+def cloud_percentage(scl):
+    """Percentage of pixels classified as cloud, cloud shadow or cirrus"""
+    scl = np.asarray(scl)
+    return float(scl_lookup(CLOUD_SCL_CLASSES)[scl.astype(np.uint16)].mean() * 100) if scl.size else 0.0
+
+
+class PackedMask:
+    """Bit-packed 2D valid-pixel mask"""
+
+    def __init__(self, bits, shape):
+        self.bits = bits
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_bool(cls, valid):
+        valid = np.asarray(valid, dtype=bool)
+        return cls(np.packbits(valid, axis=1), valid.shape)
+
+    @classmethod
+    def from_scl(cls, scl, invalid_classes=INVALID_SCL_CLASSES):
+        """Clear pixels are those whose SCL class is not in `invalid_classes`"""
+        clear = ~scl_lookup(invalid_classes)
+        return cls.from_bool(clear[np.asarray(scl).astype(np.uint16)])
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def count(self):
+        """Number of clear pixels (padding bits are always 0)"""
+        return int(_POPCOUNT[self.bits].sum())
+
+    def valid_fraction(self):
+        size = self.shape[0] * self.shape[1]
+        return self.count() / size if size else 0.0
+
+    def _byte_window(self, rows, cols):
+        start, stop, _ = cols.indices(self.shape[1])
+        return self.bits[rows, start // 8:-(-stop // 8)], start, stop
+
+    def any(self, rows=slice(None), cols=slice(None)):
+        """Whether a window may contain a clear pixel.
+
+        Read from the packed bytes; when the window's columns are not
+        multiples of 8 the edge bytes include neighbouring pixels, which
+        can only make a fully clouded window look clear, never the reverse.
+        """
+        window, _, _ = self._byte_window(rows, cols)
+        return bool(window.any())
+
+    def unpack(self, rows=slice(None), cols=slice(None)):
+        """Bool array of a window"""
+        window, start, stop = self._byte_window(rows, cols)
+        offset = start - start % 8
+        return np.unpackbits(window, axis=1)[:, start - offset:stop - offset].view(bool)
@@ -12,8 +12,65 @@ class Config:
     
     # Default analysis parameters
     DEFAULT_CLOUD_COVERAGE: int = 20
+    # The analyzer masks clouds with the SCL band, so it accepts cloudier scenes and uses their clear pixels
+    MASKED_CLOUD_COVERAGE: int = int(os.getenv('MASKED_CLOUD_COVERAGE', '80'))
     NDVI_STRESS_THRESHOLD: float = 0.20
+    HOTSPOT_MIN_PIXELS: int = 4
+    HOTSPOT_MAX_COUNT: int = 50
     BASELINE_YEARS: int = 3
+    BASELINE_WINDOW_DAYS: int = 30
+    BASELINE_STATISTIC: str = 'median'  # 'mean' or 'median' of the yearly composites
+    BASELINE_STORE_DIR: str = os.getenv('BASELINE_STORE_DIR', '~/.cache/vegetation-monitor/baselines')
+    
+    # Per-region NDVI history (timeseries_store.py), acquisitions per memory-mapped chunk
+    TIMESERIES_STORE_DIR: str = os.getenv('TIMESERIES_STORE_DIR', '~/.cache/vegetation-monitor/timeseries')
+    TIMESERIES_CHUNK_TIME: int = 16
+    
+    # Block size (pixels per side) for tiled processing of full scenes
+    NDVI_TILE_SIZE: int = 1024
+    # Smaller, cache-friendly tiles for the fused classification/stress kernel
+    KERNEL_TILE_SIZE: int = 256
+    
+    # Statistics: streaming histogram quantiles unless exact is requested
+    EXACT_STATISTICS: bool = False
+    STATS_QUANTILE_ERROR: float = 0.001
+    
+    # On-disk cache of fetched scenes
+    TILE_CACHE_ENABLED: bool = os.getenv('TILE_CACHE_ENABLED', '1') == '1'
+    TILE_CACHE_DIR: str = os.getenv('TILE_CACHE_DIR', '~/.cache/vegetation-monitor/tiles')
+    TILE_CACHE_MAX_BYTES: int = int(os.getenv('TILE_CACHE_MAX_BYTES', str(2 * 1024**3)))
+    TILE_CACHE_GRID_DEG: float = 0.01
+    DEFAULT_BANDS = ('B02', 'B03', 'B04', 'B08', 'SCL')
+    
+    # Spectral indices computed for every analysis in one fused pass (band_math.py)
+    SPECTRAL_INDICES = ('NDVI', 'EVI', 'SAVI', 'NDWI')
+    # Histogram range of each index's streaming statistics; values outside are counted in tails
+    INDEX_VALUE_RANGES = {'NDVI': (-1.0, 1.0), 'EVI': (-2.5, 2.5), 'SAVI': (-1.5, 1.5), 'NDWI': (-1.0, 1.0)}
+    
+    # Progressive analyses: estimates from every 16th, then every 4th pixel before the full result
+    PROGRESSIVE_STRIDES = (16, 4)
+    
+    # Analysis service (analysis_service.py); app.py runs jobs in-process when no URL is set
+    ANALYSIS_SERVICE_URL: str = os.getenv('ANALYSIS_SERVICE_URL', '')
+    SERVICE_WORKERS: int = int(os.getenv('SERVICE_WORKERS', '4'))
+    SERVICE_MAX_RESULTS: int = int(os.getenv('SERVICE_MAX_RESULTS', '64'))
+    SERVICE_CORS_ORIGINS: str = os.getenv('SERVICE_CORS_ORIGINS', '*')
+    
+    # Instrumentation (instrumentation.py): JSONL span log, tracemalloc peaks, cProfile dumps
+    METRICS_LOG_PATH: str = os.getenv('METRICS_LOG_PATH', '')
+    METRICS_TRACE_MEMORY: bool = os.getenv('METRICS_TRACE_MEMORY', '0') == '1'
+    PROFILE_DIR: str = os.getenv('PROFILE_DIR', '')
+    
+    # Incremental re-analysis (scheduler.py): per-region input hashes and stored results
+    SCHEDULER_STATE_DIR: str = os.getenv('SCHEDULER_STATE_DIR', '~/.cache/vegetation-monitor/scheduler')
+    
+    # Offline scenes (local_raster.py): band stacks + JSON sidecars read instead of synthetic data,
+    # strided down to about LOCAL_RASTER_RESOLUTION_M metres per pixel (0 keeps native resolution)
+    LOCAL_RASTER_DIR: str = os.getenv('LOCAL_RASTER_DIR', '')
+    LOCAL_RASTER_RESOLUTION_M: float = float(os.getenv('LOCAL_RASTER_RESOLUTION_M', '0'))
+    
+    # Colour-mapped NDVI map tiles (tile_pyramid.py)
+    TILE_PYRAMID_DIR: str = os.getenv('TILE_PYRAMID_DIR', '~/.cache/vegetation-monitor/pyramids')
     
     # Assam districts for testing
     TEST_REGIONS = {
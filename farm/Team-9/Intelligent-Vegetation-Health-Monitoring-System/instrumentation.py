@@ -0,0 +1,146 @@
+"""Per-stage spans, metrics export and optional profiling for the analysis pipeline.
+
+    trace = Trace(region='Kamrup')
+    with trace.span('ndvi'):
+        ...
+    trace.timings()   # {'ndvi': wall seconds}
+    trace.stages      # {'ndvi': {'wall_s', 'cpu_s', 'peak_bytes'}}
+
+Every span is also added to the process-wide `metrics` (served as
+Prometheus text by analysis_service.py at /metrics) and, when
+METRICS_LOG_PATH is set, appended to that file as one JSON line.
+Peak bytes come from tracemalloc and are only measured when
+METRICS_TRACE_MEMORY=1, since tracing slows every allocation; with
+PROFILE_DIR set, functions decorated with @profiled dump cProfile stats
+there. With none of these set a span costs a few microseconds.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from config import config
+
+
+class Metrics:
+    """Process-wide totals per stage: count, wall and CPU seconds, largest peak"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage, wall, cpu, peak_bytes=None):
+        with self._lock:
+            totals = self._stages.setdefault(stage, {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': None})
+            totals['count'] += 1
+            totals['wall_s'] += wall
+            totals['cpu_s'] += cpu
+            if peak_bytes is not None:
+                totals['peak_bytes'] = max(totals['peak_bytes'] or 0, peak_bytes)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._stages.items()}
+
+    def prometheus(self, prefix='vegetation_stage'):
+        """Prometheus text exposition format (version 0.0.4)"""
+        stages = self.snapshot()
+        lines = []
+        for name, key, help_text in (('wall_seconds', 'wall_s', 'Wall time per analysis stage'),
+                                     ('cpu_seconds', 'cpu_s', 'CPU time of the thread running the stage')):
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} summary"]
+            for stage, totals in stages.items():
+                lines.append(f'{prefix}_{name}_sum{{stage="{stage}"}} {totals[key]:.6f}')
+                lines.append(f'{prefix}_{name}_count{{stage="{stage}"}} {totals["count"]}')
+
+        traced = {stage: totals['peak_bytes'] for stage, totals in stages.items() if totals['peak_bytes'] is not None}
+        if traced:
+            lines += [f"# HELP {prefix}_peak_bytes Largest traced allocation peak during the stage",
+                      f"# TYPE {prefix}_peak_bytes gauge"]
+            lines += [f'{prefix}_peak_bytes{{stage="{stage}"}} {peak}' for stage, peak in traced.items()]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+_log_lock = threading.Lock()
+
+if config.METRICS_TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class Trace:
+    """Spans of one analysis, plus the labels written with them to the JSONL log"""
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.stages = {}
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def timings(self):
+        """Wall seconds per stage"""
+        return {stage: values['wall_s'] for stage, values in self.stages.items()}
+
+    def record(self, stage, wall, cpu, peak_bytes):
+        self.stages[stage] = {'wall_s': wall, 'cpu_s': cpu, 'peak_bytes': peak_bytes}
+        metrics.observe(stage, wall, cpu, peak_bytes)
+        if config.METRICS_LOG_PATH:
+            line = json.dumps({'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                               'stage': stage, **self.labels, **self.stages[stage]})
+            with _log_lock, open(os.path.expanduser(config.METRICS_LOG_PATH), 'a') as f:
+                f.write(line + '\n')
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'traced', 'start_bytes', 'wall', 'cpu')
+
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        # tracemalloc has one process-wide peak: with concurrent spans it covers them all
+        self.traced = tracemalloc.is_tracing()
+        if self.traced:
+            tracemalloc.reset_peak()
+            self.start_bytes = tracemalloc.get_traced_memory()[0]
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        peak = tracemalloc.get_traced_memory()[1] - self.start_bytes if self.traced else None
+        self.trace.record(self.stage, wall, cpu, peak)
+        return False
+
+
+def profiled(func):
+    """Dump cProfile stats of every call to PROFILE_DIR; returns `func` itself when unset"""
+    if not config.PROFILE_DIR:
+        return func
+    directory = os.path.expanduser(config.PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; run this call unprofiled
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            profiler.dump_stats(os.path.join(directory, f"{func.__name__}-{stamp}-{threading.get_ident()}.prof"))
+
+    return wrapper
@@ -0,0 +1,223 @@
+"""Offline ingestion of locally stored band stacks, read window by window.
+
+Each scene is a band stack plus a JSON sidecar next to it:
+
+    kamrup_20250601.npy    (bands, height, width) uint16
+    kamrup_20250601.json   {"file": "kamrup_20250601.npy", "format": "npy",
+                            "acquired": "2025-06-01",
+                            "bands": ["B02", "B03", "B04", "B08", "SCL"],
+                            "bounds": {"min_lon": ..., "min_lat": ...,
+                                       "max_lon": ..., "max_lat": ...},
+                            "interleave": "band"}
+
+The format is "npy", "raw" (headerless, with "dtype" and "shape" in the
+sidecar) or "geotiff" (needs rasterio; bounds may then come from the
+file). "interleave" is "band" for (bands, height, width) stacks or
+"pixel" for (height, width, bands). Rasters are north-up in EPSG:4326:
+rows run north to south, columns west to east.
+
+NPY and raw stacks are memory-mapped, so a read only touches the pages
+under the requested bbox window, optionally decimated by striding to a
+coarser resolution. Whole scenes are never loaded.
+"""
+import glob
+import json
+import os
+import threading
+import warnings
+from datetime import date, datetime
+
+import numpy as np
+from config import config
+
+# Same approximation as SatelliteDataProcessor.create_bbox
+METRES_PER_DEGREE = 111000.0
+# A JSON file is a scene sidecar only if it has these keys; other JSON under the root is ignored
+SIDECAR_KEYS = ('file', 'format')
+
+
+class LocalScene:
+    """One band stack described by its sidecar"""
+
+    def __init__(self, sidecar_path, meta=None):
+        if meta is None:
+            with open(sidecar_path) as f:
+                meta = json.load(f)
+        self.sidecar_path = sidecar_path
+        self.path = os.path.join(os.path.dirname(sidecar_path), meta['file'])
+        self.format = meta.get('format', 'npy')
+        self.acquired = date.fromisoformat(meta['acquired'])
+        self.bands = tuple(meta['bands'])
+        self.interleave = meta.get('interleave', 'band')
+        self.meta = meta
+        self._array = None
+        self._lock = threading.Lock()
+
+        if self.format == 'geotiff':
+            self.bounds, self.shape = self._geotiff_georeference(meta.get('bounds'))
+        else:
+            self.bounds = meta['bounds']
+            stack_shape = self._stack().shape
+            self.shape = stack_shape[1:] if self.interleave == 'band' else stack_shape[:2]
+
+        height, width = self.shape
+        self.pixel_lon = (self.bounds['max_lon'] - self.bounds['min_lon']) / width
+        self.pixel_lat = (self.bounds['max_lat'] - self.bounds['min_lat']) / height
+
+    def _stack(self):
+        """Read-only memory map of the whole stack, opened once"""
+        with self._lock:
+            if self._array is None:
+                if self.format == 'npy':
+                    self._array = np.load(self.path, mmap_mode='r')
+                elif self.format == 'raw':
+                    self._array = np.memmap(self.path, dtype=self.meta['dtype'], mode='r',
+                                            shape=tuple(self.meta['shape']))
+                else:
+                    raise ValueError(f"Unknown local raster format {self.format!r} in {self.sidecar_path}")
+            return self._array
+
+    def _geotiff_georeference(self, bounds):
+        import rasterio  # optional dependency, only for GeoTIFF scenes
+
+        with rasterio.open(self.path) as src:
+            if bounds is None:
+                if src.crs is not None and not src.crs.is_geographic:
+                    raise ValueError(f"{self.path} is in {src.crs}; give EPSG:4326 bounds in the sidecar")
+                bounds = {'min_lon': src.bounds.left, 'min_lat': src.bounds.bottom,
+                          'max_lon': src.bounds.right, 'max_lat': src.bounds.top}
+            return bounds, (src.height, src.width)
+
+    @property
+    def resolution_m(self):
+        """Approximate north-south pixel size in metres"""
+        return self.pixel_lat * METRES_PER_DEGREE
+
+    def covers(self, bbox):
+        return (self.bounds['min_lon'] <= bbox['min_lon'] and bbox['max_lon'] <= self.bounds['max_lon'] and
+                self.bounds['min_lat'] <= bbox['min_lat'] and bbox['max_lat'] <= self.bounds['max_lat'])
+
+    def window(self, bbox):
+        """(row slice, col slice) of the pixels under bbox.
+
+        The window size depends only on the bbox extent, not on where the
+        scene grid starts, so scenes on the same grid give equal shapes.
+        """
+        height, width = self.shape
+        rows = max(1, round((bbox['max_lat'] - bbox['min_lat']) / self.pixel_lat))
+        cols = max(1, round((bbox['max_lon'] - bbox['min_lon']) / self.pixel_lon))
+        row = min(max(round((self.bounds['max_lat'] - bbox['max_lat']) / self.pixel_lat), 0), height - rows)
+        col = min(max(round((bbox['min_lon'] - self.bounds['min_lon']) / self.pixel_lon), 0), width - cols)
+        return slice(row, row + rows), slice(col, col + cols)
+
+    def read(self, bbox, bands=None, resolution_m=None):
+        """(height, width, bands) array of the bbox window, strided down to about `resolution_m`"""
+        bands = tuple(bands or self.bands)
+        missing = [band for band in bands if band not in self.bands]
+        if missing:
+            raise ValueError(f"{self.path} has no {', '.join(missing)} band")
+        channels = [self.bands.index(band) for band in bands]
+        step = max(1, int(resolution_m / self.resolution_m)) if resolution_m else 1
+        rows, cols = self.window(bbox)
+        rows, cols = slice(rows.start, rows.stop, step), slice(cols.start, cols.stop, step)
+
+        if self.format == 'geotiff':
+            return self._read_geotiff(rows, cols, channels, step)
+        stack = self._stack()
+        # Fancy indexing over the bands copies just the window out of the memory map
+        if self.interleave == 'band':
+            return np.moveaxis(stack[channels, rows, cols], 0, -1)
+        return stack[rows, cols][:, :, channels]
+
+    def _read_geotiff(self, rows, cols, channels, step):
+        import rasterio
+        from rasterio.windows import Window
+
+        height = len(range(rows.start, rows.stop, step))
+        width = len(range(cols.start, cols.stop, step))
+        window = Window(cols.start, rows.start, cols.stop - cols.start, rows.stop - rows.start)
+        with rasterio.open(self.path) as src:
+            data = src.read([c + 1 for c in channels], window=window, out_shape=(len(channels), height, width))
+        return np.moveaxis(data, 0, -1)
+
+
+class LocalRasterCatalog:
+    """Scenes found under a directory, looked up by bbox and acquisition date"""
+
+    def __init__(self, root=None):
+        self.root = os.path.expanduser(root or config.LOCAL_RASTER_DIR)
+        self.scenes = []
+        self.refresh()
+
+    def refresh(self):
+        """Rescan the directory for sidecars.
+        
+        JSON files without the sidecar keys (configs, result dumps) are
+        ignored. Sidecars that cannot be loaded, e.g. with a missing band
+        stack or date, are skipped with a warning instead of failing the
+        whole catalog.
+        """
+        scenes = []
+        for path in sorted(glob.glob(os.path.join(self.root, '**', '*.json'), recursive=True)):
+            try:
+                with open(path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                warnings.warn(f"Skipping unreadable JSON file {path}: {e}")
+                continue
+            if not isinstance(meta, dict) or not all(key in meta for key in SIDECAR_KEYS):
+                continue
+            try:
+                scenes.append(LocalScene(path, meta))
+            except (OSError, KeyError, ValueError) as e:
+                warnings.warn(f"Skipping scene sidecar {path}: {type(e).__name__}: {e}")
+        self.scenes = sorted(scenes, key=lambda scene: scene.acquired)
+
+    def find(self, bbox, start_date=None, end_date=None, bands=()):
+        """Latest scene fully covering bbox, acquired within [start_date, end_date], or None"""
+        start, end = _as_date(start_date), _as_date(end_date)
+        for scene in reversed(self.scenes):
+            if start and scene.acquired < start or end and scene.acquired > end:
+                continue
+            if scene.covers(bbox) and all(band in scene.bands for band in bands):
+                return scene
+        return None
+
+    def read(self, bbox, start_date=None, end_date=None, bands=None, resolution_m=None):
+        """Window of the best matching scene, or None when no local scene covers the request"""
+        bands = tuple(bands or config.DEFAULT_BANDS)
+        scene = self.find(bbox, start_date, end_date, bands)
+        if scene is None:
+            return None
+        return scene.read(bbox, bands, resolution_m)
+
+
+def write_scene(root, name, data, bands, bounds, acquired, format='npy', interleave='band'):
+    """Store a (bands, height, width) or (height, width, bands) stack plus its sidecar; returns the sidecar path"""
+    os.makedirs(root, exist_ok=True)
+    data = np.asarray(data)
+    file = f"{name}.{'npy' if format == 'npy' else 'raw'}"
+    meta = {'file': file, 'format': format, 'acquired': _as_date(acquired).isoformat(), 'bands': list(bands),
+            'bounds': dict(bounds), 'interleave': interleave}
+    if format == 'npy':
+        np.save(os.path.join(root, file), data)
+    elif format == 'raw':
+        data.tofile(os.path.join(root, file))
+        meta.update(dtype=data.dtype.str, shape=list(data.shape))
+    else:
+        raise ValueError(f"write_scene writes 'npy' or 'raw', not {format!r}")
+
+    sidecar_path = os.path.join(root, f"{name}.json")
+    with open(sidecar_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return sidecar_path
+
+
+def _as_date(value):
+    if value is None or isinstance(value, str) and not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
@@ -1,6 +1,26 @@
 import numpy as np
-from scipy import ndimage
-import pandas as pd
+from config import config
+from band_math import BandMath
+from cloud_mask import PackedMask
+from streaming_stats import StreamingStatistics
+import stress_kernels
+
+
+def iter_tiles(shape, tile_size):
+    """Yield (row_slice, col_slice) windows covering a 2D array shape"""
+    height, width = shape[:2]
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            yield (slice(row, min(row + tile_size, height)),
+                   slice(col, min(col + tile_size, width)))
+
+
+def clear_pixels(ndvi, valid_mask=None):
+    """Number of clear pixels: set in the PackedMask, or not NaN without one"""
+    if valid_mask is not None:
+        return valid_mask.count()
+    return int(np.count_nonzero(~np.isnan(ndvi)))
+
 
 class NDVIProcessor:
     def __init__(self):
@@ -10,9 +30,24 @@ class NDVIProcessor:
             'moderate_vegetation': (0.3, 0.6),
             'healthy_vegetation': (0.6, 0.9)
         }
+        self._band_math = {}
     
-    def calculate_ndvi(self, red_band, nir_band, mask_clouds=True):
-        """Calculate NDVI with cloud masking"""
+    def calculate_ndvi(self, red_band, nir_band, mask_clouds=True, scl_band=None, valid_mask=None):
+        """Calculate NDVI with cloud masking.
+        
+        Pixels flagged as cloud, shadow or no data by the SCL band (or
+        clear in `valid_mask`, a PackedMask) come out as NaN; fully
+        clouded tiles are never computed. Unlike calculate_indices, a zero
+        denominator gives 0 and values are clipped to [-1, 1], so do not
+        mix the two when comparing scenes.
+        """
+        if mask_clouds and valid_mask is None and scl_band is not None:
+            valid_mask = PackedMask.from_scl(scl_band)
+        if mask_clouds and valid_mask is not None:
+            # Kernel-sized tiles so that more of them can be skipped under partial cloud
+            return self.calculate_ndvi_tiled(red_band, nir_band, tile_size=config.KERNEL_TILE_SIZE,
+                                             valid_mask=valid_mask)
+        
         # Convert to float for calculation
         red = red_band.astype(np.float32)
         nir = nir_band.astype(np.float32)
@@ -29,18 +64,120 @@ class NDVIProcessor:
         
         return ndvi
     
-    def classify_vegetation(self, ndvi_array):
+    def calculate_indices(self, scene, bands=None, indices=None, valid_mask=None):
+        """Several spectral indices (names from band_math.INDEX_EXPRESSIONS) in one pass.
+        
+        `scene` is a stacked (height, width, bands) array, e.g. a fetched
+        scene; masked pixels (PackedMask `valid_mask`) come out as NaN.
+        Returns a dict of float32 rasters keyed by index name.
+        """
+        indices = tuple(indices or config.SPECTRAL_INDICES)
+        if indices not in self._band_math:
+            self._band_math[indices] = BandMath(indices)
+        return self._band_math[indices].evaluate(scene, bands, valid_mask=valid_mask)
+    
+    def calculate_ndvi_tiled(self, red_band, nir_band, tile_size=None, out=None, output_path=None, valid_mask=None):
+        """Calculate NDVI window by window so peak memory is bounded by tile size.
+        
+        Results are written into `out` (any float32 array, e.g. a np.memmap),
+        or into a new .npy memory map when `output_path` is given, otherwise
+        into a freshly allocated array. Scratch buffers are allocated once per
+        call and reused for every tile. With a PackedMask `valid_mask`,
+        masked pixels are NaN and tiles with no clear pixel are not read.
+        """
+        tile_size = tile_size or config.NDVI_TILE_SIZE
+        shape = red_band.shape
+        
+        if out is None:
+            if output_path is not None:
+                out = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=shape)
+            else:
+                out = np.empty(shape, dtype=np.float32)
+        
+        # Scratch buffers shared by all tiles
+        tile_shape = (min(tile_size, shape[0]), min(tile_size, shape[1]))
+        red_buf = np.empty(tile_shape, dtype=np.float32)
+        nir_buf = np.empty(tile_shape, dtype=np.float32)
+        den_buf = np.empty(tile_shape, dtype=np.float32)
+        zero_buf = np.empty(tile_shape, dtype=bool)
+        
+        for rows, cols in iter_tiles(shape, tile_size):
+            if valid_mask is not None and not valid_mask.any(rows, cols):
+                out[rows, cols] = np.nan
+                continue
+            
+            h, w = rows.stop - rows.start, cols.stop - cols.start
+            red, nir = red_buf[:h, :w], nir_buf[:h, :w]
+            den, zero = den_buf[:h, :w], zero_buf[:h, :w]
+            
+            np.copyto(red, red_band[rows, cols], casting='unsafe')
+            np.copyto(nir, nir_band[rows, cols], casting='unsafe')
+            
+            # Avoid division by zero
+            np.add(nir, red, out=den)
+            np.equal(den, 0, out=zero)
+            np.copyto(den, 0.0001, where=zero)
+            
+            # NDVI = (nir - red) / (nir + red), clipped straight into the output
+            np.subtract(nir, red, out=nir)
+            np.divide(nir, den, out=nir)
+            np.clip(nir, -1, 1, out=out[rows, cols])
+            
+            if valid_mask is not None:
+                np.logical_not(valid_mask.unpack(rows, cols), out=zero)
+                np.copyto(out[rows, cols], np.nan, where=zero)
+        
+        if isinstance(out, np.memmap):
+            out.flush()
+        
+        return out
+    
+    def classify_vegetation(self, ndvi_array, tile_size=None):
         """Classify vegetation health based on NDVI"""
-        classification = np.zeros_like(ndvi_array, dtype=int)
+        tile_size = tile_size or config.KERNEL_TILE_SIZE
+        edges, lut = stress_kernels.class_lookup(self.ndvi_classes)
+        labels = np.empty(ndvi_array.shape, dtype=np.uint8)
+        scratch = np.empty((min(tile_size, labels.shape[0]), min(tile_size, labels.shape[1])), dtype=bool)
         
-        for i, (class_name, (min_val, max_val)) in enumerate(self.ndvi_classes.items()):
-            mask = (ndvi_array >= min_val) & (ndvi_array < max_val)
-            classification[mask] = i + 1
+        # One comparison pass per class edge, tile by tile
+        for rows, cols in iter_tiles(labels.shape, tile_size):
+            tile = labels[rows, cols]
+            stress_kernels.classify_tile(ndvi_array[rows, cols], edges, lut, tile, scratch[:tile.shape[0], :tile.shape[1]])
         
-        return classification
+        return labels.astype(int)
     
-    def calculate_statistics(self, ndvi_array):
-        """Calculate NDVI statistics for a region"""
+    def calculate_statistics(self, ndvi_array, exact=None, tile_size=None, valid_mask=None, value_range=None):
+        """Calculate NDVI statistics for a region.
+        
+        By default a single streaming pass is made tile by tile (quantiles
+        within config.STATS_QUANTILE_ERROR over `value_range`, the NDVI range
+        unless given); pass exact=True for the sort-based path. NaN (masked)
+        pixels are left out either way.
+        """
+        if exact is None:
+            exact = config.EXACT_STATISTICS
+        if exact:
+            return self._exact_statistics(ndvi_array)
+        
+        return self.accumulate_statistics(ndvi_array, tile_size=tile_size, valid_mask=valid_mask,
+                                          value_range=value_range).to_dict()
+    
+    def accumulate_statistics(self, ndvi_array, tile_size=None, accumulator=None, valid_mask=None, value_range=None):
+        """Fold an NDVI array into a StreamingStatistics accumulator tile by tile"""
+        tile_size = tile_size or config.NDVI_TILE_SIZE
+        if accumulator is None:
+            accumulator = StreamingStatistics(quantile_error=config.STATS_QUANTILE_ERROR,
+                                              value_range=value_range or config.INDEX_VALUE_RANGES['NDVI'])
+        
+        for rows, cols in iter_tiles(ndvi_array.shape, tile_size):
+            if valid_mask is not None and not valid_mask.any(rows, cols):
+                continue
+            accumulator.update(ndvi_array[rows, cols])
+        
+        return accumulator
+    
+    def _exact_statistics(self, ndvi_array):
+        """Exact statistics from a filtered copy of all valid pixels"""
         valid_ndvi = ndvi_array[~np.isnan(ndvi_array)]
         
         if len(valid_ndvi) == 0:
@@ -56,20 +193,140 @@ class NDVIProcessor:
             'percentile_75': float(np.percentile(valid_ndvi, 75))
         }
     
-    def detect_stress_areas(self, current_ndvi, baseline_ndvi, threshold=0.2):
-        """Detect areas with significant NDVI decline"""
-        # Calculate relative change
-        change = (current_ndvi - baseline_ndvi) / np.abs(baseline_ndvi)
-        change = np.where(np.abs(baseline_ndvi) < 0.1, 0, change)
+    def detect_stress_areas(self, current_ndvi, baseline_ndvi, threshold=0.2, tile_size=None, valid_mask=None):
+        """Detect areas with significant NDVI decline.
+        
+        The stress percentage is of clear pixels: those set in the
+        PackedMask `valid_mask`, or the non-NaN ones without it.
+        """
+        tile_size = tile_size or config.KERNEL_TILE_SIZE
+        shape = np.shape(current_ndvi)
+        stress_mask = np.empty(shape, dtype=bool)
+        stress_severity = np.empty(shape, dtype=np.float32)
+        
+        # Relative change (guarded against tiny baselines), mask and severity per tile
+        for rows, cols in iter_tiles(shape, tile_size):
+            stress_kernels.stress_tile(current_ndvi[rows, cols], baseline_ndvi[rows, cols], threshold,
+                                       stress_mask[rows, cols], stress_severity[rows, cols])
+        valid_pixels = clear_pixels(current_ndvi, valid_mask)
+        
+        return {
+            'stress_mask': stress_mask,
+            'stress_severity': stress_severity,
+            'stress_percentage': float(stress_mask.sum() / valid_pixels * 100) if valid_pixels else 0.0
+        }
+    
+    def analyze_vegetation(self, current_ndvi, baseline_ndvi, threshold=None, tile_size=None, engine='auto',
+                           valid_mask=None):
+        """Classification, stress mask, severity and class counts in one pass.
+        
+        engine is 'numpy' (tile-wise ufuncs), 'numba' (single compiled loop)
+        or 'auto' (numba when installed with an OpenMP or TBB threading
+        layer, as analyses launch it from several threads at once). NaN
+        pixels are unclassified and never stressed. The stress percentage
+        is of clear pixels, as in detect_stress_areas; with the scene's
+        PackedMask `valid_mask` the numpy engine also skips fully clouded
+        tiles.
+        """
+        threshold = config.NDVI_STRESS_THRESHOLD if threshold is None else threshold
+        tile_size = tile_size or config.KERNEL_TILE_SIZE
+        if engine == 'auto':
+            engine = 'numba' if stress_kernels.numba_thread_safe() else 'numpy'
         
-        # Identify stress areas
-        stress_mask = change < -threshold
+        edges, lut = stress_kernels.class_lookup(self.ndvi_classes)
+        shape = np.shape(current_ndvi)
+        labels = np.empty(shape, dtype=np.uint8)
+        stress_mask = np.empty(shape, dtype=bool)
+        stress_severity = np.empty(shape, dtype=np.float32)
+        counts = np.zeros(len(self.ndvi_classes) + 1, dtype=np.int64)
         
-        # Calculate stress severity
-        stress_severity = np.abs(change) * stress_mask
+        if engine == 'numba':
+            stress_kernels.fused_numba(current_ndvi, baseline_ndvi, edges, lut, threshold,
+                                       labels, stress_mask, stress_severity, counts)
+        else:
+            for rows, cols in iter_tiles(shape, tile_size):
+                if valid_mask is not None and not valid_mask.any(rows, cols):
+                    labels[rows, cols] = lut[0]
+                    stress_mask[rows, cols] = False
+                    stress_severity[rows, cols] = 0.0
+                    counts[0] += labels[rows, cols].size
+                    continue
+                stress_kernels.fused_tile(current_ndvi[rows, cols], baseline_ndvi[rows, cols], edges, lut,
+                                          threshold, labels[rows, cols], stress_mask[rows, cols],
+                                          stress_severity[rows, cols], counts)
+        
+        class_counts = {name: int(counts[i + 1]) for i, name in enumerate(self.ndvi_classes)}
+        class_counts['unclassified'] = int(counts[0])
+        valid_pixels = clear_pixels(current_ndvi, valid_mask)
         
         return {
+            'classification': labels,
+            'class_counts': class_counts,
             'stress_mask': stress_mask,
             'stress_severity': stress_severity,
-            'stress_percentage': float(np.sum(stress_mask) / stress_mask.size * 100)
+            'stress_percentage': float(stress_mask.sum() / valid_pixels * 100) if valid_pixels else 0.0
         }
+    
+    def extract_hotspots(self, stress_mask, stress_severity, bbox, min_pixels=None, max_hotspots=None):
+        """Group stressed pixels into connected patches, largest total severity first.
+        
+        Returns a list of small dicts (area, centroid lat/lon, mean and max
+        severity, bounding box) instead of full rasters. Rows run north to
+        south and columns west to east across `bbox`.
+        """
+        min_pixels = config.HOTSPOT_MIN_PIXELS if min_pixels is None else min_pixels
+        max_hotspots = config.HOTSPOT_MAX_COUNT if max_hotspots is None else max_hotspots
+        height, width = stress_mask.shape
+        
+        # scipy is the slowest import of the analyzer stack; only hotspots need it
+        from scipy import ndimage
+        
+        # 8-connected patches
+        labels, count = ndimage.label(stress_mask, structure=np.ones((3, 3), dtype=bool))
+        if count == 0:
+            return []
+        
+        # Per-patch sums from the stressed pixels only
+        flat = np.flatnonzero(labels)
+        patch = labels.ravel()[flat]
+        severity = stress_severity.ravel()[flat]
+        rows, cols = np.divmod(flat, width)
+        area = np.bincount(patch, minlength=count + 1)
+        severity_sum = np.bincount(patch, weights=severity, minlength=count + 1)
+        row_sum = np.bincount(patch, weights=rows, minlength=count + 1)
+        col_sum = np.bincount(patch, weights=cols, minlength=count + 1)
+        severity_max = np.zeros(count + 1, dtype=np.float32)
+        np.maximum.at(severity_max, patch, severity)
+        
+        # Rank patches by total severity (area x mean severity)
+        candidates = np.flatnonzero(area[1:] >= min_pixels) + 1
+        ranked = candidates[np.argsort(-severity_sum[candidates], kind='stable')][:max_hotspots]
+        objects = ndimage.find_objects(labels)
+        
+        # Pixel -> geographic coordinates
+        lat_step = (bbox['max_lat'] - bbox['min_lat']) / height
+        lon_step = (bbox['max_lon'] - bbox['min_lon']) / width
+        km_per_deg = 111.0
+        
+        hotspots = []
+        for rank, label in enumerate(ranked, start=1):
+            row_slice, col_slice = objects[label - 1]
+            centroid_lat = bbox['max_lat'] - (row_sum[label] / area[label] + 0.5) * lat_step
+            pixel_km2 = (lat_step * km_per_deg) * (lon_step * km_per_deg * np.cos(np.radians(centroid_lat)))
+            hotspots.append({
+                'rank': rank,
+                'area_pixels': int(area[label]),
+                'area_km2': float(area[label] * pixel_km2),
+                'centroid': {
+                    'lat': float(centroid_lat),
+                    'lon': float(bbox['min_lon'] + (col_sum[label] / area[label] + 0.5) * lon_step)
+                },
+                'mean_severity': float(severity_sum[label] / area[label]),
+                'max_severity': float(severity_max[label]),
+                'bounds': [
+                    [float(bbox['max_lat'] - row_slice.stop * lat_step), float(bbox['min_lon'] + col_slice.start * lon_step)],
+                    [float(bbox['max_lat'] - row_slice.start * lat_step), float(bbox['min_lon'] + col_slice.stop * lon_step)]
+                ]
+            })
+        
+        return hotspots
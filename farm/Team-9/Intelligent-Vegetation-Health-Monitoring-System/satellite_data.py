@@ -1,15 +1,43 @@
+import os
+import threading
+import time
 import numpy as np
-import requests
 from datetime import datetime, timedelta
 # Remove the sentinelhub imports for now since they might not be installed
 # from sentinelhub import SHConfig, BBox, CRS, DataCollection, SentinelHubRequest, MimeType
 # import rasterio
 from config import config
+from cloud_mask import cloud_percentage
+from local_raster import LocalRasterCatalog
+from synthetic_scene import generate_scene
+from tile_cache import TileCache
 
 class SatelliteDataProcessor:
-    def __init__(self):
-        self.demo_mode = True  # Force demo mode for now
-        print("Running in demo mode - using synthetic satellite data")
+    def __init__(self, fetch_latency=0.0, cache=None, cloud_cover=0.0, scene_size=256, seed=None, local_dir=None,
+                 resolution_m=None):
+        # Scenes come from local band stacks when a directory is configured, synthetic data otherwise
+        local_dir = local_dir or config.LOCAL_RASTER_DIR
+        self.local = LocalRasterCatalog(local_dir) if local_dir else None
+        self.resolution_m = config.LOCAL_RASTER_RESOLUTION_M if resolution_m is None else resolution_m
+        self.demo_mode = self.local is None
+        # Simulated network round-trip (seconds) per demo fetch, for load testing
+        self.fetch_latency = fetch_latency
+        # Demo scenes: fraction under synthetic cloud, pixels per side, and an optional seed
+        self.cloud_cover = cloud_cover
+        self.scene_size = scene_size
+        self.seed = seed
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._seed_lock = threading.Lock()
+        
+        # cache=None follows config, cache=False disables, or pass a TileCache;
+        # local windows are already memory-mapped reads, so they skip the cache by default
+        if cache is None:
+            cache = TileCache() if config.TILE_CACHE_ENABLED and self.demo_mode else False
+        self.cache = cache or None
+        if self.demo_mode:
+            print("Running in demo mode - using synthetic satellite data")
+        else:
+            print(f"Reading local scenes from {self.local.root} ({len(self.local.scenes)} found)")
         
     def create_bbox(self, lat, lon, buffer_km=5):
         """Create bounding box around coordinates"""
@@ -23,27 +51,45 @@ class SatelliteDataProcessor:
             'max_lat': lat + buffer_deg
         }
     
-    def fetch_sentinel2_data(self, bbox, start_date, end_date):
+    def fetch_sentinel2_data(self, bbox, start_date, end_date, bands=None, max_cloud_coverage=None):
         """Fetch Sentinel-2 data for specified region and time"""
-        return self._generate_demo_data()
-    
-    def _generate_demo_data(self):
-        """Generate synthetic satellite data for testing"""
-        # Create realistic synthetic data
-        size = (256, 256, 3)  # Smaller size for faster processing
-        
-        # Generate base patterns
-        x, y = np.meshgrid(np.linspace(0, 10, 256), np.linspace(0, 10, 256))
-        
-        # Red band (B04) - typically lower for vegetation
-        red = 1000 + 500 * np.sin(x) * np.cos(y) + np.random.normal(0, 100, (256, 256))
-        red = np.clip(red, 0, 4000).astype(np.uint16)
+        bands = tuple(bands or config.DEFAULT_BANDS)
+        if max_cloud_coverage is None:
+            max_cloud_coverage = config.DEFAULT_CLOUD_COVERAGE
         
-        # NIR band (B08) - typically higher for vegetation
-        nir = 3000 + 1000 * np.sin(x + 1) * np.cos(y + 1) + np.random.normal(0, 200, (256, 256))
-        nir = np.clip(nir, 0, 8000).astype(np.uint16)
+        if self.cache is None:
+            return self._fetch_uncached(bbox, start_date, end_date, bands, max_cloud_coverage)
         
-        # Scene classification (simplified)
-        scl = np.ones((256, 256), dtype=np.uint16) * 4  # Vegetation class
+        key = self.cache.make_key(bbox, start_date, end_date, bands, max_cloud_coverage, self.source())
+        return self.cache.get_or_fetch(
+            key, lambda: self._fetch_uncached(bbox, start_date, end_date, bands, max_cloud_coverage)
+        )
+    
+    def source(self):
+        """Where scenes come from and the settings that shape them, for cache keys"""
+        if self.local is not None:
+            return {'local': os.path.realpath(self.local.root), 'resolution_m': self.resolution_m}
+        return {'demo': True, 'scene_size': self.scene_size, 'cloud_cover': self.cloud_cover, 'seed': self.seed}
+    
+    def _fetch_uncached(self, bbox, start_date, end_date, bands, max_cloud_coverage):
+        """Fetch a scene from the data source, bypassing the cache"""
+        if self.fetch_latency:
+            time.sleep(self.fetch_latency)
+        if self.local is not None:
+            data = self.local.read(bbox, start_date, end_date, bands, self.resolution_m)
+            if data is None:
+                return None
+        else:
+            data = self._generate_demo_data(bands)
         
-        return np.stack([red, nir, scl], axis=2)
+        # Like the catalogue's maxCloudCoverage filter: no scene is returned when it is too cloudy
+        if 'SCL' in bands and cloud_percentage(data[:, :, bands.index('SCL')]) > max_cloud_coverage:
+            return None
+        return data
+    
+    def _generate_demo_data(self, bands=None):
+        """Generate synthetic satellite data for testing"""
+        # Each scene gets its own child seed, so a seeded processor is reproducible
+        with self._seed_lock:
+            seed = self._seed_sequence.spawn(1)[0]
+        return generate_scene(self.scene_size, bands, cloud_cover=self.cloud_cover, seed=seed)
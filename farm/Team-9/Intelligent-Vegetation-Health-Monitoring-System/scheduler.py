@@ -0,0 +1,153 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from analysis_engine import VegetationAnalyzer
+from analysis_result import AnalysisResult
+from config import config
+from instrumentation import Trace
+
+
+class RegionScheduler:
+    """Re-analyses only the regions whose input scene changed since their last run.
+
+    Per region the scheduler keeps a content hash of the last processed
+    scene (fetches don't report acquisition dates, so the hash is what
+    identifies an acquisition), the date it was analysed for and its
+    stress percentage (in `<root>/index.json`), plus the result itself as
+    `<root>/<key>.npz`. `check` fetches each region's current scene and
+    queues those whose hash changed; `run` analyses the queue, highest
+    prior stress first, with never analysed regions ahead of all others.
+    `get` returns the stored result straight away for a clean region.
+    Queued regions hold on to their fetched scenes until they are run.
+
+    Only the current scene is hashed: baseline years come from the
+    baseline store, which changes when an analysis adds to it.
+    """
+
+    def __init__(self, analyzer=None, root=None):
+        self.analyzer = analyzer or VegetationAnalyzer()
+        self.root = os.path.expanduser(root or config.SCHEDULER_STATE_DIR)
+        self.counters = {'checked': 0, 'clean': 0, 'dirty': 0, 'analysed': 0}
+        self._lock = threading.Lock()
+        self._queue = []  # (priority, sequence, name), smallest first
+        self._pending = {}  # name -> (region, fetched, digest)
+        self._sequence = itertools.count()
+
+        os.makedirs(self.root, exist_ok=True)
+        index_path = os.path.join(self.root, 'index.json')
+        self.state = {}
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.state = json.load(f)
+
+    @staticmethod
+    def input_digest(fetched):
+        """Content hash of a fetched region: its bbox and the current scene's pixels"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(fetched['bbox'], sort_keys=True).encode())
+        data = np.ascontiguousarray(fetched['current_data'])
+        digest.update(f"{data.dtype.str}{data.shape}".encode())
+        digest.update(memoryview(data).cast('B'))
+        return digest.hexdigest()
+
+    def check(self, regions):
+        """Fetch every region's current scene and queue the changed ones; returns their names by priority.
+
+        `regions` is a list of dicts with 'lat', 'lon' and 'name' keys, or a
+        mapping of name -> {'lat', 'lon'} like config.TEST_REGIONS.
+        """
+        if isinstance(regions, dict):
+            regions = [dict(coords, name=name) for name, coords in regions.items()]
+        for region in regions:
+            self._check_region(region)
+        with self._lock:
+            return [name for _, _, name in sorted(self._queue) if name in self._pending]
+
+    def _check_region(self, region):
+        name = region['name']
+        fetched = self.analyzer.fetch_region(region['lat'], region['lon'], Trace(region=name))
+        digest = self.input_digest(fetched) if fetched['current_data'] is not None else None
+        with self._lock:
+            self.counters['checked'] += 1
+            if digest is None:
+                return False
+            if self.state.get(name, {}).get('digest') == digest:
+                self.counters['clean'] += 1
+                self._pending.pop(name, None)
+                return False
+
+            self.counters['dirty'] += 1
+            if name not in self._pending:
+                heapq.heappush(self._queue, (self._priority(name), next(self._sequence), name))
+            self._pending[name] = (region, fetched, digest)
+            return True
+
+    def _priority(self, name):
+        # Negated so the most stressed region pops first; unknown stress sorts before any percentage
+        stress = self.state.get(name, {}).get('stress_percentage')
+        return -float('inf') if stress is None else -stress
+
+    def __len__(self):
+        return len(self._pending)
+
+    def run(self, max_regions=None):
+        """Analyse queued regions in priority order, yielding each result"""
+        analysed = 0
+        while max_regions is None or analysed < max_regions:
+            with self._lock:
+                while self._queue and self._queue[0][2] not in self._pending:
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    return
+                _, _, name = heapq.heappop(self._queue)
+                region, fetched, digest = self._pending.pop(name)
+            yield self._analyze(name, fetched, digest)
+            analysed += 1
+
+    def _analyze(self, name, fetched, digest):
+        result = self.analyzer.analyze_fetched(name, fetched, fetched['trace'])
+        if 'error' in result:
+            return result
+
+        key = hashlib.sha256(name.encode()).hexdigest()[:16]
+        result.to_npz(os.path.join(self.root, f"{key}.npz"), compressed=False)
+        with self._lock:
+            self.state[name] = {
+                'key': key,
+                'digest': digest,
+                'analysis_date': fetched['analysis_date'].date().isoformat(),
+                'stress_percentage': result['stress_analysis']['stress_percentage'],
+                'analysed_at': datetime.now().isoformat(timespec='seconds')
+            }
+            self.counters['analysed'] += 1
+            self._write_index()
+        return result
+
+    def _write_index(self):
+        tmp_path = os.path.join(self.root, 'index.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, os.path.join(self.root, 'index.json'))
+
+    def result(self, name):
+        """Last stored result of a region (clean or not), or None; rasters load on first access"""
+        with self._lock:
+            entry = self.state.get(name)
+        if entry is None:
+            return None
+        return AnalysisResult.from_npz(os.path.join(self.root, f"{entry['key']}.npz"))
+
+    def get(self, region):
+        """Stored result when the region's scene is unchanged, otherwise analyse it now"""
+        if not self._check_region(region):
+            return self.result(region['name']) or {"error": "Could not fetch satellite data"}
+        with self._lock:
+            _, fetched, digest = self._pending.pop(region['name'])
+        return self._analyze(region['name'], fetched, digest)
@@ -0,0 +1,123 @@
+import math
+import numpy as np
+
+
+class StreamingStatistics:
+    """Single-pass NDVI statistics that can be updated tile by tile and merged.
+
+    Mean and variance use Welford/Chan updates, min and max are tracked
+    directly, and quantiles come from a fixed-bin histogram over
+    `value_range` (the NDVI range by default; see config.INDEX_VALUE_RANGES
+    for other indices). With linear interpolation inside a bin, quantile
+    error is at most one bin width, so the number of bins is derived from
+    `quantile_error`. Values outside the range are counted in two tails, so
+    they do not pile up in the edge bins; a quantile falling in a tail is
+    interpolated between the range edge and the min/max. NaN pixels are
+    ignored.
+    """
+
+    def __init__(self, quantile_error=0.001, value_range=(-1.0, 1.0)):
+        self.low, self.high = value_range
+        self.bins = max(1, int(math.ceil((self.high - self.low) / quantile_error)))
+        self.bin_width = (self.high - self.low) / self.bins
+        self.histogram = np.zeros(self.bins, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """Add a tile (any shape) of NDVI values"""
+        values = np.asarray(values, dtype=np.float32).ravel()
+        valid = values[~np.isnan(values)]
+        n = valid.size
+        if n == 0:
+            return self
+
+        # Tile moments, combined with the running ones (Chan et al.)
+        tile_mean = float(valid.mean(dtype=np.float64))
+        tile_m2 = float(np.square(valid - tile_mean, dtype=np.float64).sum())
+        self._combine(n, tile_mean, tile_m2)
+
+        tile_min, tile_max = float(valid.min()), float(valid.max())
+        self.min = min(self.min, tile_min)
+        self.max = max(self.max, tile_max)
+
+        # Out-of-range values go to the tails; `high` itself belongs to the last bin
+        if tile_min < self.low or tile_max > self.high:
+            below, above = valid < self.low, valid > self.high
+            self.below += int(np.count_nonzero(below))
+            self.above += int(np.count_nonzero(above))
+            valid = valid[~(below | above)]
+
+        index = ((valid - self.low) / self.bin_width).astype(np.intp)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.histogram += np.bincount(index, minlength=self.bins)
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator (same binning) into this one"""
+        if other.bins != self.bins or other.low != self.low or other.high != self.high:
+            raise ValueError("Cannot merge statistics with different histogram binning")
+        if other.count == 0:
+            return self
+        self._combine(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+        self.below += other.below
+        self.above += other.above
+        return self
+
+    def _combine(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        """Population standard deviation (matches np.std)"""
+        return math.sqrt(self.m2 / self.count) if self.count else math.nan
+
+    def quantile(self, q):
+        """Approximate quantile (0-1) from the histogram, within one bin width"""
+        if self.count == 0:
+            return math.nan
+
+        # Same rank convention as np.percentile's linear method
+        rank = q * (self.count - 1)
+        if rank < self.below:
+            return self.min + (rank + 0.5) / self.below * (self.low - self.min)
+        if rank >= self.count - self.above:
+            return self.high + (rank - (self.count - self.above) + 0.5) / self.above * (self.max - self.high)
+        rank -= self.below
+        cumulative = np.cumsum(self.histogram)
+        b = int(np.searchsorted(cumulative, rank, side='right'))
+        b = min(b, self.bins - 1)
+        before = cumulative[b - 1] if b > 0 else 0
+        in_bin = self.histogram[b]
+
+        # Assume pixels are spread evenly across the bin
+        fraction = (rank - before + 0.5) / in_bin if in_bin else 0.5
+        value = self.low + (b + min(max(fraction, 0.0), 1.0)) * self.bin_width
+        return min(max(value, self.min), self.max)
+
+    def to_dict(self):
+        """Statistics in the same layout as NDVIProcessor.calculate_statistics"""
+        if self.count == 0:
+            return None
+
+        return {
+            'mean': float(self.mean),
+            'median': float(self.quantile(0.5)),
+            'std': float(self.std),
+            'min': float(self.min),
+            'max': float(self.max),
+            'percentile_25': float(self.quantile(0.25)),
+            'percentile_75': float(self.quantile(0.75))
+        }
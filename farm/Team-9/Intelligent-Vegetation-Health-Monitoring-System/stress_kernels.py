@@ -0,0 +1,134 @@
+"""Fused classification + stress kernels used by NDVIProcessor.analyze_vegetation.
+
+Both kernels compute, for every pixel, the vegetation class label, the
+stress flag and the stress severity, and accumulate per-class pixel
+counts. The NumPy kernel works on one tile at a time with preallocated
+outputs. The Numba kernel, used when numba is installed with a
+thread-safe threading layer, does the whole array in a single compiled
+(parallel) loop. numba is only imported, and
+the kernel compiled or loaded from its cache, on the first call.
+"""
+import functools
+import importlib.util
+import os
+
+import numpy as np
+
+# Optional dependency; importing it costs ~250 ms, so that waits for the first kernel call
+HAVE_NUMBA = importlib.util.find_spec('numba') is not None
+
+# Baselines closer to zero than this give meaningless relative change
+MIN_BASELINE_NDVI = 0.1
+
+
+def class_lookup(ndvi_classes):
+    """Sorted bin edges plus a bin -> class label table.
+
+    Bin j holds values with exactly j edges <= value. Label 0 means "no
+    class" (outside every range, or NaN); class i in `ndvi_classes` gets
+    label i + 1, like classify_vegetation.
+    """
+    edges = np.array(sorted({v for bounds in ndvi_classes.values() for v in bounds}), dtype=np.float32)
+    lut = np.zeros(len(edges) + 1, dtype=np.uint8)
+    for label, (low, high) in enumerate(ndvi_classes.values(), start=1):
+        # Bin j covers edges[j-1] <= v < edges[j]
+        lut[np.searchsorted(edges, np.float32(low)) + 1:np.searchsorted(edges, np.float32(high)) + 1] = label
+    return edges, lut
+
+
+def classify_tile(current, edges, lut, labels, scratch):
+    """Class labels for one tile; `scratch` is a bool buffer of the same shape"""
+    # lut[j] for j = number of edges <= value, built up one edge at a time
+    # (NaN compares False everywhere and stays unclassified)
+    labels.fill(lut[0])
+    for edge, step in zip(edges, np.diff(lut)):
+        if step:
+            np.greater_equal(current, edge, out=scratch)
+            labels += scratch if step == 1 else scratch.astype(np.uint8) * step
+
+
+def stress_tile(current, baseline, threshold, mask, severity):
+    """Stress mask and severity for one tile"""
+    # Relative change against a clamped baseline, zeroed where the baseline is too small
+    magnitude = np.abs(baseline)
+    np.subtract(current, baseline, out=severity)
+    np.greater_equal(magnitude, MIN_BASELINE_NDVI, out=mask)
+    np.fmax(magnitude, MIN_BASELINE_NDVI, out=magnitude)
+    np.divide(severity, magnitude, out=severity)
+    severity *= mask
+
+    # Severity is the size of the decline on stressed pixels, 0 elsewhere
+    np.less(severity, -threshold, out=mask)
+    np.negative(severity, out=severity)
+    severity *= mask
+    # NaN (cloud-masked) pixels are never stressed, as in the numba kernel
+    np.nan_to_num(severity, copy=False, nan=0.0)
+
+
+def fused_tile(current, baseline, edges, lut, threshold, labels, mask, severity, counts):
+    """NumPy kernel for one tile; writes into labels/mask/severity and adds to counts"""
+    classify_tile(current, edges, lut, labels, mask)
+    counts += np.bincount(labels.ravel(), minlength=counts.size)
+    stress_tile(current, baseline, threshold, mask, severity)
+
+
+@functools.lru_cache(maxsize=None)
+def numba_thread_safe():
+    """True when numba is installed with a threading layer (OpenMP or TBB) that allows concurrent launches"""
+    if not HAVE_NUMBA or os.environ.get('NUMBA_THREADING_LAYER', '').lower() == 'workqueue':
+        return False
+    for layer in ('omppool', 'tbbpool'):
+        try:
+            importlib.import_module(f"numba.np.ufunc.{layer}")
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_kernel():
+    import numba
+
+    # The kernel is launched from the analyzer's worker threads. With TBB
+    # that leaves the interpreter hanging at exit, and workqueue aborts on
+    # concurrent launches, so prefer OpenMP unless the user chose a layer.
+    if 'NUMBA_THREADING_LAYER' not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+
+    @numba.njit(cache=True, nogil=True, parallel=True)
+    def fused(current, baseline, edges, lut, threshold, labels, mask, severity):
+        for i in numba.prange(current.size):
+            c = current[i]
+            b = baseline[i]
+
+            # Number of edges <= c (few classes, so a linear scan beats bisection)
+            j = 0
+            while j < edges.size and c >= edges[j]:
+                j += 1
+            labels[i] = lut[j]
+
+            magnitude = abs(b)
+            change = (c - b) / magnitude if magnitude >= MIN_BASELINE_NDVI else 0.0
+            if change < -threshold:
+                mask[i] = True
+                severity[i] = -change
+            else:
+                mask[i] = False
+                severity[i] = 0.0
+
+    return fused
+
+
+def fused_numba(current, baseline, edges, lut, threshold, labels, mask, severity, counts):
+    """Numba kernel over whole (contiguous) arrays"""
+    if not HAVE_NUMBA:
+        raise RuntimeError("numba is not installed")
+    _numba_kernel()(
+        np.ascontiguousarray(current, dtype=np.float32).ravel(),
+        np.ascontiguousarray(baseline, dtype=np.float32).ravel(),
+        edges, lut, np.float32(threshold),
+        labels.ravel(), mask.ravel(), severity.ravel()
+    )
+    # Per-class counts outside the parallel loop (no shared accumulator)
+    counts += np.bincount(labels.ravel(), minlength=counts.size)
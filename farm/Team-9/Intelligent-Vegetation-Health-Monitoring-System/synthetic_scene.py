@@ -0,0 +1,115 @@
+"""Seeded synthetic Sentinel-2 scenes for demo mode and benchmarks.
+
+The same seed and parameters always give the same scene. Coordinate
+grids depend only on the scene size and are built once per size.
+"""
+import functools
+
+import numpy as np
+
+from config import config
+
+# Smooth base pattern, noise and valid range (L2A digital numbers) per band
+BAND_MODELS = {
+    'B02': {'base': 600, 'amplitude': 200, 'phase': 2.0, 'noise': 60, 'max': 3000},   # blue
+    'B03': {'base': 900, 'amplitude': 300, 'phase': 0.5, 'noise': 80, 'max': 3500},   # green
+    'B04': {'base': 1000, 'amplitude': 500, 'phase': 0.0, 'noise': 100, 'max': 4000},  # red
+    'B08': {'base': 3000, 'amplitude': 1000, 'phase': 1.0, 'noise': 200, 'max': 8000},  # NIR
+    'B11': {'base': 2000, 'amplitude': 600, 'phase': 1.5, 'noise': 150, 'max': 6000},  # SWIR
+}
+# Clouds are bright in every band
+CLOUD_REFLECTANCE = {'B02': 5500, 'B03': 5800, 'B04': 6000, 'B08': 6500, 'B11': 4500}
+SCL_VEGETATION = 4
+SCL_CLOUD_HIGH = 9
+REFLECTANCE_SCALE = 10000
+
+
+@functools.lru_cache(maxsize=8)
+def coordinate_grid(height, width):
+    """Read-only (x, y) grids spanning 0..10, shared by every scene of this size"""
+    x, y = np.meshgrid(np.linspace(0, 10, width, dtype=np.float32), np.linspace(0, 10, height, dtype=np.float32))
+    x.flags.writeable = False
+    y.flags.writeable = False
+    return x, y
+
+
+def generate_scene(size=256, bands=None, cloud_cover=0.0, stress_patches=0, dtype=np.uint16, seed=None,
+                   cloud_scale=None):
+    """Synthetic scene as a (height, width, len(bands)) array.
+
+    `size` is an int or (height, width). Bands are Sentinel-2 names from
+    BAND_MODELS plus 'SCL'. `cloud_cover` is the fraction under cloud
+    (SCL class 9) and `cloud_scale` the period in pixels of its largest
+    structures (the scene size by default). `stress_patches` is the number
+    of elliptical patches with depressed NIR (low NDVI). Integer dtypes
+    hold digital numbers, float dtypes reflectance (DN / 10000); SCL is
+    always a class number. `seed` is anything np.random.default_rng
+    accepts, or a Generator.
+    """
+    height, width = (size, size) if np.isscalar(size) else size
+    bands = tuple(bands or config.DEFAULT_BANDS)
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    x, y = coordinate_grid(height, width)
+
+    layers = {}
+    for band in bands:
+        if band == 'SCL':
+            continue
+        model = BAND_MODELS[band]
+        layer = model['base'] + model['amplitude'] * np.sin(x + model['phase']) * np.cos(y + model['phase'])
+        layer += rng.normal(0, model['noise'], (height, width)).astype(np.float32)
+        layers[band] = layer
+
+    if stress_patches and 'B08' in layers:
+        add_stress_patches(layers['B08'], stress_patches, rng)
+
+    scl = np.full((height, width), SCL_VEGETATION, dtype=np.uint16)
+    if cloud_cover:
+        cloud = cloud_field(height, width, cloud_cover, rng, cloud_scale)
+        scl[cloud] = SCL_CLOUD_HIGH
+        for band, layer in layers.items():
+            layer[cloud] = CLOUD_REFLECTANCE[band]
+
+    scene = np.empty((height, width, len(bands)), dtype=dtype)
+    floating = np.issubdtype(np.dtype(dtype), np.floating)
+    for i, band in enumerate(bands):
+        if band == 'SCL':
+            scene[:, :, i] = scl
+            continue
+        layer = np.clip(layers[band], 0, BAND_MODELS[band]['max'])
+        if floating:
+            scene[:, :, i] = layer / REFLECTANCE_SCALE
+        else:
+            # Digital numbers are whole; truncate like the original demo data
+            scene[:, :, i] = layer.astype(np.uint16)
+    return scene
+
+
+def cloud_field(height, width, cover, rng, scale=None):
+    """Bool mask of smooth cloud patches covering `cover` of the scene, repeating every `scale` pixels"""
+    scale = scale or max(height, width)
+    x = np.arange(width) * (2 * np.pi / scale)
+    y = np.arange(height) * (2 * np.pi / scale)
+    field = np.zeros((height, width), dtype=np.float32)
+    for frequency in (1, 2, 3):
+        phase_x, phase_y, angle = rng.uniform(0, 2 * np.pi, 3)
+        # sin(u + v) * cos(w) with u along x and v, w along y, as two outer products
+        u = frequency * x * np.cos(angle) + phase_x
+        v = frequency * y * np.sin(angle)
+        w = np.cos(frequency * y + phase_y) / frequency
+        field += np.outer(np.cos(v) * w, np.sin(u))
+        field += np.outer(np.sin(v) * w, np.cos(u))
+    return field > np.quantile(field, 1 - cover)
+
+
+def add_stress_patches(nir, count, rng, max_radius=0.12, strength=0.5):
+    """Lower NIR inside `count` random elliptical patches, in place"""
+    height, width = nir.shape
+    rows = np.arange(height, dtype=np.float32)[:, None] / height
+    cols = np.arange(width, dtype=np.float32)[None, :] / width
+    for _ in range(count):
+        centre_row, centre_col = rng.uniform(0.1, 0.9, 2)
+        radius_row, radius_col = rng.uniform(max_radius / 4, max_radius, 2)
+        inside = ((rows - centre_row) / radius_row) ** 2 + ((cols - centre_col) / radius_col) ** 2 <= 1
+        nir[inside] *= 1 - strength * rng.uniform(0.5, 1.0)
+
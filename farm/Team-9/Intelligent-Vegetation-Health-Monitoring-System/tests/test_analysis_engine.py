@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from analysis_engine import BAND, VegetationAnalyzer
+from baseline_store import BaselineStore
+from satellite_data import SatelliteDataProcessor
+from timeseries_store import TimeSeriesStore
+
+LAT, LON = 26.1445, 91.7362
+# SCL class 9: cloud, high probability
+CLOUD = 9
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    return VegetationAnalyzer(SatelliteDataProcessor(cache=False, scene_size=64, seed=0),
+                              BaselineStore(tmp_path / 'baselines'), TimeSeriesStore(tmp_path / 'timeseries'))
+
+
+def test_progressive_ends_with_the_full_analysis(analyzer):
+    results = list(analyzer.analyze_region_progressive(LAT, LON, 'Kamrup', strides=(8, 2)))
+    assert [result['progress']['stride'] for result in results] == [8, 2, 1]
+    assert results[-1]['progress']['final']
+    low, high = results[0]['current_mean_bounds']
+    assert low <= results[0]['current_stats']['mean'] <= high
+
+
+def test_progressive_skips_a_fully_clouded_overview(analyzer):
+    fetch = analyzer.satellite_processor.fetch_sentinel2_data
+    calls = []
+
+    def fetch_with_clouds(*args, **kwargs):
+        data = fetch(*args, **kwargs)
+        if not calls:
+            # Only the current scene: every 16th pixel clouded, so the 1/16 overview sees no clear pixel
+            data[::16, ::16, BAND['SCL']] = CLOUD
+        calls.append(args)
+        return data
+
+    analyzer.satellite_processor.fetch_sentinel2_data = fetch_with_clouds
+    results = list(analyzer.analyze_region_progressive(LAT, LON, 'Kamrup', strides=(16, 4)))
+    assert [result['progress']['stride'] for result in results] == [4, 1]
+    assert np.isnan(results[-1]['current_ndvi'][::16, ::16]).all()
+    assert results[-1]['current_stats'] is not None
+
+
+def test_scene_size_change_keeps_analysing(tmp_path):
+    def analyzer(scene_size):
+        return VegetationAnalyzer(SatelliteDataProcessor(cache=False, scene_size=scene_size, seed=0),
+                                  BaselineStore(tmp_path / 'baselines'), TimeSeriesStore(tmp_path / 'timeseries'))
+
+    assert 'error' not in analyzer(64).analyze_region(LAT, LON, 'Kamrup')
+    result = analyzer(48).analyze_region(LAT, LON, 'Kamrup')
+    assert 'error' not in result
+    assert result['baseline_ndvi'].shape == (48, 48)
+
+
+def test_current_and_baseline_ndvi_follow_one_convention(analyzer):
+    fetch = analyzer.satellite_processor.fetch_sentinel2_data
+
+    def fetch_with_dark_pixel(*args, **kwargs):
+        data = fetch(*args, **kwargs)
+        # No red and no NIR reflectance: NDVI is 0/0 in every year
+        data[0, 0, BAND['B04']] = data[0, 0, BAND['B08']] = 0
+        return data
+
+    analyzer.satellite_processor.fetch_sentinel2_data = fetch_with_dark_pixel
+    result = analyzer.analyze_region(LAT, LON, 'Kamrup')
+    assert np.isnan(result['current_ndvi'][0, 0])
+    assert np.isnan(result['baseline_ndvi'][0, 0])
+    assert np.nanmax(np.abs(result['baseline_ndvi'])) <= 1
+
+
+def test_partly_clouded_scenes_are_analysed_on_their_clear_pixels(tmp_path):
+    analyzer = VegetationAnalyzer(SatelliteDataProcessor(cache=False, scene_size=64, cloud_cover=0.5, seed=0),
+                                  BaselineStore(tmp_path / 'baselines'), TimeSeriesStore(tmp_path / 'timeseries'))
+    result = analyzer.analyze_region(LAT, LON, 'Kamrup')
+    assert 'error' not in result
+    assert result['masked_percentage'] == pytest.approx(50, abs=1)
+    assert np.isnan(result['current_ndvi']).mean() == pytest.approx(0.5, abs=0.01)
@@ -0,0 +1,131 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+import requests
+
+from analysis_client import AnalysisClient
+from analysis_jobs import AnalysisJobs
+from analysis_result import AnalysisResult
+
+
+class FakeAnalyzer:
+    """Progressive analysis without any data: one estimate, then the final result"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def analyze_region_progressive(self, lat, lon, region_name):
+        self.calls += 1
+        yield AnalysisResult({'region_name': region_name, 'progress': {'stride': 4, 'final': False}})
+        self.release.wait(5)
+        yield AnalysisResult({'region_name': region_name, 'progress': {'stride': 1, 'final': True}})
+
+
+@pytest.fixture
+def jobs():
+    return AnalysisJobs(FakeAnalyzer(), max_workers=2, max_results=2)
+
+
+def test_same_region_and_day_is_memoised(jobs):
+    job_id = jobs.submit(26.1, 91.7, 'Kamrup')
+    assert jobs.submit(26.1, 91.7, 'Kamrup') == job_id
+    assert jobs.result(job_id, timeout=5)['progress']['final']
+    assert jobs.analyzer.calls == 1
+    assert jobs.counters['memoised'] == 1
+
+
+def test_estimate_while_running(jobs):
+    jobs.analyzer.release.clear()
+    job_id = jobs.submit(26.1, 91.7, 'Kamrup')
+    for _ in range(500):
+        if jobs.estimate(job_id) is not None:
+            break
+        threading.Event().wait(0.01)
+    assert jobs.estimate(job_id)['progress']['stride'] == 4
+    assert jobs.status(job_id) == 'running'
+    jobs.analyzer.release.set()
+    jobs.result(job_id, timeout=5)
+    assert jobs.status(job_id) == 'done'
+    assert jobs.estimate(job_id) is None
+
+
+def test_evicted_job_is_not_found(jobs):
+    first = jobs.submit(26.1, 91.7, 'A')
+    jobs.result(first, timeout=5)
+    for name in ('B', 'C'):
+        jobs.result(jobs.submit(26.1, 91.7, name), timeout=5)
+
+    assert jobs.counters['evicted'] == 1
+    assert jobs.status(first) == 'not_found'
+    assert jobs.result(first)['status'] == 'not_found'
+    assert jobs.status('0' * 16) == 'not_found'
+
+
+def test_service_answers_404_for_evicted_jobs(jobs, monkeypatch):
+    testclient = pytest.importorskip('fastapi.testclient')
+    import analysis_service
+
+    monkeypatch.setattr(analysis_service, 'jobs', jobs)
+    client = testclient.TestClient(analysis_service.app)
+    ids = []
+    for name in ('A', 'B', 'C'):
+        ids.append(client.post('/analyses', json={'lat': 26.1, 'lon': 91.7, 'region_name': name}).json()['job_id'])
+        assert client.get(f"/analyses/{ids[-1]}", params={'wait': 5}).json()['status'] == 'done'
+
+    assert client.get(f"/analyses/{ids[0]}").status_code == 404
+    assert client.get(f"/analyses/{ids[0]}/report").status_code == 404
+    assert client.get(f"/analyses/{ids[-1]}").status_code == 200
+
+
+def strict_loads(text):
+    """json.loads that rejects NaN and Infinity like JavaScript's JSON.parse"""
+    def reject(constant):
+        raise ValueError(f"{constant} is not valid JSON")
+    return json.loads(text, parse_constant=reject)
+
+
+def test_non_finite_values_are_served_as_null(jobs, monkeypatch):
+    testclient = pytest.importorskip('fastapi.testclient')
+    import analysis_service
+
+    def fully_clouded(lat, lon, region_name):
+        stats = {'mean': float('nan'), 'max': np.float32('nan'), 'min': -np.inf, 'count': np.int64(0)}
+        yield AnalysisResult({'region_name': region_name, 'current_stats': stats,
+                              'progress': {'stride': 1, 'final': True}})
+
+    jobs.analyzer.analyze_region_progressive = fully_clouded
+    monkeypatch.setattr(analysis_service, 'jobs', jobs)
+    client = testclient.TestClient(analysis_service.app)
+    job_id = client.post('/analyses', json={'lat': 26.1, 'lon': 91.7, 'region_name': 'Cloudy'}).json()['job_id']
+
+    body = strict_loads(client.get(f"/analyses/{job_id}", params={'wait': 5}).text)
+    assert body['status'] == 'done'
+    assert body['result']['current_stats'] == {'mean': None, 'max': None, 'min': None, 'count': 0}
+    assert strict_loads(jobs.result(job_id).to_json())['current_stats']['mean'] is None
+
+
+class FakeSession:
+    """requests.Session stand-in answering GETs from a list of (status, JSON body)"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, params=None, timeout=None):
+        response = requests.Response()
+        response.status_code, body = self.responses.pop(0)
+        response._content = json.dumps(body).encode()
+        return response
+
+
+def test_client_reports_not_found_and_retries_transient_errors():
+    client = AnalysisClient('http://service', poll_seconds=0.01, retries=2)
+    client.session = FakeSession([(503, {}), (404, {'detail': 'Unknown analysis abc'})])
+    assert client.result('abc') == {'error': 'Unknown analysis abc', 'status': 'not_found'}
+
+    client.session = FakeSession([(500, {'detail': 'boom'})])
+    with pytest.raises(requests.HTTPError):
+        client.result('abc')
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from band_math import INDEX_EXPRESSIONS, REFLECTANCE_SCALE, BandMath, compute_indices
+from cloud_mask import PackedMask
+from config import config
+from synthetic_scene import generate_scene
+
+
+def reference(scene, bands=config.DEFAULT_BANDS):
+    """The index formulas evaluated one by one in float64"""
+    blue, green, red, nir = (scene[:, :, bands.index(band)].astype(np.float64) / REFLECTANCE_SCALE
+                             for band in ('B02', 'B03', 'B04', 'B08'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'NDVI': (nir - red) / (nir + red),
+            'EVI': 2.5 * (nir - red) / (nir + 6 * red - 7.5 * blue + 1),
+            'SAVI': 1.5 * (nir - red) / (nir + red + 0.5),
+            'NDWI': (green - nir) / (green + nir),
+        }
+
+
+def test_fused_pass_matches_the_formulas():
+    scene = generate_scene(96, seed=0)
+    # Tiles smaller than the scene, with a ragged last row and column of tiles
+    indices = BandMath(tuple(INDEX_EXPRESSIONS), tile_size=40).evaluate(scene)
+    for name, expected in reference(scene).items():
+        np.testing.assert_allclose(indices[name], expected, rtol=1e-5, atol=1e-6, err_msg=name)
+        assert indices[name].dtype == np.float32
+
+
+def test_shared_subexpressions_are_computed_once():
+    engine = BandMath(('NDVI', 'SAVI'))
+    # NIR - RED and NIR + RED feed both indices
+    assert sum(ufunc is np.subtract for ufunc, _, _ in engine.program) == 1
+    assert sum(ufunc is np.add for ufunc, _, _ in engine.program) == 2
+
+
+def test_masked_and_undefined_pixels_are_nan():
+    scene = generate_scene(32, seed=1)
+    scene[0, 0, config.DEFAULT_BANDS.index('B04')] = 0
+    scene[0, 0, config.DEFAULT_BANDS.index('B08')] = 0
+    valid = np.ones((32, 32), dtype=bool)
+    valid[5:9, 5:9] = False
+
+    indices = compute_indices(scene, valid_mask=PackedMask.from_bool(valid))
+    assert np.isnan(indices['NDVI'][0, 0])
+    assert np.isnan(indices['EVI'][5:9, 5:9]).all()
+    assert np.isfinite(indices['SAVI'][10:, 10:]).all()
+
+
+def test_missing_band_is_an_error():
+    with pytest.raises(ValueError, match='B02'):
+        BandMath(('EVI',)).evaluate(np.zeros((4, 4, 2), dtype=np.uint16), bands=('B04', 'B08'))
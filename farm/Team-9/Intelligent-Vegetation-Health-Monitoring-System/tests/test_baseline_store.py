@@ -0,0 +1,78 @@
+import warnings
+from datetime import date
+
+import numpy as np
+import pytest
+
+from baseline_store import BaselineStore
+
+LAT, LON = 26.1445, 91.7362
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BaselineStore(tmp_path, years=2, window_days=30)
+
+
+def test_running_mean_per_year(store):
+    store.add_acquisition(LAT, LON, date(2024, 6, 1), np.full((2, 2), 0.2), 'a')
+    store.add_acquisition(LAT, LON, date(2024, 6, 5), np.full((2, 2), 0.6), 'b')
+    layer = store.layers(LAT, LON, date(2025, 6, 1), (2, 2))[2024]
+    np.testing.assert_allclose(layer, 0.4)
+
+
+def test_same_acquisition_is_stored_once(store):
+    assert store.add_acquisition(LAT, LON, date(2024, 6, 1), np.full((2, 2), 0.2), 'a')
+    assert not store.add_acquisition(LAT, LON, date(2024, 6, 1), np.full((2, 2), 0.8), 'a')
+    np.testing.assert_allclose(store.layers(LAT, LON, date(2025, 6, 1), (2, 2))[2024], 0.2)
+
+
+def test_clouded_pixels_do_not_poison_the_layer(store):
+    when = date(2024, 6, 1)
+    store.add_acquisition(LAT, LON, when, np.full((2, 2), 0.6), 'a')
+    cloudy = np.full((2, 2), 0.6)
+    cloudy[0, 0] = np.nan
+    store.add_acquisition(LAT, LON, when, cloudy, 'b')
+    store.add_acquisition(LAT, LON, when, np.full((2, 2), 0.3), 'c')
+
+    layer = store.layers(LAT, LON, date(2025, 6, 1), (2, 2))[2024]
+    assert np.isfinite(layer).all()
+    # (0.6 + 0.3) / 2 where one acquisition was clouded, (0.6 + 0.6 + 0.3) / 3 elsewhere
+    np.testing.assert_allclose(layer, [[0.45, 0.5], [0.5, 0.5]], rtol=1e-6)
+
+
+def test_pixel_clouded_in_first_acquisition_takes_the_next_clear_value(store):
+    when = date(2024, 6, 1)
+    first = np.full((2, 2), 0.2)
+    first[1, 1] = np.nan
+    store.add_acquisition(LAT, LON, when, first, 'a')
+    store.add_acquisition(LAT, LON, when, np.full((2, 2), 0.8), 'b')
+    np.testing.assert_allclose(store.layers(LAT, LON, date(2025, 6, 1), (2, 2))[2024], [[0.5, 0.5], [0.5, 0.8]], rtol=1e-6)
+
+
+def test_scene_shapes_get_separate_baselines(store):
+    assert store.add_acquisition(LAT, LON, date(2024, 6, 1), np.full((2, 2), 0.2), 'a')
+    assert store.add_acquisition(LAT, LON, date(2024, 6, 1), np.full((3, 3), 0.8), 'a')
+    assert store.missing_years(LAT, LON, date(2025, 6, 1), (2, 2)) == [2023]
+    assert store.missing_years(LAT, LON, date(2025, 6, 1), (4, 4)) == [2023, 2024]
+    np.testing.assert_allclose(store.composite(LAT, LON, date(2025, 6, 1), (3, 3))['mean'], 0.8)
+    assert store.composite(LAT, LON, date(2025, 6, 1), (4, 4)) is None
+
+
+def test_composite_over_years_without_warnings(store):
+    always_clouded = np.full((2, 2), 0.4)
+    always_clouded[0, 1] = np.nan
+    store.add_acquisition(LAT, LON, date(2023, 6, 1), always_clouded, 'a')
+    store.add_acquisition(LAT, LON, date(2024, 6, 1), always_clouded + 0.2, 'b')
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        composite = store.composite(LAT, LON, date(2025, 6, 1), (2, 2))
+    assert composite['years'] == [2023, 2024]
+    assert np.isnan(composite['mean'][0, 1])
+    np.testing.assert_allclose(composite['mean'][1, 1], 0.5, rtol=1e-6)
+
+    # Served from the cached composite until a layer changes
+    np.testing.assert_allclose(store.composite(LAT, LON, date(2025, 6, 1), (2, 2))['median'][0, 0], 0.5, rtol=1e-6)
+    store.add_acquisition(LAT, LON, date(2024, 6, 2), np.full((2, 2), 0.0), 'c')
+    np.testing.assert_allclose(store.composite(LAT, LON, date(2025, 6, 1), (2, 2))['mean'][0, 0], 0.35, rtol=1e-6)
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+
+import numpy as np
+import pytest
+
+from local_raster import LocalRasterCatalog, write_scene
+
+BANDS = ('B04', 'B08', 'SCL')
+# 200 x 100 pixels of 0.001 degrees
+BOUNDS = {'min_lon': 91.0, 'min_lat': 26.0, 'max_lon': 91.2, 'max_lat': 26.1}
+BBOX = {'min_lon': 91.05, 'min_lat': 26.02, 'max_lon': 91.08, 'max_lat': 26.05}
+
+
+@pytest.fixture
+def stack():
+    return np.arange(len(BANDS) * 100 * 200, dtype=np.uint16).reshape(len(BANDS), 100, 200)
+
+
+@pytest.mark.parametrize('format', ['npy', 'raw'])
+@pytest.mark.parametrize('interleave', ['band', 'pixel'])
+def test_window_read_matches_slicing(tmp_path, stack, format, interleave):
+    data = stack if interleave == 'band' else np.moveaxis(stack, 0, -1)
+    write_scene(tmp_path, 'scene', data, BANDS, BOUNDS, '2025-06-01', format=format, interleave=interleave)
+    catalog = LocalRasterCatalog(str(tmp_path))
+
+    window = catalog.read(BBOX, bands=('SCL', 'B08'))
+    # Rows run north to south: max_lat 26.05 is row 50, min_lon 91.05 is column 50
+    expected = np.moveaxis(stack[[2, 1], 50:80, 50:80], 0, -1)
+    np.testing.assert_array_equal(window, expected)
+
+    # About 111 m per pixel; 400 m keeps every third pixel
+    coarse = catalog.read(BBOX, bands=('SCL', 'B08'), resolution_m=400)
+    np.testing.assert_array_equal(coarse, expected[::3, ::3])
+
+
+def test_latest_covering_scene_in_the_date_range(tmp_path, stack):
+    write_scene(tmp_path, 'june', stack, BANDS, BOUNDS, '2025-06-01')
+    write_scene(tmp_path, 'july', stack + 1, BANDS, BOUNDS, '2025-07-01')
+    catalog = LocalRasterCatalog(str(tmp_path))
+
+    assert catalog.find(BBOX).acquired == date(2025, 7, 1)
+    assert catalog.find(BBOX, '2025-05-15', '2025-06-15').acquired == date(2025, 6, 1)
+    assert catalog.find(BBOX, '2025-08-01') is None
+    assert catalog.find(dict(BBOX, max_lon=91.3)) is None
+    assert catalog.read(BBOX, bands=('B02',)) is None
+
+
+def test_catalog_ignores_other_json_and_skips_broken_sidecars(tmp_path, stack):
+    write_scene(tmp_path, 'scene', stack, BANDS, BOUNDS, '2025-06-01')
+    (tmp_path / 'config.json').write_text(json.dumps({'threshold': 0.2}))
+    (tmp_path / 'results.json').write_text(json.dumps([1, 2, 3]))
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'gone.json').write_text(json.dumps({'file': 'gone.npy', 'format': 'npy',
+                                                                'acquired': '2025-06-02', 'bands': list(BANDS),
+                                                                'bounds': BOUNDS}))
+
+    with pytest.warns(UserWarning, match='gone.json'):
+        catalog = LocalRasterCatalog(str(tmp_path))
+    assert [scene.acquired for scene in catalog.scenes] == [date(2025, 6, 1)]
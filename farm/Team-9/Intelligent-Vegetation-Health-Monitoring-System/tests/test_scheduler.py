@@ -0,0 +1,73 @@
+import contextlib
+import io
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from analysis_engine import VegetationAnalyzer
+from baseline_store import BaselineStore
+from config import config
+from local_raster import write_scene
+from satellite_data import SatelliteDataProcessor
+from scheduler import RegionScheduler
+from synthetic_scene import generate_scene
+from timeseries_store import TimeSeriesStore
+
+REGIONS = [{'name': 'North', 'lat': 26.3, 'lon': 91.7}, {'name': 'South', 'lat': 26.0, 'lon': 91.7}]
+BOUNDS = {'min_lat': 25.8, 'max_lat': 26.5, 'min_lon': 91.5, 'max_lon': 91.9}
+SIZE = 80
+
+
+def write(root, name, acquired, seed, bounds=BOUNDS, stress_patches=0):
+    scene = generate_scene(SIZE, stress_patches=stress_patches, seed=seed)
+    write_scene(root, name, np.moveaxis(scene, -1, 0), config.DEFAULT_BANDS, bounds, acquired)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scenes = tmp_path / 'scenes'
+    today = date.today()
+    write(scenes, 'current', today - timedelta(days=5), seed=0, stress_patches=6)
+    for back in range(1, config.BASELINE_YEARS + 1):
+        write(scenes, f"baseline_{back}", (today - timedelta(days=5)).replace(year=today.year - back), seed=back)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = VegetationAnalyzer(SatelliteDataProcessor(cache=False, local_dir=str(scenes)),
+                                      BaselineStore(tmp_path / 'baselines'), TimeSeriesStore(tmp_path / 'timeseries'))
+    return RegionScheduler(analyzer, tmp_path / 'state')
+
+
+def quietly(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def test_only_changed_regions_are_reanalysed(scheduler, tmp_path):
+    assert sorted(quietly(scheduler.check, REGIONS)) == ['North', 'South']
+    assert len(quietly(list, scheduler.run())) == 2
+    assert quietly(scheduler.check, REGIONS) == []
+
+    # A newer scene over the southern region only
+    south = REGIONS[1]
+    write(tmp_path / 'scenes', 'south_update', date.today() - timedelta(days=1), seed=9,
+          bounds={'min_lat': south['lat'] - 0.2, 'max_lat': south['lat'] + 0.2,
+                  'min_lon': south['lon'] - 0.2, 'max_lon': south['lon'] + 0.2})
+    scheduler.analyzer.satellite_processor.local.refresh()
+    assert quietly(scheduler.check, REGIONS) == ['South']
+    assert scheduler.counters['analysed'] == 2
+
+
+def test_dirty_regions_run_most_stressed_first(scheduler):
+    quietly(scheduler.check, REGIONS)
+    quietly(list, scheduler.run())
+    scheduler.state['North']['digest'] = scheduler.state['South']['digest'] = 'stale'
+    scheduler.state['North']['stress_percentage'], scheduler.state['South']['stress_percentage'] = 1.0, 50.0
+    assert quietly(scheduler.check, REGIONS) == ['South', 'North']
+
+
+def test_clean_region_is_served_from_the_stored_result(scheduler):
+    first = quietly(scheduler.get, REGIONS[0])
+    again = quietly(scheduler.get, REGIONS[0])
+    assert scheduler.counters['analysed'] == 1
+    np.testing.assert_array_equal(again['current_ndvi'], first['current_ndvi'])
+    assert again['stress_analysis'] == first['stress_analysis']
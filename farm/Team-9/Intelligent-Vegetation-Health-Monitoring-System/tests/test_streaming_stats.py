@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from streaming_stats import StreamingStatistics
+
+
+def exact(values):
+    return {'mean': values.mean(), 'std': values.std(), 'min': values.min(), 'max': values.max(),
+            **{q: np.percentile(values, q * 100) for q in (0.25, 0.5, 0.75)}}
+
+
+def check(stats, values, error):
+    expected = exact(values)
+    assert stats.mean == pytest.approx(expected['mean'], abs=1e-6)
+    assert stats.std == pytest.approx(expected['std'], abs=1e-6)
+    assert (stats.min, stats.max) == pytest.approx((expected['min'], expected['max']))
+    for q in (0.25, 0.5, 0.75):
+        assert abs(stats.quantile(q) - expected[q]) <= error
+
+
+def test_tiles_and_merge_match_a_single_exact_pass():
+    values = np.random.default_rng(0).uniform(-0.3, 0.9, 100_000).astype(np.float32)
+    left = StreamingStatistics(quantile_error=0.001)
+    for tile in np.array_split(values[:60_000], 7):
+        left.update(tile)
+    right = StreamingStatistics(quantile_error=0.001).update(values[60_000:])
+    check(left.merge(right), values.astype(np.float64), 0.001)
+
+
+def test_nan_pixels_are_ignored():
+    values = np.array([0.1, np.nan, 0.3, np.nan, 0.5], dtype=np.float32)
+    stats = StreamingStatistics().update(values)
+    assert stats.count == 3
+    assert stats.to_dict()['median'] == pytest.approx(0.3, abs=0.001)
+
+
+def test_out_of_range_values_do_not_skew_quantiles():
+    # EVI-like values, half of them above the NDVI range
+    values = np.random.default_rng(1).uniform(0.5, 2.0, 50_000).astype(np.float32)
+    clamped = StreamingStatistics(quantile_error=0.001, value_range=(-1.0, 1.0)).update(values)
+    assert clamped.above == np.count_nonzero(values > 1.0)
+    assert clamped.histogram.sum() + clamped.above == values.size
+    # Tail quantiles are interpolated between the range edge and the max
+    assert abs(clamped.quantile(0.75) - np.percentile(values, 75)) < 0.05
+
+    ranged = StreamingStatistics(quantile_error=0.001, value_range=(-2.5, 2.5)).update(values)
+    check(ranged, values.astype(np.float64), 0.001)
+
+
+def test_merge_needs_the_same_binning():
+    with pytest.raises(ValueError):
+        StreamingStatistics(value_range=(-1.0, 1.0)).merge(StreamingStatistics(value_range=(-2.5, 2.5)))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import stress_kernels
+from cloud_mask import PackedMask
+from ndvi_processor import NDVIProcessor
+
+
+@pytest.fixture
+def scenes():
+    rng = np.random.default_rng(0)
+    current = rng.uniform(-0.2, 0.9, (70, 90)).astype(np.float32)
+    baseline = rng.uniform(-0.2, 0.9, (70, 90)).astype(np.float32)
+    # Tiny baselines, class edges and cloud-masked pixels
+    baseline[:5] = 0.05
+    current[10, :len(NDVIProcessor().ndvi_classes)] = [low for low, _ in NDVIProcessor().ndvi_classes.values()]
+    current[20:30, 40:60] = np.nan
+    return current, baseline
+
+
+@pytest.mark.skipif(not stress_kernels.HAVE_NUMBA, reason="numba is not installed")
+def test_numba_matches_numpy(scenes):
+    current, baseline = scenes
+    processor = NDVIProcessor()
+    numpy_result = processor.analyze_vegetation(current, baseline, tile_size=32, engine='numpy')
+    numba_result = processor.analyze_vegetation(current, baseline, engine='numba')
+
+    np.testing.assert_array_equal(numba_result['classification'], numpy_result['classification'])
+    np.testing.assert_array_equal(numba_result['stress_mask'], numpy_result['stress_mask'])
+    np.testing.assert_allclose(numba_result['stress_severity'], numpy_result['stress_severity'], rtol=1e-6)
+    assert numba_result['class_counts'] == numpy_result['class_counts']
+    assert numba_result['stress_percentage'] == numpy_result['stress_percentage']
+
+
+def test_auto_engine_needs_a_thread_safe_layer(monkeypatch):
+    stress_kernels.numba_thread_safe.cache_clear()
+    monkeypatch.setenv('NUMBA_THREADING_LAYER', 'workqueue')
+    try:
+        assert not stress_kernels.numba_thread_safe()
+    finally:
+        stress_kernels.numba_thread_safe.cache_clear()
+
+
+def test_stress_percentage_is_of_clear_pixels(scenes):
+    current, baseline = scenes
+    processor = NDVIProcessor()
+    valid = ~np.isnan(current)
+    stress = processor.detect_stress_areas(current, baseline)
+    analysis = processor.analyze_vegetation(current, baseline, engine='numpy')
+    masked = processor.analyze_vegetation(current, baseline, engine='numpy', valid_mask=PackedMask.from_bool(valid))
+
+    expected = stress['stress_mask'].sum() / valid.sum() * 100
+    assert stress['stress_percentage'] == pytest.approx(expected)
+    assert analysis['stress_percentage'] == pytest.approx(expected)
+    assert masked['stress_percentage'] == pytest.approx(expected)
+    assert not stress['stress_mask'][~valid].any()
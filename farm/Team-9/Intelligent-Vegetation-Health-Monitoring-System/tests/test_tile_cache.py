@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from satellite_data import SatelliteDataProcessor
+from tile_cache import TileCache
+
+BBOX = {'min_lon': 91.64, 'min_lat': 26.05, 'max_lon': 91.83, 'max_lat': 26.24}
+START, END = datetime(2025, 5, 1, 9), datetime(2025, 5, 31, 9)
+BANDS = ('B04', 'B08', 'SCL')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TileCache(tmp_path, max_bytes=10_000)
+
+
+def test_key_is_stable_per_day_and_grid_cell(cache):
+    key = cache.make_key(BBOX, START, END, BANDS, 20)
+    assert cache.make_key(BBOX, START.replace(hour=17), END, BANDS, 20) == key
+    nudged = {name: value + cache.grid_deg / 10 for name, value in BBOX.items()}
+    assert cache.make_key(nudged, START, END, BANDS, 20) == key
+
+
+@pytest.mark.parametrize('change', [
+    {'start_date': datetime(2025, 4, 30)},
+    {'bands': ('B04', 'B08')},
+    {'max_cloud_coverage': 30},
+    {'source': {'demo': True, 'scene_size': 128, 'cloud_cover': 0.0, 'seed': None}},
+])
+def test_key_covers_every_request_field(cache, change):
+    request = {'bbox': BBOX, 'start_date': START, 'end_date': END, 'bands': BANDS, 'max_cloud_coverage': 20,
+               'source': {'demo': True, 'scene_size': 256, 'cloud_cover': 0.0, 'seed': None}}
+    assert cache.make_key(**request) != cache.make_key(**dict(request, **change))
+
+
+def test_processors_with_different_scenes_do_not_share_entries(cache, tmp_path):
+    processors = [SatelliteDataProcessor(cache=cache, scene_size=32),
+                  SatelliteDataProcessor(cache=cache, scene_size=48),
+                  SatelliteDataProcessor(cache=cache, scene_size=32, cloud_cover=0.1),
+                  SatelliteDataProcessor(cache=cache, local_dir=str(tmp_path / 'scenes'))]
+    keys = {cache.make_key(BBOX, START, END, BANDS, 20, processor.source()) for processor in processors}
+    assert len(keys) == len(processors)
+
+    assert processors[0].fetch_sentinel2_data(BBOX, START, END, BANDS).shape == (32, 32, 3)
+    assert processors[1].fetch_sentinel2_data(BBOX, START, END, BANDS).shape == (48, 48, 3)
+    assert cache.stats['hits'] == 0
+
+
+def test_hits_are_memory_mapped_and_lru_evicted(cache):
+    first = np.ones((32, 32), dtype=np.float32)
+    cache.put('a', first)
+    cache.put('b', first)
+    assert isinstance(cache.get('a'), np.memmap)
+    # 'b' is now least recently used and goes first
+    cache.put('c', first)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
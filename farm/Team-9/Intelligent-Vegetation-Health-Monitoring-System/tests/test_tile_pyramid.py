@@ -0,0 +1,102 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from tile_pyramid import EMPTY_TILE, TILE_SIZE, TilePyramid, tile_bounds, tile_range
+
+# Web Mercator's latitude limit
+MAX_LAT = 85.0511287798
+BBOX = {'min_lon': 91.64, 'min_lat': 26.05, 'max_lon': 91.83, 'max_lat': 26.24}
+
+
+def png_size(png):
+    """(width, height) from the IHDR chunk"""
+    return struct.unpack('>II', png[16:24])
+
+
+def png_indices(png):
+    """Palette indices of a PNG written by encode_png (single IDAT, filter type 0)"""
+    width, height = png_size(png)
+    start = png.index(b'IDAT') + 4
+    length = struct.unpack('>I', png[start - 8:start - 4])[0]
+    raw = np.frombuffer(zlib.decompress(png[start:start + length]), dtype=np.uint8)
+    return raw.reshape(height, width + 1)[:, 1:]
+
+
+@pytest.mark.parametrize('z, x, y, expected', [
+    (0, 0, 0, (-MAX_LAT, -180.0, MAX_LAT, 180.0)),
+    (1, 1, 0, (0.0, 0.0, MAX_LAT, 180.0)),
+    (2, 1, 1, (0.0, -90.0, 66.5132604431, 0.0)),
+    (3, 5, 3, (0.0, 45.0, 40.9798980696, 90.0)),
+])
+def test_tile_bounds(z, x, y, expected):
+    assert tile_bounds(z, x, y) == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.mark.parametrize('z', [0, 4, 9, 14])
+def test_tile_range_inverts_tile_bounds(z):
+    x0, x1, y0, y1 = tile_range(BBOX, z)
+    assert x0 <= x1 and y0 <= y1
+    south, west, north, east = tile_bounds(z, x0, y0)
+    assert west <= BBOX['min_lon'] < east and south < BBOX['max_lat'] <= north
+    south, west, north, east = tile_bounds(z, x1, y1)
+    assert west < BBOX['max_lon'] <= east and south <= BBOX['min_lat'] < north
+
+
+@pytest.fixture
+def pyramid(tmp_path):
+    ndvi = np.full((200, 200), 0.6, dtype=np.float32)
+    ndvi[:20] = np.nan
+    return TilePyramid(ndvi, BBOX, tmp_path / 'tiles')
+
+
+def test_tiles_outside_the_bbox_or_zoom_range_are_transparent(pyramid):
+    z = pyramid.native_zoom
+    x0, x1, y0, y1 = tile_range(BBOX, z)
+    assert pyramid.tile(z, x1 + 1, y0) == EMPTY_TILE
+    assert pyramid.tile(z, x0, y0 - 1) == EMPTY_TILE
+    assert pyramid.tile(pyramid.max_zoom + 1, x0, y0) == EMPTY_TILE
+    assert not png_indices(EMPTY_TILE).any()
+
+
+def test_rendered_tile_is_transparent_beyond_the_raster_and_over_nan(pyramid, tmp_path):
+    z = pyramid.native_zoom
+    x0, _, y0, _ = tile_range(BBOX, z)
+    south, west, north, east = tile_bounds(z, x0, y0)
+    indices = png_indices(pyramid.tile(z, x0, y0))
+    assert indices.shape == (TILE_SIZE, TILE_SIZE)
+
+    # Pixel centres as in TilePyramid.render, mapped to raster rows and columns
+    lons = west + (np.arange(TILE_SIZE) + 0.5) * (east - west) / TILE_SIZE
+    rows = y0 + (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * rows / 2 ** z))))
+    raster_row = np.floor((BBOX['max_lat'] - lats) / (BBOX['max_lat'] - BBOX['min_lat']) * 200)
+    inside_cols = lons >= BBOX['min_lon']
+    nan_rows = (raster_row >= 0) & (raster_row < 20)
+    clear_rows = (raster_row >= 20) & (raster_row < 200)
+    assert inside_cols.any() and nan_rows.any() and clear_rows.any()
+
+    assert not indices[:, ~inside_cols].any()
+    assert not indices[np.ix_(nan_rows, inside_cols)].any()
+    assert indices[np.ix_(clear_rows, inside_cols)].all()
+
+    # Rendered once, then served from the cache directory
+    assert sorted(path.relative_to(tmp_path / 'tiles').as_posix() for path in (tmp_path / 'tiles').rglob('*.png')) == \
+        [f"{z}/{x0}/{y0}.png"]
+    assert pyramid.tile(z, x0, y0) == pyramid.tile(z, x0, y0)
+
+
+@pytest.mark.parametrize('shape, max_size', [
+    ((1100, 1100), 512),
+    ((300, 2000), 512),  # short side fits a tile after one halving, long side does not fit the cap
+    ((200, 200), 64),    # smaller than one tile, so the pyramid has no overviews
+    ((100, 100), 512),
+])
+def test_overview_png_respects_the_size_cap(shape, max_size):
+    pyramid = TilePyramid(np.zeros(shape, dtype=np.float32), BBOX)
+    width, height = png_size(pyramid.overview_png(max_size))
+    assert max(width, height) <= max_size
+    # Halved no more than needed
+    assert 2 * max(width, height) > min(max_size, max(shape))
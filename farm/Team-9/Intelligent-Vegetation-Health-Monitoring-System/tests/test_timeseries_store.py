@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from baseline_store import BaselineStore, same_day_in_year
+from timeseries_store import NODATA, SCALE, TimeSeriesStore, dequantise, quantise
+
+LAT, LON = 26.1445, 91.7362
+# Two acquisitions per June for four years: eight frames over three-slot chunks
+DATES = [date(year, 6, day) for year in range(2021, 2025) for day in (1, 11)]
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    frames = rng.uniform(-0.2, 0.9, (len(DATES), 4, 5)).astype(np.float32)
+    frames[2, 0, 0] = frames[3, 1, 1] = np.nan  # straddles the first chunk boundary
+    return frames
+
+
+@pytest.fixture
+def store(tmp_path, frames):
+    store = TimeSeriesStore(tmp_path, chunk_time=3)
+    for when, ndvi in zip(DATES, frames):
+        store.append(LAT, LON, when, ndvi)
+    return store
+
+
+def test_quantisation_round_trip():
+    ndvi = np.array([-1.0, -0.12345, 0.0, 0.5, 0.99994, 1.0, np.nan, 1.7, -3.0], dtype=np.float32)
+    values = quantise(ndvi)
+    assert values.dtype == np.int16
+    assert values[6] == NODATA
+    restored = dequantise(values)
+    assert np.isnan(restored[6])
+    np.testing.assert_allclose(restored[:6], ndvi[:6], atol=0.5 / SCALE)
+    # Out-of-range values are clipped to the NDVI range
+    assert restored[7] == 1.0 and restored[8] == -1.0
+
+
+def test_read_across_chunks(store, frames):
+    dates, cube = store.read(LAT, LON)
+    assert dates == DATES
+    np.testing.assert_allclose(cube, frames, atol=0.5 / SCALE)
+    assert np.isnan(cube[2, 0, 0]) and np.isnan(cube[3, 1, 1])
+
+    # The last slot of the first chunk through the second chunk, in a pixel window
+    dates, window = store.read(LAT, LON, date(2022, 6, 1), date(2023, 6, 11), rows=slice(1, 3), cols=slice(2, 4))
+    assert dates == DATES[2:6]
+    np.testing.assert_array_equal(window, cube[2:6, 1:3, 2:4])
+
+
+def test_rolling_mean_across_chunk_boundaries(store):
+    _, cube = store.read(LAT, LON)
+    _, means = store.rolling_mean(LAT, LON, window=3)
+    for i in range(len(DATES)):
+        expected = np.nanmean(cube[max(0, i - 2):i + 1], axis=0)
+        np.testing.assert_allclose(means[i], expected, rtol=1e-6)
+
+
+def test_slope_matches_least_squares(store):
+    dates, cube = store.read(LAT, LON)
+    trend = store.trend(LAT, LON)
+    years = np.array([(d - date(1970, 1, 1)).days / 365.25 for d in dates])
+    for row in range(cube.shape[1]):
+        for col in range(cube.shape[2]):
+            values = cube[:, row, col]
+            ok = ~np.isnan(values)
+            expected = np.polyfit(years[ok], values[ok], 1)[0]
+            assert trend[row, col] == pytest.approx(expected, rel=1e-4)
+
+
+def test_anomaly_zscore_against_previous_seasons(store):
+    _, cube = store.read(LAT, LON)
+    z = store.anomaly(LAT, LON, date(2024, 6, 11), years=3, window_days=30)
+    # Both June acquisitions of 2021-2023 fall within 15 days of June 11
+    baseline = cube[:6]
+    expected = (cube[7] - np.nanmean(baseline, axis=0)) / np.nanstd(baseline, axis=0)
+    np.testing.assert_allclose(z, expected, rtol=1e-5)
+    assert store.anomaly(LAT, LON, date(2020, 6, 11)) is None
+
+
+def test_region_keys_match_the_baseline_store(tmp_path):
+    series, baselines = TimeSeriesStore(tmp_path / 'series'), BaselineStore(tmp_path / 'baselines')
+    for lat, lon in [(LAT, LON), (26.14449, 91.73621), (-12.005, 0.0)]:
+        assert series.region_key(lat, lon) == baselines.region_key(lat, lon)
+    assert same_day_in_year(date(2024, 2, 29), 2023) == date(2023, 2, 28)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import numpy as np
+from config import config
+
+
+class TileCache:
+    """Content-addressed on-disk cache for fetched satellite scenes.
+
+    Each scene is stored as `<key>.npy`, where the key hashes the request
+    (bbox snapped to a grid, date window, bands and cloud threshold) and
+    the data source, so differently configured processors sharing the
+    directory never get each other's scenes. Hits are returned as
+    read-only memory maps, so nothing is copied until a pixel is touched.
+    Least recently used files are evicted once the directory grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, grid_deg=None):
+        self.cache_dir = os.path.expanduser(cache_dir or config.TILE_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else config.TILE_CACHE_MAX_BYTES
+        self.grid_deg = grid_deg or config.TILE_CACHE_GRID_DEG
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._size = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    def make_key(self, bbox, start_date, end_date, bands, max_cloud_coverage, source=None):
+        """Stable key for a fetch request; `source` is a JSON-able description of where scenes come from"""
+        snapped = [round(bbox[k] / self.grid_deg) for k in ('min_lon', 'min_lat', 'max_lon', 'max_lat')]
+        request = {
+            'bbox': snapped,
+            'grid': self.grid_deg,
+            'start': _as_day(start_date),
+            'end': _as_day(end_date),
+            'bands': list(bands),
+            'clouds': max_cloud_coverage,
+            'source': source
+        }
+        payload = json.dumps(request, sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        """Return the cached array as a read-only memmap, or None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        path = self._path(key)
+        try:
+            os.utime(path)
+            return np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            # Removed behind our back (e.g. by another process); treat as a miss
+            with self._lock:
+                self._forget(key)
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def put(self, key, array):
+        """Store an array and return it memory-mapped from disk"""
+        array = np.asarray(array)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        # Write then rename so readers never see a partial file
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(key)
+            size = os.path.getsize(path)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+            kept = key in self._entries
+
+        # Scenes larger than the whole budget are evicted straight away
+        return np.load(path, mmap_mode='r') if kept else array
+
+    def get_or_fetch(self, key, fetch):
+        """Serve from cache, or call fetch() and cache its result"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        data = fetch()
+        if data is None:
+            return None
+        return self.put(key, data)
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove every cached scene"""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def stats(self):
+        """Hit/miss/eviction counters and current disk usage"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'max_bytes': self.max_bytes
+        }
+
+
+def _as_day(value):
+    """Dates are cached per day, so repeated runs on the same day share entries"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
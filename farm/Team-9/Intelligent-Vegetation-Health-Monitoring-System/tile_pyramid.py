@@ -0,0 +1,188 @@
+import hashlib
+import math
+import os
+import struct
+import zlib
+
+import numpy as np
+from config import config
+
+TILE_SIZE = 256
+
+
+def ndvi_palette():
+    """256-entry RGBA palette: index 0 is transparent, 1..255 map NDVI -1..1 red -> yellow -> green"""
+    position = np.linspace(0.0, 1.0, 255)
+    red = np.where(position < 0.5, 1.0, 2.0 * (1.0 - position))
+    green = np.where(position < 0.5, 2.0 * position, 1.0 - 0.4 * (position - 0.5))
+    blue = np.full_like(position, 0.1)
+    colours = (np.stack([red, green, blue], axis=1) * 255).round().astype(np.uint8)
+    palette = np.zeros((256, 4), dtype=np.uint8)
+    palette[1:, :3] = colours
+    palette[1:, 3] = 255
+    return palette
+
+
+PALETTE = ndvi_palette()
+
+
+def ndvi_to_index(values):
+    """Palette indices for NDVI values; NaN becomes the transparent index 0"""
+    index = np.nan_to_num((np.clip(values, -1.0, 1.0) + 1.0) * 127.0, nan=-1.0).astype(np.int16) + 1
+    return index.astype(np.uint8)
+
+
+def encode_png(index, palette=PALETTE, level=6):
+    """Paletted (colour type 3) PNG with transparency, written with zlib only"""
+    height, width = index.shape
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    # Each scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = index
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)),
+        chunk(b'PLTE', palette[:, :3].tobytes()),
+        chunk(b'tRNS', palette[:, 3].tobytes()),
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), level)),
+        chunk(b'IEND', b'')
+    ])
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8))
+
+
+def tile_bounds(z, x, y):
+    """(south, west, north, east) of an XYZ (Web Mercator) tile"""
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / 2 ** z))))
+    return lat(y + 1), x / 2 ** z * 360.0 - 180.0, lat(y), (x + 1) / 2 ** z * 360.0 - 180.0
+
+
+def tile_range(bbox, z):
+    """Inclusive (x0, x1, y0, y1) of the tiles covering a bbox at zoom z"""
+    def column(lon):
+        return min(2 ** z - 1, max(0, int((lon + 180.0) / 360.0 * 2 ** z)))
+
+    def row(lat):
+        lat = math.radians(lat)
+        value = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * 2 ** z
+        return min(2 ** z - 1, max(0, int(value)))
+
+    return column(bbox['min_lon']), column(bbox['max_lon']), row(bbox['max_lat']), row(bbox['min_lat'])
+
+
+def downsample(array):
+    """2x2 block mean ignoring NaN (odd edges keep their last row/column)"""
+    height, width = array.shape
+    padded = np.pad(array, ((0, height % 2), (0, width % 2)), mode='edge')
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    valid = ~np.isnan(blocks)
+    total = np.where(valid, blocks, 0).sum(axis=(1, 3))
+    count = valid.sum(axis=(1, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (total / count).astype(np.float32)
+
+
+class TilePyramid:
+    """Colour-mapped XYZ PNG tiles of one raster, rendered on demand and cached on disk.
+
+    The raster covers `bbox` (rows north to south, columns west to east).
+    Overviews are built by repeated 2x2 averaging; each tile samples the
+    coarsest overview that is still at least as fine as the tile, so a
+    zoomed-out viewport never reads the full-resolution array.
+
+    Layout: <cache_dir>/<z>/<x>/<y>.png
+    """
+
+    def __init__(self, array, bbox, cache_dir=None, max_zoom_offset=2):
+        self.bbox = bbox
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.overviews = [np.asarray(array, dtype=np.float32)]
+        while min(self.overviews[-1].shape) > TILE_SIZE:
+            self.overviews.append(downsample(self.overviews[-1]))
+
+        # Zooms where the tile pixel size is between the whole bbox and a few raster pixels
+        height, width = self.overviews[0].shape
+        pixel_deg = (bbox['max_lon'] - bbox['min_lon']) / width
+        self.native_zoom = max(0, round(math.log2(360.0 / (TILE_SIZE * pixel_deg))))
+        self.max_zoom = self.native_zoom + max_zoom_offset
+        self.min_zoom = max(0, self.native_zoom - len(self.overviews) - 3)
+
+    def tiles(self, z):
+        """(x, y) of every tile touching the raster at zoom z"""
+        x0, x1, y0, y1 = tile_range(self.bbox, z)
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def tile(self, z, x, y):
+        """PNG bytes of a tile (transparent outside the raster or the zoom range)"""
+        if not self.min_zoom <= z <= self.max_zoom:
+            return EMPTY_TILE
+        x0, x1, y0, y1 = tile_range(self.bbox, z)
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return EMPTY_TILE
+
+        path = os.path.join(self.cache_dir, str(z), str(x), f"{y}.png") if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        png = encode_png(self.render(z, x, y))
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, path)
+        return png
+
+    def render(self, z, x, y):
+        """Palette indices for one tile, sampled from the best overview"""
+        south, west, north, east = tile_bounds(z, x, y)
+        bbox = self.bbox
+
+        # Pixel centres: longitude is linear across the tile, latitude follows Mercator
+        lons = west + (np.arange(TILE_SIZE) + 0.5) * (east - west) / TILE_SIZE
+        rows = y + (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * rows / 2 ** z))))
+
+        tile_deg = (east - west) / TILE_SIZE
+        level = 0
+        while level + 1 < len(self.overviews):
+            width = self.overviews[level + 1].shape[1]
+            if (bbox['max_lon'] - bbox['min_lon']) / width > tile_deg:
+                break
+            level += 1
+        overview = self.overviews[level]
+        height, width = overview.shape
+
+        row_index = np.floor((bbox['max_lat'] - lats) / (bbox['max_lat'] - bbox['min_lat']) * height).astype(np.int64)
+        col_index = np.floor((lons - bbox['min_lon']) / (bbox['max_lon'] - bbox['min_lon']) * width).astype(np.int64)
+        row_ok = (row_index >= 0) & (row_index < height)
+        col_ok = (col_index >= 0) & (col_index < width)
+
+        index = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        if row_ok.any() and col_ok.any():
+            sampled = overview[np.ix_(row_index[row_ok], col_index[col_ok])]
+            index[np.ix_(row_ok, col_ok)] = ndvi_to_index(sampled)
+        return index
+
+    def overview_png(self, max_size=512):
+        """Whole raster as one PNG no larger than `max_size`, for an ImageOverlay"""
+        for overview in self.overviews:
+            if max(overview.shape) <= max_size:
+                break
+        # The pyramid stops once the short side fits a tile; long thin rasters or small caps need more halving
+        while max(overview.shape) > max_size:
+            overview = downsample(overview)
+        return encode_png(ndvi_to_index(overview))
+
+
+def pyramid_dir(array, bbox):
+    """Cache directory keyed by raster content and extent, so a recomputed result never reuses stale tiles"""
+    digest = hashlib.sha256(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+    digest.update(repr(sorted(bbox.items())).encode())
+    return os.path.join(os.path.expanduser(config.TILE_PYRAMID_DIR), digest.hexdigest()[:24])
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from baseline_store import region_key, same_day_in_year
+from config import config
+
+# int16 quantisation: NDVI * SCALE, NODATA marks missing pixels and empty slots
+SCALE = 10000
+NODATA = np.iinfo(np.int16).min
+EPOCH = date(1970, 1, 1)
+
+
+class TimeSeriesStore:
+    """Append-only per-region NDVI history as a chunked, memory-mapped (time, y, x) cube.
+
+    Every acquisition is quantised to int16 (1e-4 NDVI steps, NODATA for
+    NaN) and written to the next slot of the current chunk, a .npy file
+    of `chunk_time` slots opened with np.memmap. Reads only open the
+    chunks that overlap the requested dates, and a spatial window only
+    touches those rows of each chunk.
+
+    Layout:
+        <root>/<region>/index.json      shape, chunk size and acquisition days
+        <root>/<region>/chunk_<n>.npy   int16 (chunk_time, height, width)
+    """
+
+    def __init__(self, root=None, chunk_time=None, grid_deg=None):
+        self.root = os.path.expanduser(root or config.TIMESERIES_STORE_DIR)
+        self.chunk_time = chunk_time or config.TIMESERIES_CHUNK_TIME
+        self.grid_deg = grid_deg or config.TILE_CACHE_GRID_DEG
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def region_key(self, lat, lon):
+        """Directory name for a location snapped to the grid (same as BaselineStore)"""
+        return region_key(lat, lon, self.grid_deg)
+
+    def _region_dir(self, lat, lon):
+        return os.path.join(self.root, self.region_key(lat, lon))
+
+    def _read_index(self, directory):
+        try:
+            with open(os.path.join(directory, 'index.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_index(self, directory, index):
+        tmp_path = os.path.join(directory, 'index.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(directory, 'index.json'))
+
+    def _chunk(self, directory, index, number, mode='r'):
+        path = os.path.join(directory, f"chunk_{number:05d}.npy")
+        if mode == 'r':
+            return np.load(path, mmap_mode='r')
+        if not os.path.exists(path):
+            shape = (index['chunk_time'], *index['shape'])
+            chunk = np.lib.format.open_memmap(path, mode='w+', dtype=np.int16, shape=shape)
+            chunk[:] = NODATA
+            return chunk
+        return np.load(path, mmap_mode='r+')
+
+    def append(self, lat, lon, when, ndvi):
+        """Add one acquisition. Dates must not go backwards; a second
+        acquisition on the last stored day replaces it."""
+        directory = self._region_dir(lat, lon)
+        day = (_as_date(when) - EPOCH).days
+        ndvi = np.asarray(ndvi, dtype=np.float32)
+
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            index = self._read_index(directory) or {
+                'shape': list(ndvi.shape), 'chunk_time': self.chunk_time, 'days': []
+            }
+            if list(ndvi.shape) != index['shape']:
+                raise ValueError(f"NDVI shape {ndvi.shape} does not match stored series {tuple(index['shape'])}")
+
+            days = index['days']
+            if days and day < days[-1]:
+                raise ValueError(f"{_as_date(when)} is before the last stored acquisition {_from_day(days[-1])}")
+            if days and day == days[-1]:
+                slot = len(days) - 1
+            else:
+                slot = len(days)
+                days.append(day)
+
+            chunk = self._chunk(directory, index, slot // index['chunk_time'], mode='r+')
+            chunk[slot % index['chunk_time']] = quantise(ndvi)
+            chunk.flush()
+            del chunk
+            self._write_index(directory, index)
+        return slot
+
+    def dates(self, lat, lon):
+        index = self._read_index(self._region_dir(lat, lon))
+        return [_from_day(day) for day in index['days']] if index else []
+
+    def read(self, lat, lon, start=None, end=None, rows=None, cols=None):
+        """(dates, float32 cube) for acquisitions in [start, end], optionally a pixel window.
+
+        Only the chunks covering those dates are opened, and only the
+        requested rows of each are read from disk.
+        """
+        directory = self._region_dir(lat, lon)
+        index = self._read_index(directory)
+        if index is None:
+            return [], None
+        days = np.array(index['days'], dtype=np.int64)
+        first = 0 if start is None else int(np.searchsorted(days, (_as_date(start) - EPOCH).days, side='left'))
+        last = len(days) if end is None else int(np.searchsorted(days, (_as_date(end) - EPOCH).days, side='right'))
+
+        rows = rows or slice(None)
+        cols = cols or slice(None)
+        parts = []
+        chunk_time = index['chunk_time']
+        for number in range(first // chunk_time, -(-last // chunk_time)):
+            chunk = self._chunk(directory, index, number)
+            low = max(first - number * chunk_time, 0)
+            high = min(last - number * chunk_time, chunk_time)
+            parts.append(dequantise(chunk[low:high, rows, cols]))
+
+        height, width = index['shape']
+        cube = np.concatenate(parts) if parts else np.empty((0, height, width), dtype=np.float32)[:, rows, cols]
+        return [_from_day(day) for day in days[first:last]], cube
+
+    def rolling_mean(self, lat, lon, window, start=None, end=None, **region):
+        dates, cube = self.read(lat, lon, start, end, **region)
+        return dates, rolling_mean(cube, window)
+
+    def trend(self, lat, lon, start=None, end=None, **region):
+        """Per-pixel NDVI slope (per year) over [start, end]"""
+        dates, cube = self.read(lat, lon, start, end, **region)
+        return slope(cube, dates)
+
+    def anomaly(self, lat, lon, when, years=None, window_days=None, **region):
+        """Per-pixel z-score of the acquisition on or before `when` against the
+        same season in the previous `years` years (default BASELINE_YEARS)"""
+        years = years or config.BASELINE_YEARS
+        half_window = timedelta(days=(window_days or config.BASELINE_WINDOW_DAYS) // 2)
+        when = _as_date(when)
+
+        dates, current = self.read(lat, lon, when - half_window, when, **region)
+        if not dates:
+            return None
+        baseline = []
+        for year in range(when.year - years, when.year):
+            centre = same_day_in_year(when, year)
+            baseline.append(self.read(lat, lon, centre - half_window, centre + half_window, **region)[1])
+        baseline = np.concatenate(baseline)
+        if not len(baseline):
+            return None
+        return zscore(current[-1], baseline)
+
+
+def quantise(ndvi):
+    """float NDVI -> int16 with NODATA for NaN"""
+    scaled = np.rint(np.clip(ndvi, -1.0, 1.0) * SCALE)
+    return np.where(np.isnan(ndvi), NODATA, scaled).astype(np.int16)
+
+
+def dequantise(values):
+    """int16 -> float32 NDVI with NaN for NODATA"""
+    ndvi = values.astype(np.float32) / SCALE
+    ndvi[values == NODATA] = np.nan
+    return ndvi
+
+
+def rolling_mean(cube, window):
+    """NaN-aware trailing mean over `window` acquisitions along the time axis"""
+    valid = ~np.isnan(cube)
+    values = np.where(valid, cube, 0.0)
+    means = np.empty(cube.shape, dtype=np.float32)
+    total = np.zeros(cube.shape[1:], dtype=np.float64)
+    count = np.zeros(cube.shape[1:], dtype=np.int32)
+    # Running sums frame by frame: np.cumsum along axis 0 strides through memory
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(len(cube)):
+            total += values[i]
+            count += valid[i]
+            if i >= window:
+                total -= values[i - window]
+                count -= valid[i - window]
+            np.divide(total, count, out=means[i], casting='unsafe')
+    return means
+
+
+def slope(cube, dates):
+    """NaN-aware least-squares slope along time, in NDVI per year"""
+    t = np.array([(_as_date(d) - EPOCH).days / 365.25 for d in dates], dtype=np.float64)
+    t = t.reshape(-1, *([1] * (cube.ndim - 1)))
+    valid = ~np.isnan(cube)
+    n = valid.sum(axis=0)
+    y = np.where(valid, cube, 0.0)
+    tv = np.where(valid, t, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_mean = tv.sum(axis=0) / n
+        y_mean = y.sum(axis=0) / n
+        covariance = (np.where(valid, (t - t_mean) * (cube - y_mean), 0.0)).sum(axis=0)
+        variance = (np.where(valid, (t - t_mean) ** 2, 0.0)).sum(axis=0)
+        return np.where(n >= 2, covariance / variance, np.nan).astype(np.float32)
+
+
+def zscore(current, baseline):
+    """(current - mean) / std over the baseline acquisitions, per pixel"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(baseline, axis=0)
+        std = np.nanstd(baseline, axis=0)
+        return ((current - mean) / std).astype(np.float32)
+
+
+def _as_date(value):
+    return value.date() if hasattr(value, 'date') else value
+
+
+def _from_day(day):
+    return EPOCH + timedelta(days=int(day))
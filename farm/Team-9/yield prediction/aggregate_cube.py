@@ -0,0 +1,287 @@
+"""Materialised crop x state x season x year aggregate cube.
+
+Dashboards and the anomaly explanations need per-crop (or per-state, ...)
+rollups of crop_yield.csv; the notebook recomputes them from the raw rows
+with a groupby every run. The cube keeps, for every (Crop, State, Season,
+Crop_Year) cell, the count, sum, min, max and M2 (sum of squared
+deviations) of each measure. These merge exactly, so any rollup's
+count, sum, mean and std come from the cells, and appending a new year
+only adds cells.
+
+The common rollup levels are also kept materialised, so dashboard queries
+do not touch the cells at all. Quantiles do not merge from summaries, so
+each of those levels carries per-group histograms over shared equi-depth
+bins; histograms add, and p25/p50/p75 are interpolated within a bin
+(clamped to the group's exact min/max).
+
+Everything is stored column by column in one compressed .npz file.
+
+    python aggregate_cube.py [crop_yield.csv] [aggregate_cube.npz]
+    python aggregate_cube.py --append new_year.csv [aggregate_cube.npz]
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from anomaly_explainer import FEATURES
+from anomaly_store import CROP_YIELD_CSV, DATA_DIR, load_crop_yield
+
+CUBE_PATH = os.getenv("AGGREGATE_CUBE_PATH", os.path.join(DATA_DIR, "aggregate_cube.npz"))
+
+DIMENSIONS = ["Crop", "State", "Season", "Crop_Year"]
+MEASURES = FEATURES
+
+# Rollups kept materialised, each with quantile histograms
+ROLLUP_LEVELS = [("Crop",), ("State",), ("Crop", "State"), ("Crop", "Season")]
+QUANTILES = (0.25, 0.5, 0.75)
+HISTOGRAM_BINS = 128
+
+# Query keyword -> dimension
+FILTERS = {"crop": "Crop", "state": "State", "season": "Season", "year": "Crop_Year"}
+
+
+def _cell_summaries(df):
+    """count/sum/min/max/m2 per (Crop, State, Season, Crop_Year) cell"""
+    grouped = df.groupby(DIMENSIONS)[MEASURES]
+    mean = grouped.transform("mean")
+    parts = {
+        "count": grouped.size().to_frame("count"),
+        "sum": grouped.sum(),
+        "min": grouped.min(),
+        "max": grouped.max(),
+        "m2": ((df[MEASURES] - mean) ** 2).groupby([df[d] for d in DIMENSIONS]).sum(),
+    }
+    return _join(parts)
+
+
+def _join(parts):
+    frames = [parts["count"]]
+    for stat in ("sum", "min", "max", "m2"):
+        frames.append(parts[stat].add_prefix(f"{stat}:"))
+    return pd.concat(frames, axis=1)
+
+
+def _rollup(cells, by):
+    """Merge cell summaries into groups of `by`; m2 uses Chan's parallel formula"""
+    grouped = cells.groupby(level=list(by), sort=True)
+    count = grouped["count"].sum()
+    sums = grouped[[f"sum:{m}" for m in MEASURES]].sum()
+    parts = {
+        "count": count.to_frame("count"),
+        "sum": sums.set_axis(MEASURES, axis=1),
+        "min": grouped[[f"min:{m}" for m in MEASURES]].min().set_axis(MEASURES, axis=1),
+        "max": grouped[[f"max:{m}" for m in MEASURES]].max().set_axis(MEASURES, axis=1),
+    }
+
+    # m2 = sum of the cells' m2 + sum of n_i * (mean_i - group mean)^2
+    cell_count = cells["count"].to_numpy()[:, None]
+    cell_mean = cells[[f"sum:{m}" for m in MEASURES]].to_numpy() / cell_count
+    group_mean = parts["sum"].div(count, axis=0)
+    keys = cells.index.droplevel([d for d in cells.index.names if d not in by])
+    if len(by) > 1:
+        keys = keys.reorder_levels(list(by))
+    group_mean = group_mean.reindex(keys)
+    spread = cell_count * (cell_mean - group_mean.to_numpy()) ** 2
+    m2 = cells[[f"m2:{m}" for m in MEASURES]].to_numpy() + spread
+    parts["m2"] = pd.DataFrame(m2, index=cells.index, columns=MEASURES).groupby(level=list(by), sort=True).sum()
+    return _join(parts)
+
+
+class AggregateCube:
+    """Cell summaries, materialised rollups and quantile histograms; see the module docstring"""
+
+    def __init__(self, cells, edges, rollups, histograms):
+        self.cells = cells
+        self.edges = edges            # (len(MEASURES), HISTOGRAM_BINS + 1)
+        self.rollups = rollups        # level -> summaries per group, like cells
+        self.histograms = histograms  # level -> DataFrame of (groups, measures * bins) counts
+        self._results = {}            # (by, filters) -> query result, until the next append
+
+    @classmethod
+    def build(cls, df):
+        """Cube over a (normalised) crop_yield frame"""
+        df = df[DIMENSIONS + MEASURES]
+        # Equi-depth bin edges over the whole dataset, shared by every group
+        levels = np.linspace(0, 1, HISTOGRAM_BINS + 1)
+        edges = np.quantile(df[MEASURES].to_numpy(dtype=np.float64), levels, axis=0).T.copy()
+        cells = _cell_summaries(df)
+        rollups = {level: _rollup(cells, level) for level in ROLLUP_LEVELS}
+        cube = cls(cells, edges, rollups, {})
+        cube.histograms = {level: cube._histogram(df, level) for level in ROLLUP_LEVELS}
+        return cube
+
+    def _histogram(self, df, level):
+        bins = np.empty((len(df), len(MEASURES)), dtype=np.int64)
+        for i, measure in enumerate(MEASURES):
+            inner = self.edges[i, 1:-1]
+            bins[:, i] = np.searchsorted(inner, df[measure].to_numpy(), side="right")
+
+        codes, keys = pd.MultiIndex.from_frame(df[list(level)]).factorize()
+        counts = np.zeros((len(keys), len(MEASURES), HISTOGRAM_BINS), dtype=np.uint32)
+        for i in range(len(MEASURES)):
+            np.add.at(counts[:, i], (codes, bins[:, i]), 1)
+        columns = pd.MultiIndex.from_product([MEASURES, range(HISTOGRAM_BINS)])
+        index = keys.set_names(level) if len(level) > 1 else keys.get_level_values(0).rename(level[0])
+        return pd.DataFrame(counts.reshape(len(keys), -1), index=index, columns=columns).sort_index()
+
+    def append(self, df):
+        """Add new rows (e.g. a new year); rows for cells already in the cube are rejected"""
+        df = df[DIMENSIONS + MEASURES]
+        new_cells = _cell_summaries(df)
+        overlap = new_cells.index.intersection(self.cells.index)
+        if len(overlap):
+            raise ValueError(f"{len(overlap)} appended cells are already in the cube, e.g. {overlap[0]}")
+
+        self.cells = pd.concat([self.cells, new_cells]).sort_index()
+        for level in ROLLUP_LEVELS:
+            # Rollup summaries merge like cells; histograms simply add
+            merged = pd.concat([self.rollups[level], _rollup(new_cells, level)])
+            self.rollups[level] = _rollup(merged, level)
+            added = self._histogram(df, level)
+            self.histograms[level] = self.histograms[level].add(added, fill_value=0).astype(np.uint32)
+        self._results.clear()
+        return len(new_cells)
+
+    def query(self, by=("Crop",), **filters):
+        """Count, sum, mean, std, min, max (and quantiles where available) of each measure per group.
+
+        Filters are crop=, state=, season=, year=. Levels in ROLLUP_LEVELS
+        are read from the materialised rollups (with quantiles) when only
+        their own dimensions are filtered; anything else is rolled up
+        from the cells. Results are memoised until the next append.
+        """
+        by = tuple(by)
+        filters = {FILTERS[name]: value for name, value in filters.items() if value is not None}
+        key = (by, tuple(sorted(filters.items())))
+        if key not in self._results:
+            self._results[key] = self._query(by, filters)
+        return self._results[key].copy()
+
+    def _query(self, by, filters):
+        materialised = by in self.rollups and set(filters) <= set(by)
+        rolled = self.rollups[by] if materialised else self.cells
+        for dimension, value in filters.items():
+            values = rolled.index.get_level_values(dimension)
+            rolled = rolled[values == (int(value) if dimension == "Crop_Year" else str(value).strip())]
+        if not materialised:
+            rolled = _rollup(rolled, by)
+
+        # Columns are gathered as arrays and assembled once
+        count = rolled["count"].to_numpy()
+        columns = {"count": count}
+        for measure in MEASURES:
+            total = rolled[f"sum:{measure}"].to_numpy()
+            m2 = rolled[f"m2:{measure}"].to_numpy()
+            columns[f"{measure}_sum"] = total
+            columns[f"{measure}_mean"] = total / count
+            columns[f"{measure}_std"] = np.sqrt(m2 / np.maximum(count - 1, 1), where=count > 1,
+                                               out=np.full(len(count), np.nan))
+            columns[f"{measure}_min"] = rolled[f"min:{measure}"].to_numpy()
+            columns[f"{measure}_max"] = rolled[f"max:{measure}"].to_numpy()
+
+        if materialised:
+            histogram = self.histograms[by]
+            if not histogram.index.equals(rolled.index):
+                histogram = histogram.reindex(rolled.index)
+            histogram = histogram.to_numpy(dtype=np.float64)
+            histogram = histogram.reshape(len(rolled), len(MEASURES), HISTOGRAM_BINS)
+            cumulative = np.cumsum(histogram, axis=2)
+            for i, measure in enumerate(MEASURES):
+                for q in QUANTILES:
+                    value = self._quantile(histogram[:, i], cumulative[:, i], i, q)
+                    value = np.clip(value, columns[f"{measure}_min"], columns[f"{measure}_max"])
+                    columns[f"{measure}_p{int(q * 100)}"] = value
+        return pd.DataFrame(columns, index=rolled.index)
+
+    def _quantile(self, counts, cumulative, measure, q):
+        """Interpolated q-quantile per row of a (groups, bins) histogram and its cumsum"""
+        target = q * cumulative[:, -1]
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), HISTOGRAM_BINS - 1)
+        rows = np.arange(len(counts))
+        before = np.where(bins > 0, cumulative[rows, bins - 1], 0)
+        inside = np.maximum(counts[rows, bins], 1)
+        fraction = np.clip((target - before) / inside, 0, 1)
+        low = self.edges[measure, bins]
+        high = self.edges[measure, bins + 1]
+        return low + fraction * (high - low)
+
+    def means(self, by="Crop"):
+        """Per-group means of each measure, like df.groupby(by)[FEATURES].mean()"""
+        result = self.query(by=(by,))
+        return result[[f"{m}_mean" for m in MEASURES]].set_axis(MEASURES, axis=1)
+
+    def save(self, path=CUBE_PATH):
+        arrays = {"edges": self.edges}
+        _store(arrays, "cells", self.cells)
+        for level in ROLLUP_LEVELS:
+            name = "+".join(level)
+            _store(arrays, f"rollup/{name}", self.rollups[level])
+            _store(arrays, f"hist/{name}", self.histograms[level], matrix=True)
+        # Write next to the target and swap, so readers never see a partial file
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        columns = pd.MultiIndex.from_product([MEASURES, range(HISTOGRAM_BINS)])
+        with np.load(path) as data:
+            cells = _restore(data, "cells", DIMENSIONS)
+            rollups, histograms = {}, {}
+            for level in ROLLUP_LEVELS:
+                name = "+".join(level)
+                rollups[level] = _restore(data, f"rollup/{name}", level)
+                histograms[level] = _restore(data, f"hist/{name}", level, columns)
+            return cls(cells, data["edges"], rollups, histograms)
+
+
+SUMMARY_COLUMNS = ["count"] + [f"{s}:{m}" for s in ("sum", "min", "max", "m2") for m in MEASURES]
+
+
+def _store(arrays, prefix, frame, matrix=False):
+    """Add a frame's index levels and values to `arrays`, one array per column"""
+    for name in frame.index.names:
+        values = frame.index.get_level_values(name)
+        arrays[f"{prefix}/{name}"] = values.to_numpy(dtype=np.int64 if name == "Crop_Year" else str)
+    if matrix:
+        arrays[f"{prefix}/values"] = frame.to_numpy()
+    else:
+        for column in frame.columns:
+            arrays[f"{prefix}/{column}"] = frame[column].to_numpy()
+
+
+def _restore(data, prefix, names, columns=None):
+    """Inverse of _store; `columns` given means the values were stored as one matrix"""
+    keys = [data[f"{prefix}/{name}"] for name in names]
+    keys = [k if name == "Crop_Year" else k.astype(object) for k, name in zip(keys, names)]
+    index = pd.MultiIndex.from_arrays(keys, names=list(names)) if len(names) > 1 \
+        else pd.Index(keys[0], name=names[0])
+    if columns is not None:
+        return pd.DataFrame(data[f"{prefix}/values"], index=index, columns=columns)
+    return pd.DataFrame({column: data[f"{prefix}/{column}"] for column in SUMMARY_COLUMNS}, index=index)
+
+
+def open_cube(path=CUBE_PATH, source=CROP_YIELD_CSV):
+    """Load the cube, building it from `source` the first time"""
+    if os.path.exists(path):
+        return AggregateCube.load(path)
+    cube = AggregateCube.build(load_crop_yield(source))
+    cube.save(path)
+    return cube
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--append":
+        path = sys.argv[3] if len(sys.argv) > 3 else CUBE_PATH
+        cube = AggregateCube.load(path)
+        added = cube.append(load_crop_yield(sys.argv[2]))
+        cube.save(path)
+        print(f"Appended {added} cells to {path}")
+    else:
+        source = sys.argv[1] if len(sys.argv) > 1 else CROP_YIELD_CSV
+        path = sys.argv[2] if len(sys.argv) > 2 else CUBE_PATH
+        cube = AggregateCube.build(load_crop_yield(source))
+        cube.save(path)
+        print(f"Saved {len(cube.cells)} cells to {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
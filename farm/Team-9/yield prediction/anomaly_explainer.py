@@ -0,0 +1,109 @@
+"""Vectorised reasons/remedies for crop yield anomalies.
+
+Replaces the row-wise `explain_row` from predict.ipynb: each of the five
+checks is one boolean column operation, the results are packed into a
+bitmask per row, and the strings are only looked up when the report is
+written.
+
+    python anomaly_explainer.py [crop_yield.csv] [anomaly_report_with_reasons.csv]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ["Area", "Production", "Annual_Rainfall", "Fertilizer", "Pesticide", "Yield"]
+
+# A value below LOW_RATIO x the crop average triggers the reason
+LOW_RATIO = 0.8
+
+# Bit i of the flags <-> REASONS[i], in the order the report lists them
+REASONS = [
+    ("Fertilizer", "Low fertilizer usage",
+     "Increase fertilizer application as per crop guidelines."),
+    ("Annual_Rainfall", "Low rainfall compared to average",
+     "Adopt irrigation or drought-resistant crop varieties."),
+    ("Pesticide", "Insufficient pest control",
+     "Implement integrated pest management."),
+    ("Yield", "Yield lower than average for this crop",
+     "Check soil health and farming practices; provide training."),
+    ("Production", "Production is significantly lower than typical",
+     "Assess inputs and growing conditions, provide expert support."),
+]
+DEFAULT_REASON = "Anomalous pattern detected"
+DEFAULT_REMEDY = "Comprehensive review of all farming inputs is recommended."
+
+
+def detect_anomalies(df, contamination=0.1, random_state=42):
+    """IsolationForest step from the notebook; returns the anomalous rows"""
+    from sklearn.ensemble import IsolationForest
+
+    df = df.copy()
+    df[FEATURES] = df[FEATURES].fillna(0)
+    clf = IsolationForest(contamination=contamination, random_state=random_state)
+    df['anomaly'] = clf.fit_predict(df[FEATURES])
+    return df, df[df['anomaly'] == -1].copy()
+
+
+def crop_averages(df):
+    """Per-crop feature means, indexed by Crop"""
+    return df.groupby("Crop")[FEATURES].mean()
+
+
+def reason_flags(anomalies, averages):
+    """uint8 bitmask per row: bit i set when REASONS[i] applies"""
+    # One aligned lookup instead of merging the averages into the frame
+    avg = averages.reindex(anomalies["Crop"].to_numpy())
+    flags = np.zeros(len(anomalies), dtype=np.uint8)
+    for bit, (column, _, _) in enumerate(REASONS):
+        low = anomalies[column].to_numpy() < LOW_RATIO * avg[column].to_numpy()
+        flags |= low.astype(np.uint8) << bit
+    return flags
+
+
+def _text_table(index):
+    """String for every possible bitmask, built once"""
+    table = []
+    for flags in range(1 << len(REASONS)):
+        parts = [reason[index] for bit, reason in enumerate(REASONS) if flags >> bit & 1]
+        table.append("; ".join(parts) if parts else (DEFAULT_REASON if index == 1 else DEFAULT_REMEDY))
+    return np.array(table, dtype=object)
+
+
+REASON_TEXT = _text_table(1)
+REMEDY_TEXT = _text_table(2)
+
+
+def decode_flags(flags):
+    """Reasons and remedies strings for an array of bitmasks"""
+    return REASON_TEXT[flags], REMEDY_TEXT[flags]
+
+
+def explain_anomalies(anomalies, df=None, averages=None, with_averages=False):
+    """Add a Reason_Flags column (and, optionally, the *_avg columns) to the anomalies"""
+    if averages is None:
+        averages = crop_averages(df)
+    explained = anomalies.copy()
+    explained["Reason_Flags"] = reason_flags(anomalies, averages)
+    if with_averages:
+        avg = averages.reindex(anomalies["Crop"].to_numpy())
+        for column in FEATURES:
+            explained[f"{column}_avg"] = avg[column].to_numpy()
+    return explained
+
+
+def build_report(explained):
+    """Final report in the notebook's layout; strings are materialised here only"""
+    report = explained[["Crop", "State", "Area", "Production", "Yield"]].copy()
+    report["Reasons"], report["Remedies"] = decode_flags(explained["Reason_Flags"].to_numpy())
+    return report
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "crop_yield.csv"
+    output = sys.argv[2] if len(sys.argv) > 2 else "anomaly_report_with_reasons.csv"
+
+    df, anomalies = detect_anomalies(pd.read_csv(source))
+    report = build_report(explain_anomalies(anomalies, df))
+    report.to_csv(output, index=False)
+    print(f"Report saved as {output} ({len(report)} anomalies)")
@@ -0,0 +1,214 @@
+"""Chunked, parallel IsolationForest scoring for crop_yield-style CSVs.
+
+The notebook loads the whole CSV and fits IsolationForest on the raw
+features, where Fertilizer (millions) drowns out Yield (single digits).
+This script streams the input in chunks:
+
+  1. one pass draws a uniform random sample (bottom-k on random keys),
+  2. features are log1p-transformed and standardised on that sample, and
+     one model is fitted globally or per Crop/State,
+  3. a second pass scores chunks on a thread pool and appends them to the
+     output, so memory stays flat however large the input gets.
+
+    python anomaly_scoring.py crop_yield.csv scored.csv [--group-by Crop] [--n-jobs 4]
+
+Parquet input/output (.parquet) needs pyarrow.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anomaly_explainer import FEATURES
+
+
+def iter_chunks(path, chunksize):
+    """DataFrames of up to `chunksize` rows from a CSV or (memory-mapped) Parquet file"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def prepare(chunk):
+    chunk[FEATURES] = chunk[FEATURES].fillna(0)
+    return chunk
+
+
+def draw_sample(path, sample_size, chunksize, seed=42):
+    """Uniform sample of `sample_size` rows in one streaming pass"""
+    rng = np.random.default_rng(seed)
+    sample = None
+    for chunk in iter_chunks(path, chunksize):
+        chunk = prepare(chunk)
+        chunk["_key"] = rng.random(len(chunk))
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if len(sample) > sample_size:
+            sample = sample.nsmallest(sample_size, "_key")
+    return sample.drop(columns="_key").reset_index(drop=True)
+
+
+class FeatureScaler:
+    """log1p + standardisation fitted on the sample"""
+
+    def fit(self, frame):
+        values = np.log1p(np.clip(frame[FEATURES].to_numpy(dtype=np.float64), 0, None))
+        self.mean = values.mean(axis=0)
+        self.std = values.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        return self
+
+    def transform(self, frame):
+        values = np.log1p(np.clip(frame[FEATURES].to_numpy(dtype=np.float64), 0, None))
+        return (values - self.mean) / self.std
+
+
+class AnomalyScorer:
+    """IsolationForest fitted on a sample, globally or one model per group"""
+
+    def __init__(self, contamination=0.1, group_by=None, min_group_rows=50, n_jobs=1, random_state=42):
+        self.contamination = contamination
+        self.group_by = group_by
+        self.min_group_rows = min_group_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.scaler = FeatureScaler()
+        self.models = {}
+
+    def _model(self, features, n_jobs=1):
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(contamination=self.contamination, random_state=self.random_state, n_jobs=n_jobs)
+        return model.fit(features)
+
+    def fit(self, sample):
+        features = self.scaler.fit(sample).transform(sample)
+        self.global_model = self._model(features, self.n_jobs)
+        if self.group_by:
+            groups = sample[self.group_by].astype(str).str.strip().to_numpy()
+            names, counts = np.unique(groups, return_counts=True)
+            names = names[counts >= self.min_group_rows]
+            # Many small models: fit them side by side rather than parallelising each one
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+                fitted = pool.map(lambda group: self._model(features[groups == group]), names)
+                self.models = dict(zip(names, fitted))
+        return self
+
+    def score(self, chunk):
+        """Adds anomaly_score (lower = more anomalous) and anomaly (-1/1) columns"""
+        chunk = prepare(chunk)
+        features = self.scaler.transform(chunk)
+        scores = np.empty(len(chunk))
+        if self.models:
+            groups = chunk[self.group_by].astype(str).str.strip().to_numpy()
+            handled = np.zeros(len(chunk), dtype=bool)
+            for group, model in self.models.items():
+                rows = groups == group
+                if rows.any():
+                    scores[rows] = model.decision_function(features[rows])
+                    handled |= rows
+            rest = ~handled
+            if rest.any():
+                scores[rest] = self.global_model.decision_function(features[rest])
+        else:
+            scores[:] = self.global_model.decision_function(features)
+        chunk["anomaly_score"] = scores
+        chunk["anomaly"] = np.where(scores < 0, -1, 1)
+        return chunk
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, chunk):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(source, output, chunksize=50_000, sample_size=100_000, n_jobs=1,
+               group_by=None, contamination=0.1, anomalies_only=False):
+    """Fit on a sample of `source`, stream scores to `output`; returns run stats"""
+    start = time.perf_counter()
+    sample = draw_sample(source, sample_size, chunksize)
+    scorer = AnomalyScorer(contamination=contamination, group_by=group_by, n_jobs=n_jobs).fit(sample)
+    fitted = time.perf_counter()
+
+    writer = ChunkWriter(output)
+    anomalies = 0
+    try:
+        # Keep at most n_jobs chunks in flight so memory stays bounded; write in input order
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            pending = []
+            for chunk in iter_chunks(source, chunksize):
+                pending.append(pool.submit(scorer.score, chunk))
+                if len(pending) >= n_jobs:
+                    anomalies += _write(writer, pending.pop(0).result(), anomalies_only)
+            for future in pending:
+                anomalies += _write(writer, future.result(), anomalies_only)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'sample_rows': len(sample),
+        'models': 1 + len(scorer.models),
+        'anomalies': anomalies,
+        'rows_written': writer.rows,
+        'fit_seconds': fitted - start,
+        'total_seconds': elapsed
+    }
+
+
+def _write(writer, chunk, anomalies_only):
+    flagged = chunk[chunk["anomaly"] == -1]
+    writer.write(flagged if anomalies_only else chunk)
+    return len(flagged)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed IsolationForest anomaly scoring")
+    parser.add_argument("source", help="input .csv or .parquet")
+    parser.add_argument("output", help="output .csv or .parquet")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--sample-size", type=int, default=100_000)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--group-by", choices=["Crop", "State"], default=None, help="fit one model per group")
+    parser.add_argument("--contamination", type=float, default=0.1)
+    parser.add_argument("--anomalies-only", action="store_true", help="only write rows flagged as anomalies")
+    args = parser.parse_args()
+
+    stats = score_file(args.source, args.output, chunksize=args.chunksize, sample_size=args.sample_size,
+                       n_jobs=args.n_jobs, group_by=args.group_by, contamination=args.contamination,
+                       anomalies_only=args.anomalies_only)
+    print(f"Scored into {args.output}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Persisted, indexed anomaly store for crop/state lookups.
+
+The notebook answers "is my crop/state anomalous?" by lower-casing and
+scanning the whole anomalies frame for every question. Here the anomalies
+are detected and explained once, written to a SQLite table with a
+(crop, state, year) index, and each lookup is an index seek.
+
+    python anomaly_store.py [crop_yield.csv] [anomalies.sqlite3]
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pandas as pd
+
+from anomaly_explainer import FEATURES, decode_flags, detect_anomalies, explain_anomalies
+
+# Data files live next to this module, whatever the working directory
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CROP_YIELD_CSV = os.path.join(DATA_DIR, "crop_yield.csv")
+STORE_PATH = os.getenv("ANOMALY_STORE_PATH", os.path.join(DATA_DIR, "anomalies.sqlite3"))
+
+TEXT_COLUMNS = ["Crop", "Season", "State"]
+
+# Table column <- report column; *_avg are the crop averages the reasons compare against
+COLUMNS = {
+    "crop": "Crop", "state": "State", "season": "Season", "year": "Crop_Year",
+    "area": "Area", "production": "Production", "annual_rainfall": "Annual_Rainfall",
+    "fertilizer": "Fertilizer", "pesticide": "Pesticide", "yield": "Yield",
+    "fertilizer_avg": "Fertilizer_avg", "annual_rainfall_avg": "Annual_Rainfall_avg",
+    "pesticide_avg": "Pesticide_avg", "yield_avg": "Yield_avg", "production_avg": "Production_avg",
+    "reason_flags": "Reason_Flags",
+}
+
+
+def _key(value):
+    return " ".join(str(value).split()).casefold()
+
+
+def load_crop_yield(path):
+    """Read crop_yield.csv with the padded text columns ('Kharif     ', 'Coconut ') stripped"""
+    df = pd.read_csv(path)
+    for column in TEXT_COLUMNS:
+        df[column] = df[column].str.strip()
+    df[FEATURES] = df[FEATURES].fillna(0)
+    return df
+
+
+class AnomalyStore:
+    """SQLite table of explained anomalies, indexed on (crop, state, year)"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+
+    def build(self, df):
+        """Detect and explain the anomalies in `df`, replacing the stored table"""
+        df, anomalies = detect_anomalies(df)
+        explained = explain_anomalies(anomalies, df, with_averages=True)
+        table = explained[list(COLUMNS.values())].set_axis(list(COLUMNS), axis=1)
+        table.insert(0, "state_key", table["state"].map(_key))
+        table.insert(0, "crop_key", table["crop"].map(_key))
+
+        with self._lock:
+            self._db.execute("DROP TABLE IF EXISTS anomalies")
+            table.to_sql("anomalies", self._db, index=False)
+            self._db.execute("CREATE INDEX anomalies_lookup ON anomalies (crop_key, state_key, year)")
+            self._db.commit()
+        return len(table)
+
+    def is_built(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'anomalies'"
+            ).fetchone()
+        return row is not None
+
+    def lookup(self, crop, state, year=None):
+        """Anomalies for a crop/state (any case or spacing), optionally one year"""
+        query = "SELECT * FROM anomalies WHERE crop_key = ? AND state_key = ?"
+        params = [_key(crop), _key(state)]
+        if year is not None:
+            query += " AND year = ?"
+            params.append(int(year))
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY year", params).fetchall()
+
+        results = []
+        for row in rows:
+            entry = {k: row[k] for k in row.keys() if k not in ("crop_key", "state_key", "reason_flags")}
+            reasons, remedies = decode_flags(row["reason_flags"])
+            entry["reasons"] = reasons
+            entry["remedies"] = remedies
+            results.append(entry)
+        return results
+
+
+def open_store(path=STORE_PATH, source=CROP_YIELD_CSV):
+    """Open the store, building it from `source` the first time"""
+    store = AnomalyStore(path)
+    if not store.is_built():
+        store.build(load_crop_yield(source))
+    return store
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else CROP_YIELD_CSV
+    path = sys.argv[2] if len(sys.argv) > 2 else STORE_PATH
+
+    count = AnomalyStore(path).build(load_crop_yield(source))
+    print(f"Stored {count} anomalies in {path}")
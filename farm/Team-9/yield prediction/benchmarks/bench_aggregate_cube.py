@@ -0,0 +1,63 @@
+"""Rollup latency: groupby over the raw rows vs the aggregate cube.
+
+Usage: python benchmarks/bench_aggregate_cube.py [--rows 19689 500000] [--repeat 20]
+
+Raw is the notebook's df.groupby(by)[FEATURES] mean/std/quantiles; the
+cube rolls up its cell summaries (first query) and then serves the
+memoised result. Also reports cube size on disk, the cost of appending
+one year, and the median relative error of the histogram p50.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import CROP_YIELD_CSV, replicate, timed, print_table
+from aggregate_cube import AggregateCube, MEASURES
+from anomaly_store import load_crop_yield
+
+
+def raw_rollup(df, by):
+    grouped = df.groupby(list(by))[MEASURES]
+    return grouped.mean(), grouped.std(), grouped.quantile([0.25, 0.5, 0.75])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[19689, 500000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    base = load_crop_yield(CROP_YIELD_CSV)
+    table = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df = replicate(base, rows).iloc[:rows].copy()
+            # Replicas become distinct (later) years so every cell stays unique
+            df["Crop_Year"] += 100 * (np.arange(len(df)) // len(base))
+            last_year = df["Crop_Year"] == df["Crop_Year"].max()
+
+            build_s, cube = timed(AggregateCube.build, df[~last_year])
+            append_s, _ = timed(cube.append, df[last_year])
+            path = os.path.join(tmp, "cube.npz")
+            cube.save(path)
+
+            for by in [("Crop",), ("Crop", "State")]:
+                raw_s = min(timed(raw_rollup, df, by)[0] for _ in range(args.repeat))
+                cube = AggregateCube.load(path)
+                first_s, result = timed(cube.query, by)
+                cached_s = min(timed(cube.query, by)[0] for _ in range(args.repeat))
+
+                exact = df.groupby(list(by))["Yield"].median().reindex(result.index)
+                error = float(np.median(np.abs(result["Yield_p50"] - exact) / exact.abs().clip(lower=1e-9)))
+                table.append((f"{rows:,}", "+".join(by), f"{raw_s * 1e3:.1f}", f"{first_s * 1e3:.1f}",
+                              f"{cached_s * 1e3:.2f}", f"{error:.2%}", f"{build_s:.2f}", f"{append_s:.2f}",
+                              f"{os.path.getsize(path) / 1024:,.0f} KiB"))
+
+    print_table(('rows', 'by', 'raw ms', 'cube ms', 'cached ms', 'p50 err', 'build s', 'append s', 'file'),
+                table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Throughput and memory of the chunked anomaly scorer on expanded data.
+
+Usage: python benchmarks/bench_anomaly_scoring.py [--rows 20000 200000 2000000] [--n-jobs 1 4]
+
+crop_yield.csv is expanded to each size with +-10% multiplicative noise
+on the numeric features and written to a temporary CSV. Each run happens
+in a fresh process so its peak RSS can be reported; it should stay flat
+as rows grow.
+"""
+import argparse
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from common import CROP_YIELD_CSV, replicate, print_table
+from anomaly_explainer import FEATURES
+from anomaly_scoring import score_file
+
+
+def expanded_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = replicate(pd.read_csv(CROP_YIELD_CSV), rows).iloc[:rows].copy()
+    df[FEATURES] = df[FEATURES].fillna(0) * rng.uniform(0.9, 1.1, (len(df), len(FEATURES)))
+    df.to_csv(path, index=False)
+
+
+def run_once(source, output, n_jobs, group_by):
+    """Child process: score the file, return stats plus peak RSS in MB"""
+    import sklearn.ensemble  # noqa: F401  (keep the import out of the fit timing)
+    
+    stats = score_file(source, output, n_jobs=n_jobs, group_by=group_by, anomalies_only=True)
+    stats['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20_000, 200_000, 2_000_000])
+    parser.add_argument('--n-jobs', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--group-by', choices=['Crop', 'State'], default=None)
+    args = parser.parse_args()
+    
+    table = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            source = os.path.join(tmp, f"crop_yield_{rows}.csv")
+            expanded_csv(source, rows)
+            for n_jobs in args.n_jobs:
+                with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+                    stats = pool.submit(run_once, source, os.path.join(tmp, 'scored.csv'), n_jobs,
+                                        args.group_by).result()
+                table.append((f"{rows:,}", n_jobs, f"{stats['fit_seconds']:.1f}", f"{stats['total_seconds']:.1f}",
+                              f"{rows / stats['total_seconds']:,.0f}", f"{stats['peak_rss_mb']:.0f} MB",
+                              stats['anomalies']))
+            os.remove(source)
+    
+    print_table(('rows', 'n_jobs', 'fit s', 'total s', 'rows/s', 'peak RSS', 'anomalies'), table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Per-query latency: notebook-style DataFrame scan vs the indexed anomaly store.
+
+Usage: python benchmarks/bench_anomaly_store.py [--queries 2000] [--rows 19689 500000]
+
+The scan is the notebook's lower-cased Crop/State filter over the
+anomalies frame; the store answers the same (crop, state) pairs through
+its SQLite index.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import CROP_YIELD_CSV, replicate, print_table
+from anomaly_explainer import detect_anomalies
+from anomaly_store import AnomalyStore, load_crop_yield
+
+
+def scan(anomalies, crop, state):
+    return anomalies[
+        (anomalies['Crop'].str.lower() == crop.lower()) &
+        (anomalies['State'].str.lower() == state.lower())
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--rows", type=int, nargs="+", default=[19689, 500000])
+    args = parser.parse_args()
+
+    base = load_crop_yield(CROP_YIELD_CSV)
+    pairs = base[["Crop", "State"]].drop_duplicates().to_numpy()
+    rng = np.random.default_rng(0)
+    queries = pairs[rng.integers(0, len(pairs), args.queries)]
+
+    table = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df = replicate(base, rows).iloc[:rows].copy()
+            store = AnomalyStore(os.path.join(tmp, f"anomalies_{rows}.sqlite3"))
+            store.build(df)
+            anomalies = detect_anomalies(df)[1]
+
+            start = time.perf_counter()
+            scanned = sum(len(scan(anomalies, crop, state)) for crop, state in queries)
+            scan_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+            start = time.perf_counter()
+            looked_up = sum(len(store.lookup(crop, state)) for crop, state in queries)
+            store_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+            assert scanned == looked_up, (scanned, looked_up)
+            table.append((f"{rows:,}", f"{len(anomalies):,}", f"{scan_us:,.0f}", f"{store_us:,.0f}",
+                          f"{scan_us / store_us:.0f}x"))
+
+    print_table(('rows', 'anomalies', 'scan us/query', 'store us/query', 'speedup'), table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Shared helpers for the benchmark scripts in this folder"""
+import os
+import sys
+import time
+
+# Benchmarks import the scripts next to predict.ipynb directly
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+CROP_YIELD_CSV = os.path.join(PROJECT_DIR, "crop_yield.csv")
+
+
+def timed(func, *args, **kwargs):
+    """Return (seconds, result)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def replicate(df, rows):
+    """Repeat a frame until it has at least `rows` rows"""
+    import pandas as pd
+
+    copies = -(-rows // len(df))
+    return pd.concat([df] * copies, ignore_index=True)
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width text table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -1,5 +1,7 @@
+import asyncio
 import pandas as pd
 import google.generativeai as genai
+from recommendation_engine import BatchRecommender, GeminiClient
 
 # 1. Set your Gemini API Key
 
@@ -12,30 +14,20 @@ df = pd.read_csv("rr.csv")
 # 3. Create a Gemini model instance
 model = genai.GenerativeModel("gemini-1.5-flash")  # or "gemini-1.5-pro" if you want
 
-def recommend_training(row):
-    prompt = f"""
-You are an agriculture expert. Based on the following production problems and their reasons, suggest a personalized list of specific training modules or sessions for this farmer. Avoid general advice. Make the list actionable and focused.
-
-Crop: {row['Crop']}
-State: {row['State']}
-Reasons: {row['Reasons']}
-Remedies: {row['Remedies']}
-
-List the 2-3 most relevant training topics, each with a short description.
-
-Reply in plain language.
-"""
-    response = model.generate_content(prompt)
-    return response.text.strip()
-
-# 4. Generate recommendations for all entries
-recommendations = []
-for idx, row in df.iterrows():
-    print(f"Generating for row {idx+1}/{len(df)}...")
-    rec = recommend_training(row)
-    recommendations.append(rec)
-
-df['Training_Recommendations'] = recommendations
+# 4. Generate recommendations for all entries.
+# Identical Crop/State/Reasons/Remedies rows share one request, calls run
+# concurrently under a rate limit, and finished answers are checkpointed so
+# an interrupted run can simply be restarted.
+recommender = BatchRecommender(
+    GeminiClient(model),
+    concurrency=8,
+    requests_per_minute=60,
+    checkpoint_path="anomaly_report_with_training_gemini.checkpoint.jsonl"
+)
+df = asyncio.run(recommender.recommend_frame(df))
+print(f"Stats: {recommender.stats}")
+if recommender.failures:
+    print(f"{len(recommender.failures)} prompts failed; rerun to retry them.")
 
 # 5. Save or view the new CSV
 df.to_csv("anomaly_report_with_training_gemini.csv", index=False)
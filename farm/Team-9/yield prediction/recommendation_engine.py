@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+TRAINING_PROMPT = """
+You are an agriculture expert. Based on the following production problems and their reasons, suggest a personalized list of specific training modules or sessions for this farmer. Avoid general advice. Make the list actionable and focused.
+
+Crop: {crop}
+State: {state}
+Reasons: {reasons}
+Remedies: {remedies}
+
+List the 2-3 most relevant training topics, each with a short description.
+
+Reply in plain language.
+"""
+
+
+def build_training_prompt(crop, state, reasons, remedies):
+    """Prompt used by recommend.py and recommendfast.py"""
+    return TRAINING_PROMPT.format(crop=crop, state=state, reasons=reasons, remedies=remedies)
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class GeminiClient:
+    """Async adapter around a google.generativeai GenerativeModel"""
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt):
+        response = await self.model.generate_content_async(prompt)
+        return response.text.strip()
+
+
+class FakeModelError(Exception):
+    pass
+
+
+class FakeModelClient:
+    """Local stand-in for the LLM with configurable latency and failure rate"""
+
+    def __init__(self, latency=0.05, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+        if self._random.random() < self.error_rate:
+            raise FakeModelError("simulated upstream error")
+        return f"Recommended training for prompt {prompt_key(prompt)[:8]}"
+
+
+class BatchRecommender:
+    """Generate training recommendations for many rows concurrently.
+
+    Identical prompts are sent once, at most `concurrency` requests are in
+    flight, and a token bucket keeps to `requests_per_minute`. Failed calls
+    are retried with exponential backoff and jitter. Every answer is
+    appended to `checkpoint_path` (JSON lines) as it arrives, so an
+    interrupted run resumes where it stopped. Prompts that still fail
+    after `max_retries` are reported in `failures`; they do not abort the
+    batch.
+    """
+
+    def __init__(self, client, concurrency=8, requests_per_minute=60, max_retries=5,
+                 backoff=1.0, checkpoint_path=None):
+        self.client = client
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint_path = checkpoint_path
+        self.failures = {}
+        self.stats = {'rows': 0, 'unique_prompts': 0, 'from_checkpoint': 0, 'requests': 0, 'retries': 0}
+
+    def load_checkpoint(self):
+        done = {}
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        done[entry['key']] = entry['text']
+        return done
+
+    async def run(self, prompts):
+        """Return one recommendation (or None on failure) per prompt, in order"""
+        prompts = list(prompts)
+        keys = [prompt_key(p) for p in prompts]
+        unique = dict(zip(keys, prompts))
+        results = self.load_checkpoint()
+
+        todo = {key: prompt for key, prompt in unique.items() if key not in results}
+        self.stats.update(rows=len(prompts), unique_prompts=len(unique),
+                          from_checkpoint=len(unique) - len(todo))
+
+        bucket = TokenBucket(self.requests_per_minute / 60.0)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        checkpoint = open(self.checkpoint_path, 'a') if self.checkpoint_path else None
+
+        async def worker(key, prompt):
+            async with semaphore:
+                for attempt in range(self.max_retries + 1):
+                    await bucket.acquire()
+                    self.stats['requests'] += 1
+                    try:
+                        text = await self.client.generate(prompt)
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            self.failures[key] = str(e)
+                            return
+                        self.stats['retries'] += 1
+                        await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                        continue
+
+                    results[key] = text
+                    if checkpoint:
+                        checkpoint.write(json.dumps({'key': key, 'text': text}) + "\n")
+                        checkpoint.flush()
+                    return
+
+        try:
+            await asyncio.gather(*(worker(key, prompt) for key, prompt in todo.items()))
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        return [results.get(key) for key in keys]
+
+    async def recommend_frame(self, df, column='Training_Recommendations'):
+        """Add a recommendations column to an anomaly report DataFrame"""
+        prompts = [
+            build_training_prompt(crop, state, reasons, remedies)
+            for crop, state, reasons, remedies in zip(df['Crop'], df['State'], df['Reasons'], df['Remedies'])
+        ]
+        df = df.copy()
+        df[column] = await self.run(prompts)
+        return df
+
+
+if __name__ == "__main__":
+    # Demo against the fake client: python recommendation_engine.py [csv]
+    import sys
+    import pandas as pd
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "anomaly_report_with_reasons.csv"
+    df = pd.read_csv(source)
+    client = FakeModelClient(latency=0.05, error_rate=0.1, seed=0)
+    recommender = BatchRecommender(client, concurrency=32, requests_per_minute=6000, backoff=0.05)
+
+    start = time.perf_counter()
+    df = asyncio.run(recommender.recommend_frame(df))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(df)} rows in {elapsed:.2f}s, stats: {recommender.stats}, failures: {len(recommender.failures)}")
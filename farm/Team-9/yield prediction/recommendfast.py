@@ -1,8 +1,17 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import google.generativeai as genai
 import pandas as pd
-from dotenv import api
+from dotenv import load_dotenv
+from recommendation_engine import BatchRecommender, GeminiClient
+from response_cache import CachedRecommender
+from anomaly_store import open_store
+from aggregate_cube import DIMENSIONS, open_cube
+
+load_dotenv()
 # Set your Gemini API Key
 genai.configure(api_key=os.getenv('apikey'))
 # genai.configure(api_key="YOUR_GEMINI_API_KEY")
@@ -10,7 +19,18 @@ genai.configure(api_key=os.getenv('apikey'))
 # Choose the Gemini model
 model = genai.GenerativeModel("gemini-1.5-flash")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Data files are opened on startup, not at import, so importing the app touches none of them
+    # Anomalies are detected once and looked up through a (crop, state, year) index
+    app.state.anomaly_store = open_store()
+    # Precomputed crop x state x season x year aggregates for dashboards
+    app.state.aggregate_cube = open_cube()
+    # Identical (normalised) requests are answered from a local SQLite cache
+    app.state.recommender = CachedRecommender(GeminiClient(model))
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Define input schema
 class FarmerInput(BaseModel):
@@ -20,44 +40,46 @@ class FarmerInput(BaseModel):
     Remedies: str
 
 @app.post("/recommend_training/")
-def recommend_training_api(data: FarmerInput):
-    prompt = f"""
-You are an agriculture expert. Based on the following production problems and their reasons, suggest a personalized list of specific training modules or sessions for this farmer. Avoid general advice. Make the list actionable and focused.
+async def recommend_training_api(request: Request, data: FarmerInput):
+    recommendation = await request.app.state.recommender.recommend(data.Crop, data.State, data.Reasons, data.Remedies)
+    return {"recommendation": recommendation}
 
-Crop: {data.Crop}
-State: {data.State}
-Reasons: {data.Reasons}
-Remedies: {data.Remedies}
+@app.get("/recommend_training/metrics")
+def recommend_training_metrics(request: Request):
+    return request.app.state.recommender.metrics()
 
-List the 2-3 most relevant training topics, each with a short description.
+@app.get("/anomalies/")
+def anomalies_lookup(request: Request, crop: str, state: str, year: Optional[int] = None):
+    results = request.app.state.anomaly_store.lookup(crop, state, year)
+    return {"anomalous": bool(results), "count": len(results), "anomalies": results}
 
-Reply in plain language.
-"""
-    response = model.generate_content(prompt)
-    return {"recommendation": response.text.strip()}
+@app.get("/aggregates/")
+def aggregates(request: Request, by: str = "Crop", crop: Optional[str] = None, state: Optional[str] = None,
+               season: Optional[str] = None, year: Optional[int] = None):
+    levels = [level.strip() for level in by.split(",")]
+    unknown = [level for level in levels if level not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown dimensions {unknown}, use {DIMENSIONS}")
+    result = request.app.state.aggregate_cube.query(levels, crop=crop, state=state, season=season, year=year).reset_index()
+    rows = result.astype(object).where(result.notna(), None).to_dict("records")
+    return {"by": levels, "groups": len(rows), "aggregates": rows}
 
 # (Optional) Batch endpoint: To process a CSV and add recommendations column
 @app.post("/batch_recommend_training/")
-def batch_recommend(file_path: str):
+async def batch_recommend(file_path: str, concurrency: int = 8, requests_per_minute: int = 60):
     df = pd.read_csv(file_path)
-    recommendations = []
-    for idx, row in df.iterrows():
-        prompt = f"""
-You are an agriculture expert. Based on the following production problems and their reasons, suggest a personalized list of specific training modules or sessions for this farmer. Avoid general advice. Make the list actionable and focused.
-
-Crop: {row['Crop']}
-State: {row['State']}
-Reasons: {row['Reasons']}
-Remedies: {row['Remedies']}
-
-List the 2-3 most relevant training topics, each with a short description.
-
-Reply in plain language.
-"""
-        response = model.generate_content(prompt)
-        recommendations.append(response.text.strip())
-    df["Training_Recommendations"] = recommendations
     output_file = "anomaly_report_with_training_gemini.csv"
+    recommender = BatchRecommender(
+        GeminiClient(model),
+        concurrency=concurrency,
+        requests_per_minute=requests_per_minute,
+        checkpoint_path=f"{output_file}.checkpoint.jsonl"
+    )
+    df = await recommender.recommend_frame(df)
     df.to_csv(output_file, index=False)
-    return {"status": "done", "output": output_file}
-
+    return {
+        "status": "done" if not recommender.failures else "partial",
+        "output": output_file,
+        "stats": recommender.stats,
+        "failed_prompts": len(recommender.failures)
+    }
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from recommendation_engine import build_training_prompt
+
+CACHE_PATH = os.getenv("RECOMMENDATION_CACHE_PATH",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendation_cache.sqlite3"))
+CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "10000"))
+
+
+def _normalise_text(value):
+    return " ".join(str(value).split()).casefold()
+
+
+def _normalise_list(value):
+    # Reasons/remedies are "; "-joined phrases from a small fixed vocabulary
+    return sorted({_normalise_text(part) for part in str(value).split(";") if part.strip()})
+
+
+def request_key(crop, state, reasons, remedies):
+    """Cache key that ignores case, spacing and the order of reasons/remedies"""
+    parts = [_normalise_text(crop), _normalise_text(state)]
+    parts += ["|".join(_normalise_list(reasons)), "|".join(_normalise_list(remedies))]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL and least-recently-used eviction"""
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+
+    def set(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            # Expired rows first, then the least recently used beyond the size bound
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class CachedRecommender:
+    """Serve /recommend_training from the cache, coalescing identical in-flight requests"""
+
+    def __init__(self, client, cache=None, latency_window=1000):
+        self.client = client
+        self.cache = cache if cache is not None else ResponseCache()
+        self.counters = {'requests': 0, 'hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_calls': 0, 'errors': 0}
+        self.latencies = {'hit': deque(maxlen=latency_window), 'miss': deque(maxlen=latency_window)}
+        self._in_flight = {}
+
+    async def recommend(self, crop, state, reasons, remedies):
+        start = time.perf_counter()
+        self.counters['requests'] += 1
+        key = request_key(crop, state, reasons, remedies)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters['hits'] += 1
+            self.latencies['hit'].append(time.perf_counter() - start)
+            return cached
+
+        self.counters['misses'] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, build_training_prompt(crop, state, reasons, remedies)))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.counters['coalesced'] += 1
+
+        # shield: one caller disconnecting must not cancel the shared upstream call
+        response = await asyncio.shield(task)
+        self.latencies['miss'].append(time.perf_counter() - start)
+        return response
+
+    async def _fetch(self, key, prompt):
+        self.counters['upstream_calls'] += 1
+        try:
+            response = await self.client.generate(prompt)
+        except Exception:
+            self.counters['errors'] += 1
+            raise
+        self.cache.set(key, response)
+        return response
+
+    def metrics(self):
+        """Counters, hit rate and latency percentiles (ms) over recent requests"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        metrics = dict(self.counters)
+        metrics['hit_rate'] = self.counters['hits'] / lookups if lookups else 0.0
+        metrics['cache_entries'] = len(self.cache)
+        for kind, samples in self.latencies.items():
+            ordered = sorted(samples)
+            for p in (50, 95, 99):
+                value = ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000 if ordered else None
+                metrics[f'{kind}_latency_p{p}_ms'] = value
+        return metrics
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate_cube import MEASURES, AggregateCube
+from anomaly_store import CROP_YIELD_CSV, load_crop_yield
+
+EXACT_STATS = ["count"] + [f"{m}_{stat}" for m in MEASURES for stat in ("sum", "mean", "std", "min", "max")]
+
+
+@pytest.fixture(scope="module")
+def crop_yield():
+    return load_crop_yield(CROP_YIELD_CSV)
+
+
+@pytest.fixture(scope="module")
+def cube(crop_yield):
+    return AggregateCube.build(crop_yield)
+
+
+def expected(df, by):
+    """The same statistics straight from the rows with groupby().agg()"""
+    grouped = df.groupby(list(by))
+    columns = {"count": grouped.size()}
+    for measure in MEASURES:
+        stats = grouped[measure].agg(["sum", "mean", "std", "min", "max"])
+        for stat in stats:
+            columns[f"{measure}_{stat}"] = stats[stat]
+    return pd.DataFrame(columns)
+
+
+@pytest.mark.parametrize("by", [("Crop",), ("Crop", "State"), ("State", "Crop_Year"), ("Season",)])
+def test_query_matches_groupby(crop_yield, cube, by):
+    result = cube.query(by=by)
+    pd.testing.assert_frame_equal(result[EXACT_STATS], expected(crop_yield, by)[EXACT_STATS],
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_filtered_query_matches_groupby(crop_yield, cube):
+    result = cube.query(by=("Crop",), state="Assam", year=2010)
+    rows = crop_yield[(crop_yield["State"] == "Assam") & (crop_yield["Crop_Year"] == 2010)]
+    pd.testing.assert_frame_equal(result[EXACT_STATS], expected(rows, ("Crop",))[EXACT_STATS],
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_quantiles_stay_within_group_range(cube):
+    result = cube.query(by=("Crop",))
+    for measure in MEASURES:
+        assert (result[f"{measure}_p25"] <= result[f"{measure}_p50"]).all()
+        assert (result[f"{measure}_p50"] <= result[f"{measure}_p75"]).all()
+        assert (result[f"{measure}_p25"] >= result[f"{measure}_min"]).all()
+        assert (result[f"{measure}_p75"] <= result[f"{measure}_max"]).all()
+
+
+def test_append_equals_full_rebuild(crop_yield, cube, tmp_path):
+    last_year = crop_yield["Crop_Year"].max()
+    incremental = AggregateCube.build(crop_yield[crop_yield["Crop_Year"] < last_year])
+    incremental.query(by=("Crop",))  # memoised results must be dropped by the append
+    incremental.append(crop_yield[crop_yield["Crop_Year"] == last_year])
+
+    pd.testing.assert_frame_equal(incremental.cells, cube.cells, check_dtype=False, rtol=1e-9)
+    for by in [("Crop",), ("Crop", "State"), ("Crop", "Season"), ("State", "Crop_Year")]:
+        pd.testing.assert_frame_equal(incremental.query(by=by)[EXACT_STATS], cube.query(by=by)[EXACT_STATS],
+                                      check_dtype=False, rtol=1e-9)
+    # Histograms keep the initial build's bin edges, so only their totals match a rebuild
+    for level, histogram in incremental.histograms.items():
+        assert np.array_equal(histogram.to_numpy().sum(axis=1), cube.histograms[level].to_numpy().sum(axis=1))
+
+    with pytest.raises(ValueError):
+        incremental.append(crop_yield[crop_yield["Crop_Year"] == last_year])
+
+    path = str(tmp_path / "cube.npz")
+    incremental.save(path)
+    reloaded = AggregateCube.load(path)
+    pd.testing.assert_frame_equal(reloaded.query(by=("Crop", "State")), incremental.query(by=("Crop", "State")))
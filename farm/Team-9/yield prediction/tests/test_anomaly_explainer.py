@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_explainer import (DEFAULT_REASON, DEFAULT_REMEDY, FEATURES, LOW_RATIO, REASONS, build_report,
+                               crop_averages, decode_flags, detect_anomalies, explain_anomalies)
+from anomaly_store import CROP_YIELD_CSV, DATA_DIR
+
+REFERENCE_REPORT = f"{DATA_DIR}/anomaly_report_with_reasons.csv"
+
+
+def explain_row(row, averages):
+    """Row-wise explanation as predict.ipynb wrote it, for comparison"""
+    reasons, remedies = [], []
+    for column, reason, remedy in REASONS:
+        if row[column] < LOW_RATIO * averages.loc[row["Crop"], column]:
+            reasons.append(reason)
+            remedies.append(remedy)
+    return "; ".join(reasons) or DEFAULT_REASON, "; ".join(remedies) or DEFAULT_REMEDY
+
+
+@pytest.fixture(scope="module")
+def report():
+    df, anomalies = detect_anomalies(pd.read_csv(CROP_YIELD_CSV))
+    return build_report(explain_anomalies(anomalies, df)).reset_index(drop=True)
+
+
+def test_report_reproduces_the_notebook_output(report):
+    # The notebook wrote Reasons and Remedies twice; pandas reads the copies as *.1
+    reference = pd.read_csv(REFERENCE_REPORT)
+    assert len(report) == len(reference) == 1969
+    for column in ["Crop", "State", "Reasons", "Remedies"]:
+        assert report[column].tolist() == reference[column].tolist()
+    for column in ["Area", "Production", "Yield"]:
+        np.testing.assert_allclose(report[column], reference[column])
+
+
+def test_flags_match_the_row_wise_rules():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(1, 100, (200, len(FEATURES))), columns=FEATURES)
+    df["Crop"] = rng.choice(["Rice", "Wheat", "Jute"], len(df))
+    df["State"] = "Assam"
+    averages = crop_averages(df)
+
+    report = build_report(explain_anomalies(df, averages=averages))
+    expected = [explain_row(row, averages) for _, row in df.iterrows()]
+    assert list(zip(report["Reasons"], report["Remedies"])) == expected
+
+
+def test_decode_flags_covers_every_combination():
+    flags = np.arange(1 << len(REASONS), dtype=np.uint8)
+    reasons, remedies = decode_flags(flags)
+    assert reasons[0] == DEFAULT_REASON and remedies[0] == DEFAULT_REMEDY
+    assert reasons[-1] == "; ".join(reason for _, reason, _ in REASONS)
+    assert remedies[1] == REASONS[0][2]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_scoring import AnomalyScorer, draw_sample, iter_chunks, prepare, score_file
+from anomaly_store import CROP_YIELD_CSV
+
+
+@pytest.fixture(scope="module")
+def crop_yield():
+    return pd.read_csv(CROP_YIELD_CSV)
+
+
+def test_one_chunk_and_many_chunks_give_identical_scores(tmp_path):
+    whole, chunked = str(tmp_path / "whole.csv"), str(tmp_path / "chunked.csv")
+    stats = score_file(CROP_YIELD_CSV, whole, chunksize=100_000, sample_size=5_000)
+    chunked_stats = score_file(CROP_YIELD_CSV, chunked, chunksize=1_000, sample_size=5_000, n_jobs=3)
+
+    assert stats["rows_written"] == chunked_stats["rows_written"] == 19689
+    assert stats["anomalies"] == chunked_stats["anomalies"] > 0
+    pd.testing.assert_frame_equal(pd.read_csv(whole), pd.read_csv(chunked))
+
+
+def test_sample_does_not_depend_on_chunk_size():
+    one = draw_sample(CROP_YIELD_CSV, 2_000, chunksize=100_000)
+    many = draw_sample(CROP_YIELD_CSV, 2_000, chunksize=777)
+    assert len(one) == 2_000
+    pd.testing.assert_frame_equal(one, many)
+
+
+def test_small_groups_fall_back_to_the_global_model(crop_yield):
+    sample = draw_sample(CROP_YIELD_CSV, 5_000, chunksize=100_000)
+    scorer = AnomalyScorer(group_by="Crop", min_group_rows=200).fit(sample)
+    crops = crop_yield["Crop"].str.strip()
+    assert 0 < len(scorer.models) < crops.nunique()
+
+    scored = pd.concat([scorer.score(chunk) for chunk in iter_chunks(CROP_YIELD_CSV, 5_000)], ignore_index=True)
+    features = scorer.scaler.transform(prepare(crop_yield.copy()))
+    grouped = crops.isin(list(scorer.models)).to_numpy()
+
+    # Padded names ("Coconut ") share their group's model
+    for crop in list(scorer.models)[:3]:
+        rows = (crops == crop).to_numpy()
+        np.testing.assert_allclose(scored["anomaly_score"][rows], scorer.models[crop].decision_function(features[rows]))
+    np.testing.assert_allclose(scored["anomaly_score"][~grouped],
+                               scorer.global_model.decision_function(features[~grouped]))
+    assert (scored["anomaly"] == np.where(scored["anomaly_score"] < 0, -1, 1)).all()
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from anomaly_store import CROP_YIELD_CSV, DATA_DIR, open_store
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return open_store(str(tmp_path_factory.mktemp("store") / "anomalies.sqlite3"), CROP_YIELD_CSV)
+
+
+def test_lookup_ignores_case_and_spacing(store):
+    rice = store.lookup("Rice", "Assam")
+    assert rice
+    assert store.lookup("  rice ", "ASSAM") == rice
+    assert store.lookup("RICE", "  assam  ") == rice
+    assert {entry["crop"] for entry in rice} == {"Rice"}
+    assert [entry["year"] for entry in rice] == sorted(entry["year"] for entry in rice)
+
+    # Padded crop names in the CSV ("Coconut ") are stored stripped and found either way
+    assert store.lookup("Coconut", "Assam") == store.lookup("coconut ", "assam")
+    assert store.lookup("Coconut", "Assam")[0]["crop"] == "Coconut"
+
+
+def test_lookup_by_year_and_misses(store):
+    rice = store.lookup("Rice", "Assam")
+    year = rice[0]["year"]
+    assert store.lookup("rice", "assam", year) == [entry for entry in rice if entry["year"] == year]
+    assert store.lookup("rice", "assam", 1800) == []
+    assert store.lookup("Rice", "Atlantis") == []
+
+
+def test_store_matches_the_anomaly_report(store):
+    report = pd.read_csv(f"{DATA_DIR}/anomaly_report_with_reasons.csv")
+    report = report[(report["Crop"].str.strip() == "Rice") & (report["State"] == "Assam")]
+    entries = store.lookup("Rice", "Assam")
+    assert len(entries) == len(report)
+    assert sorted(entry["reasons"] for entry in entries) == sorted(report["Reasons"])
+
+
+def test_reopening_does_not_rebuild(store):
+    reopened = open_store(store.path, source="missing.csv")
+    assert reopened.is_built()
+    assert reopened.lookup("Rice", "Assam") == store.lookup("Rice", "Assam")
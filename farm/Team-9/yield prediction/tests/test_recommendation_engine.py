@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from recommendation_engine import BatchRecommender, FakeModelClient, FakeModelError, prompt_key
+
+
+class PickyClient(FakeModelClient):
+    """Fake client that always fails prompts containing `poison`"""
+
+    def __init__(self, poison, **kwargs):
+        super().__init__(latency=0.001, **kwargs)
+        self.poison = poison
+
+    async def generate(self, prompt):
+        if self.poison in prompt:
+            self.calls += 1
+            raise FakeModelError("rejected")
+        return await super().generate(prompt)
+
+
+class CountingClient(FakeModelClient):
+    """Fake client that records the highest number of calls in flight"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate(self, prompt):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super().generate(prompt)
+        finally:
+            self.in_flight -= 1
+
+
+def recommender(client, **kwargs):
+    kwargs.setdefault('requests_per_minute', 60000)
+    kwargs.setdefault('backoff', 0)
+    return BatchRecommender(client, **kwargs)
+
+
+def test_identical_prompts_make_one_upstream_call():
+    client = FakeModelClient(latency=0.001, seed=0)
+    batch = recommender(client)
+    results = asyncio.run(batch.run(['same prompt'] * 5 + ['other prompt']))
+
+    assert client.calls == 2
+    assert results[:5] == [results[0]] * 5
+    assert results[5] != results[0]
+    assert batch.stats['rows'] == 6 and batch.stats['unique_prompts'] == 2
+
+
+def test_failed_calls_are_retried_until_they_succeed():
+    client = FakeModelClient(latency=0.001, error_rate=0.5, seed=1)
+    batch = recommender(client, max_retries=20)
+    results = asyncio.run(batch.run([f"prompt {i}" for i in range(20)]))
+
+    assert all(text is not None for text in results)
+    assert batch.stats['retries'] > 0
+    assert batch.stats['requests'] == 20 + batch.stats['retries']
+    assert batch.failures == {}
+
+
+def test_exhausted_retries_are_reported_without_aborting_the_batch():
+    client = PickyClient('bad', seed=0)
+    batch = recommender(client, max_retries=2)
+    results = asyncio.run(batch.run(['good 1', 'bad prompt', 'good 2']))
+
+    assert results[0] is not None and results[2] is not None
+    assert results[1] is None
+    assert list(batch.failures) == [prompt_key('bad prompt')]
+    assert client.calls == 2 + 3  # one per good prompt, 1 + max_retries for the bad one
+
+
+def test_second_run_resumes_from_the_checkpoint(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    prompts = [f"prompt {i}" for i in range(10)]
+
+    first = recommender(FakeModelClient(latency=0.001, seed=0), checkpoint_path=path)
+    expected = asyncio.run(first.run(prompts))
+    with open(path) as f:
+        assert len([json.loads(line) for line in f]) == 10
+
+    client = FakeModelClient(latency=0.001, seed=0)
+    second = recommender(client, checkpoint_path=path)
+    assert asyncio.run(second.run(prompts)) == expected
+    assert client.calls == 0
+    assert second.stats['from_checkpoint'] == 10
+
+
+def test_in_flight_calls_stay_within_the_concurrency_limit():
+    client = CountingClient(latency=0.01, seed=0)
+    batch = recommender(client, concurrency=3)
+    asyncio.run(batch.run([f"prompt {i}" for i in range(20)]))
+
+    assert client.calls == 20
+    assert client.peak == 3
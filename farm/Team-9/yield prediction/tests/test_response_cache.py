@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from response_cache import CachedRecommender, ResponseCache, request_key
+
+
+class SlowClient:
+    """Upstream model stand-in that counts calls and answers after `delay` seconds"""
+
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.prompts = []
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return f"advice #{len(self.prompts)}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'cache.sqlite3'), ttl_seconds=3600, max_entries=2)
+
+
+def test_key_ignores_case_spacing_and_order():
+    assert request_key('Rice', 'Assam', 'low rainfall; pests', 'irrigate') == \
+        request_key(' rice ', 'ASSAM', 'Pests;Low  rainfall', 'Irrigate')
+    assert request_key('Rice', 'Assam', 'pests', 'irrigate') != request_key('Wheat', 'Assam', 'pests', 'irrigate')
+
+
+def test_identical_concurrent_requests_share_one_upstream_call(cache):
+    client = SlowClient()
+    recommender = CachedRecommender(client, cache)
+
+    async def burst():
+        return await asyncio.gather(*(recommender.recommend('Rice', 'Assam', 'pests', 'irrigate') for _ in range(5)))
+
+    assert asyncio.run(burst()) == ['advice #1'] * 5
+    assert len(client.prompts) == 1
+    assert recommender.counters['coalesced'] == 4
+
+    # Served from the cache afterwards, even written differently
+    assert asyncio.run(recommender.recommend('RICE', 'assam', 'Pests', 'Irrigate')) == 'advice #1'
+    assert recommender.counters['hits'] == 1
+
+
+def test_failed_upstream_calls_are_not_cached(cache):
+    recommender = CachedRecommender(SlowClient(fail=True), cache)
+    with pytest.raises(RuntimeError):
+        asyncio.run(recommender.recommend('Rice', 'Assam', 'pests', 'irrigate'))
+    assert len(cache) == 0
+    assert recommender.counters['errors'] == 1
+
+
+def test_cache_expires_and_evicts_least_recently_used(cache):
+    for key in ('a', 'b'):
+        cache.set(key, key.upper())
+    cache.get('a')
+    cache.set('c', 'C')
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get('a') is None